@@ -0,0 +1,169 @@
+"""
+强制对齐：歌词文本已知时，不做自由识别，直接求已知文字在音频中的逐字时间。
+使用 whisper 的交叉注意力 + DTW（whisper.timing.find_alignment，与 word_timestamps 相同的算法），
+每个 30 秒窗口只需一次编码器和一次解码器前向计算，不需要逐 token 自回归解码，比识别快得多；
+输出的文字就是给定的歌词，之后更新时间轴时不会出现字数不一致。
+
+python align.py --audio inputs/song.mp3 --lyrics lyrics/song.txt --output_dir outputs/song
+"""
+import os
+import argparse
+
+from utils import run_report
+from utils.asr_backends import DEFAULT_MODEL
+from utils.audio_split import SAMPLE_RATE
+
+
+def read_lyrics(path):
+    """读取歌词文本，每个非空行为一行歌词"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _group_words(words, line_spans):
+    """
+    把对齐得到的词（按文本顺序）分配到各行：按字符偏移，词的第一个非空白字符落在哪一行就属于哪一行
+    :param line_spans: 每行在拼接文本中的 (开始, 结束) 字符偏移
+    """
+    groups = [[] for _ in line_spans]
+    pos = 0
+    row = 0
+    for word in words:
+        first = pos + len(word.word) - len(word.word.lstrip())
+        while row < len(line_spans) - 1 and first >= line_spans[row][1]:
+            row += 1
+        groups[row].append(word)
+        pos += len(word.word)
+    return groups
+
+
+def align_lyrics(audio_path, lines, model_name=DEFAULT_MODEL, language="zh", margin=5.0, max_tokens=220,
+                 onset_pad=1.0):
+    """
+    按窗口把已知歌词对齐到音频，返回与 whisper 识别结果相同结构的结果（每行歌词一个 segment），
+    可直接交给 whisper_to_ass。
+
+    窗口从上一行对齐结果的结束处开始，每次取 30 秒音频和之后若干行歌词（不超过 max_tokens 个 token），
+    只接受在窗口末尾 margin 秒之前结束的行（超出窗口的歌词会被压缩到窗口末尾，不可信），其余留给下一个窗口。
+    一行都没有接受时：第一行在保护区之前开始（如前奏较长，第一行跨过保护区）则下一个窗口从该行开始前 onset_pad 秒处开始；
+    第一行也被压缩到保护区中（窗口内是间奏）才整体向后移动一个窗口。
+    :param lines: 歌词行列表
+    :param margin: 窗口末尾不接受的保护区长度（秒）
+    :param max_tokens: 每个窗口最多对齐的文本 token 数（解码器上下文为 448）
+    :param onset_pad: 从某一行开始处重新开窗时，在其开始时间之前保留的秒数
+    """
+    import torch
+    import whisper
+    from whisper.audio import N_FRAMES, N_SAMPLES, HOP_LENGTH
+    from whisper.timing import find_alignment
+    from whisper.tokenizer import get_tokenizer
+    from transcribe import decode_audio, load_model, _MODEL_LOCKS
+
+    print(f"加载对齐模型: whisper / {model_name}")
+    with run_report.stage("model_load", backend="whisper", model=model_name):
+        backend = load_model(model_name, "whisper")
+    model = backend.model
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language=language, task="transcribe")
+    _, samples = decode_audio(audio_path)
+    total = len(samples)
+    margin_samples = int(margin * SAMPLE_RATE)
+    line_tokens = [len(tokenizer.encode(" " + line)) for line in lines]
+
+    segments = []
+    index = 0
+    start = 0
+    windows = 0
+    with run_report.stage("align", model=model_name, lines=len(lines)) as record, \
+            _MODEL_LOCKS[("whisper", model_name)], torch.no_grad():
+        while index < len(lines) and start < total:
+            chunk = samples[start:start + N_SAMPLES]
+            final = start + N_SAMPLES >= total
+            window_s = len(chunk) / SAMPLE_RATE
+            # 本窗口对齐的歌词行（至少一行）
+            end = index + 1
+            budget = line_tokens[index]
+            while end < len(lines) and budget + line_tokens[end] <= max_tokens:
+                budget += line_tokens[end]
+                end += 1
+
+            text = ""
+            line_spans = []
+            for line in lines[index:end]:
+                text += " "
+                line_spans.append((len(text), len(text) + len(line)))
+                text += line
+            mel = whisper.log_mel_spectrogram(chunk, model.dims.n_mels)
+            num_frames = min(N_FRAMES, len(chunk) // HOP_LENGTH)
+            mel = whisper.pad_or_trim(mel, N_FRAMES).to(model.device)
+            words = find_alignment(model, tokenizer, tokenizer.encode(text), mel, num_frames)
+            windows += 1
+
+            offset = start / SAMPLE_RATE
+            groups = [[w for w in group if w.word.strip()] for group in _group_words(words, line_spans)]
+            accepted = 0
+            for group in groups:
+                # 最后一个窗口且所有剩余歌词都在本窗口时全部接受
+                if group and not (final and end == len(lines)) and group[-1].end > window_s - margin:
+                    break
+                line = lines[index + accepted]
+                if group:
+                    line_words = [{"word": w.word, "start": offset + w.start, "end": offset + w.end,
+                                   "probability": w.probability} for w in group]
+                else:
+                    # 没有分到词的行（极少见）整行放在上一行结束处，保证字数不变
+                    t = segments[-1]["end"] if segments else offset
+                    line_words = [{"word": line, "start": t, "end": t, "probability": 0.0}]
+                segments.append({
+                    "id": len(segments),
+                    "start": line_words[0]["start"],
+                    "end": line_words[-1]["end"],
+                    "text": line,
+                    "words": line_words,
+                })
+                accepted += 1
+
+            if accepted:
+                index += accepted
+                start = max(start, int(segments[-1]["end"] * SAMPLE_RATE))
+                continue
+            # 一行都没有接受。第一行在保护区之前开始时从该行开始处重新开窗，避免跳过它的真实开始位置
+            # （至少前进 1 秒，保证窗口一直向后移动）
+            onset = groups[0][0].start - onset_pad if groups[0] else None
+            if onset is not None and groups[0][0].start < window_s - margin and onset >= 1.0:
+                start += int(onset * SAMPLE_RATE)
+            elif final:
+                break
+            else:
+                start += N_SAMPLES - margin_samples
+        record["windows"] = windows
+        record["unaligned_lines"] = len(lines) - index
+
+    if index < len(lines):
+        print(f"⚠️ 音频结束时仍有 {len(lines) - index} 行歌词未能对齐，已放在音频末尾")
+        end_s = total / SAMPLE_RATE
+        for line in lines[index:]:
+            segments.append({"id": len(segments), "start": end_s, "end": end_s, "text": line,
+                             "words": [{"word": line, "start": end_s, "end": end_s, "probability": 0.0}]})
+
+    return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": language}
+
+
+if __name__ == "__main__":
+    from generate_ass import whisper_to_ass
+
+    parser = argparse.ArgumentParser(description="已知歌词的强制对齐")
+    parser.add_argument("--audio", required=True, help="音频路径")
+    parser.add_argument("--lyrics", required=True, help="歌词文本路径，每行一句")
+    parser.add_argument("--output_dir", required=True, help="输出目录")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="whisper 模型大小 (默认: medium)")
+    parser.add_argument("--language", default="zh", help="歌词语言 (默认: zh)")
+
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    result = align_lyrics(args.audio, read_lyrics(args.lyrics), args.model, args.language)
+    ass_path, txt_path = whisper_to_ass(result, args.audio, args.output_dir, skip_credits=False)
+    print(f"✅ 已生成: {ass_path}")
+
+# example usage:
+# python align.py --audio inputs/song.mp3 --lyrics lyrics/song.txt --output_dir outputs/song
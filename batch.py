@@ -0,0 +1,229 @@
+"""
+批量模式：一次处理一个目录或清单中的多首歌曲，Whisper 模型只加载一次。
+
+识别（生产者）与 时间轴更新 + ffmpeg 编码（消费者）流水线并行：
+第 N 首歌编码的同时识别第 N+1 首，CPU 按 --cpu_budget 在 torch 线程和 ffmpeg 线程之间分配。
+批量模式无人值守：直接使用识别并简繁转换后的 lyrics.txt 生成视频，字数不一致时自动分配时间。
+
+清单为 JSON Lines，每行一首歌，例如：
+{"audio": "inputs/a.mp3", "image": "img/cover.png"}
+{"audio": "inputs/b.mp3", "video": "inputs/b.mp4", "st_type": "t"}
+"""
+import os
+import json
+import time
+import queue
+import hashlib
+import argparse
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from main import prepare, finalize
+from transcribe import load_model, DEFAULT_MODEL
+from utils.asr_backends import BACKENDS, DEFAULT_BACKEND
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg")
+
+# 流水线结束标记
+_DONE = object()
+
+
+def load_songs(input_path, image=None, video_dir=None, st_type="s"):
+    """
+    读取歌曲列表。
+    :param input_path: 音频目录，或 JSON Lines 清单文件
+    :param image: 目录模式下所有歌曲共用的图片
+    :param video_dir: 目录模式下与音频同名的视频所在目录（优先于图片）
+    """
+    songs = []
+    if os.path.isdir(input_path):
+        for name in sorted(os.listdir(input_path)):
+            if not name.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            song = {"audio": os.path.join(input_path, name), "image": image, "st_type": st_type}
+            if video_dir:
+                video = os.path.join(video_dir, os.path.splitext(name)[0] + ".mp4")
+                if os.path.exists(video):
+                    song["video"] = video
+            songs.append(song)
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    song = {"image": image, "st_type": st_type}
+                    song.update(json.loads(line))
+                    songs.append(song)
+    return songs
+
+
+def output_dirs(songs, output_root):
+    """
+    每首歌的输出目录 output_root/<音频文件名>。不同的音频同名时（如 a/song.mp3 与 b/song.mp3，或 song.mp3 与 song.flac）
+    目录名后加音频路径哈希的前 8 位区分，避免流水线同时写同一目录；同一音频重复出现时，除第一次外为 None
+    """
+    audios = [os.path.abspath(song["audio"]) for song in songs]
+    counts = Counter(os.path.splitext(os.path.basename(audio))[0] for audio in set(audios))
+    seen = set()
+    dirs = []
+    for audio in audios:
+        if audio in seen:
+            dirs.append(None)
+            continue
+        seen.add(audio)
+        name = os.path.splitext(os.path.basename(audio))[0]
+        if counts[name] > 1:
+            name = f"{name}_{hashlib.sha1(audio.encode('utf-8')).hexdigest()[:8]}"
+        dirs.append(os.path.join(output_root, name))
+    return dirs
+
+
+def split_cpu_budget(cpu_budget, encoders, torch_threads=None):
+    """
+    把 CPU 核数分给 torch 和 ffmpeg：默认 torch 占一半（识别是流水线中最慢的一环），
+    其余平分给同时运行的 ffmpeg 进程。
+    :return: (torch 线程数, 每个 ffmpeg 进程的线程数)
+    """
+    torch_threads = torch_threads or max(1, cpu_budget // 2)
+    ffmpeg_threads = max(1, (cpu_budget - torch_threads) // max(1, encoders))
+    return torch_threads, ffmpeg_threads
+
+
+def run_batch(songs, output_root="outputs", model_name=DEFAULT_MODEL, cpu_budget=None, encoders=1,
+              torch_threads=None, use_cache=True, skip_existing=False, prefetch=2, backend=DEFAULT_BACKEND):
+    """
+    流水线批量处理。
+    :param encoders: 同时运行的编码（ffmpeg）任务数
+    :param prefetch: 除正在编码的 encoders 首外，最多再领先识别多少首：正在识别、已识别等待编码和正在编码的歌曲
+                     合计不超过 encoders + prefetch 首，限制中间文件和内存占用
+    :param backend: 识别后端 (whisper / faster-whisper)
+    :return: 每首歌的处理结果列表
+    """
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    torch_threads, ffmpeg_threads = split_cpu_budget(cpu_budget, encoders, torch_threads)
+    print(f"CPU 分配：识别 {torch_threads} 线程，{encoders} 个 ffmpeg × {ffmpeg_threads} 线程")
+
+    pending = []
+    results = []
+    for song, output_dir in zip(songs, output_dirs(songs, output_root)):
+        song_name = os.path.splitext(os.path.basename(song["audio"]))[0]
+        if output_dir is None:
+            results.append({"audio": song["audio"], "status": "failed", "error": "重复的歌曲"})
+            continue
+        if output_dir != os.path.join(output_root, song_name):
+            print(f"⚠️ {song['audio']} 与其他歌曲同名，输出到 {output_dir}")
+        if skip_existing and os.path.exists(os.path.join(output_dir, f"{song_name}.mp4")):
+            results.append({"audio": song["audio"], "status": "skipped"})
+            continue
+        if not song.get("image") and not song.get("video"):
+            results.append({"audio": song["audio"], "status": "failed", "error": "缺少 image 或 video"})
+            continue
+        pending.append((song, output_dir))
+
+    if not pending:
+        return results
+
+    # 模型只加载一次（命中缓存的歌曲不会用到，但批量时基本都需要）
+    load_model(model_name, backend, threads=torch_threads)
+
+    ready = queue.Queue()
+    lock = threading.Lock()
+    # 每首歌开始识别前占用一个名额，编码结束（或识别失败）后释放
+    slots = threading.Semaphore(encoders + prefetch)
+
+    def produce():
+        for song, output_dir in pending:
+            slots.acquire()
+            start = time.perf_counter()
+            try:
+                # 同一录音已处理过时复用其歌词，否则识别（命中识别缓存时不运行模型）
+                prepare(song["audio"], output_dir, st_type=song.get("st_type", "s"), model_name=model_name,
+                        use_cache=use_cache, backend=backend)
+                ready.put((song, output_dir, time.perf_counter() - start, None))
+            except Exception:
+                ready.put((song, output_dir, time.perf_counter() - start, traceback.format_exc()))
+        ready.put(_DONE)
+
+    def consume(song, output_dir, transcribe_s):
+        start = time.perf_counter()
+        record = {"audio": song["audio"], "transcribe_s": round(transcribe_s, 2)}
+        try:
+            outputs = finalize(song["audio"], output_dir, image=song.get("image"), video=song.get("video"),
+                               interactive=False, threads=ffmpeg_threads)
+            record.update(status="done", outputs=outputs)
+        except Exception:
+            record.update(status="failed", error=traceback.format_exc())
+        finally:
+            slots.release()
+        record["encode_s"] = round(time.perf_counter() - start, 2)
+        with lock:
+            results.append(record)
+        print(f"{'✅' if record['status'] == 'done' else '❌'} {song['audio']}")
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    with ThreadPoolExecutor(max_workers=encoders) as pool:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                break
+            song, output_dir, transcribe_s, error = item
+            if error:
+                slots.release()
+                with lock:
+                    results.append({"audio": song["audio"], "status": "failed", "error": error})
+                print(f"❌ {song['audio']}")
+                continue
+            pool.submit(consume, song, output_dir, transcribe_s)
+    producer.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成歌词视频")
+    parser.add_argument("input", help="音频目录，或 JSON Lines 清单文件")
+    parser.add_argument("--image", help="所有歌曲共用的图片（清单中可单独指定）")
+    parser.add_argument("--video_dir", help="与音频同名的视频所在目录（目录模式）")
+    parser.add_argument("--st_type", choices=["s", "t"], default="s", help="s: 简体, t: 繁体")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help="识别后端：whisper，或 CPU 上更快的 faster-whisper（int8 量化）")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="模型大小: small / medium / large ...")
+    parser.add_argument("--cpu_budget", type=int, help="可使用的 CPU 核数（默认全部）")
+    parser.add_argument("--torch_threads", type=int, help="识别使用的 torch 线程数（默认 CPU 预算的一半）")
+    parser.add_argument("--encoders", type=int, default=1, help="同时运行的编码任务数 (默认: 1)")
+    parser.add_argument("--no_cache", action="store_true", help="不使用识别结果缓存")
+    parser.add_argument("--skip_existing", action="store_true", help="跳过已生成视频的歌曲")
+    parser.add_argument("--report", default=os.path.join("outputs", "batch_report.json"), help="批量结果报告路径")
+
+    args = parser.parse_args()
+
+    songs = load_songs(args.input, image=args.image, video_dir=args.video_dir, st_type=args.st_type)
+    print(f"=== 批量模式：共 {len(songs)} 首 ===")
+    start = time.perf_counter()
+    results = run_batch(
+        songs,
+        model_name=args.model,
+        cpu_budget=args.cpu_budget,
+        encoders=args.encoders,
+        torch_threads=args.torch_threads,
+        use_cache=not args.no_cache,
+        skip_existing=args.skip_existing,
+        backend=args.backend
+    )
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"elapsed_s": round(elapsed, 2), "songs": results}, f, ensure_ascii=False, indent=2)
+
+    done = sum(1 for r in results if r["status"] == "done")
+    print(f"✅ 完成 {done}/{len(results)} 首，用时 {elapsed:.1f}s，报告：{args.report}")
+
+
+if __name__ == "__main__":
+    main()
+
+# example usage:
+# python batch.py inputs/ --image img/cover.png --cpu_budget 32 --encoders 2
+# python batch.py songs.jsonl --torch_threads 16 --encoders 4
@@ -0,0 +1,318 @@
+"""
+识别准确率 / 速度基准测试：在本地歌曲集上按不同配置（后端、模型、解码参数）运行 prepare，
+与人工修正好的参考 lyrics.ass 对比，报告每个配置的识别耗时、实时率（RTF）、峰值内存、
+字错误率（CER）以及由 \\kf 标签得出的逐字时间误差（平均值和分位数）。
+
+歌曲集目录中每首歌为同名的音频和参考字幕：song.mp3 + song.ass（音频支持 mp3/wav/flac/m4a/aac/ogg）。
+每个配置在独立的子进程中运行，峰值内存为该进程的最大常驻内存（含模型）。
+
+python benchmarks/bench_accuracy.py --songs bench_songs --configs whisper:small whisper:medium faster-whisper:medium
+python benchmarks/bench_accuracy.py --songs bench_songs --configs whisper:medium:beam_size=5,temperature=0
+python benchmarks/bench_accuracy.py --songs bench_songs --configs ... --max_cer 0.08 --max_timing_ms 300   # 选出达标的最快配置
+python benchmarks/bench_accuracy.py --songs bench_songs --configs ... --save benchmarks/accuracy.json
+python benchmarks/bench_accuracy.py --songs bench_songs --configs ... --baseline benchmarks/accuracy.json  # 回退时返回非 0
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from queue import Empty
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from convert_chinese import convert_text  # noqa: E402
+from utils.ass_document import AssDocument, KaraokeTiming  # noqa: E402
+from utils.sequence_diff import get_matching_blocks  # noqa: E402
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg")
+
+
+# ---------------------------
+# 评价指标
+# ---------------------------
+
+def char_timeline(ass_path):
+    """
+    ass 中的逐字文字与开始时间（百分秒）。只保留文字和数字（不区分大小写），
+    一个卡拉OK字含多个字符（如英文单词）时，各字符平分该字的时长
+    """
+    doc = AssDocument.load(ass_path)
+    words = doc.karaoke_words()
+    timing = KaraokeTiming(doc.dialogues, words)
+    chars, starts = [], []
+    for i, word in enumerate(words):
+        text = [c.lower() for c in word.text if c.isalnum()]
+        for k, c in enumerate(text):
+            chars.append(c)
+            starts.append(timing.start(i) + word.duration * k / len(text))
+    return chars, np.array(starts, dtype=np.float64)
+
+
+def edit_distance(ref, hyp):
+    """字符级编辑距离（替换、插入、删除代价均为 1），逐行用 numpy 计算"""
+    if not ref:
+        return len(hyp)
+    hyp_arr = np.array([ord(c) for c in hyp], dtype=np.int64)
+    index = np.arange(len(hyp) + 1)
+    previous = index.copy()
+    for i, c in enumerate(ref, 1):
+        current = np.empty_like(previous)
+        current[0] = i
+        # 删除 / 替换
+        current[1:] = np.minimum(previous[1:] + 1, previous[:-1] + (hyp_arr != ord(c)))
+        # 插入：current[j] = min(current[k] + (j - k))
+        current = np.minimum.accumulate(current - index) + index
+        previous = current
+    return int(previous[-1])
+
+
+def timing_errors(ref_chars, ref_starts, hyp_chars, hyp_starts):
+    """对齐参考与识别的字符，返回匹配字符的开始时间误差（毫秒）"""
+    errors = []
+    for i, j, size in get_matching_blocks(ref_chars, hyp_chars):
+        errors.append(np.abs(ref_starts[i:i + size] - hyp_starts[j:j + size]) * 10)
+    return np.concatenate(errors) if errors else np.zeros(0)
+
+
+def score_song(ref_ass, hyp_ass, st_type="s"):
+    """
+    :return: {"ref_chars", "edits", "errors_ms"}；识别结果先转换为与参考相同的简繁（长度不变时）
+    """
+    ref_chars, ref_starts = char_timeline(ref_ass)
+    hyp_chars, hyp_starts = char_timeline(hyp_ass)
+    converted = convert_text("".join(hyp_chars), st_type)
+    if len(converted) == len(hyp_chars):
+        hyp_chars = list(converted)
+    return {
+        "ref_chars": len(ref_chars),
+        "edits": edit_distance(ref_chars, hyp_chars),
+        "errors_ms": timing_errors(ref_chars, ref_starts, hyp_chars, hyp_starts),
+    }
+
+
+def summarize(songs):
+    """汇总一个配置在所有歌曲上的结果"""
+    errors = np.concatenate([s["errors_ms"] for s in songs]) if songs else np.zeros(0)
+    audio_s = sum(s["audio_s"] for s in songs)
+    transcribe_s = sum(s["transcribe_s"] for s in songs)
+    ref_chars = sum(s["ref_chars"] for s in songs)
+    summary = {
+        "songs": len(songs),
+        "audio_s": round(audio_s, 2),
+        "transcribe_s": round(transcribe_s, 2),
+        "rtf": round(transcribe_s / audio_s, 4) if audio_s else None,
+        "cer": round(sum(s["edits"] for s in songs) / ref_chars, 4) if ref_chars else None,
+        "matched": round(len(errors) / ref_chars, 4) if ref_chars else None,
+    }
+    if len(errors):
+        summary.update({
+            "timing_mean_ms": round(float(errors.mean()), 1),
+            "timing_p50_ms": round(float(np.percentile(errors, 50)), 1),
+            "timing_p90_ms": round(float(np.percentile(errors, 90)), 1),
+            "timing_p95_ms": round(float(np.percentile(errors, 95)), 1),
+        })
+    return summary
+
+
+# ---------------------------
+# 运行
+# ---------------------------
+
+def parse_config(text):
+    """ "faster-whisper:medium:beam_size=5,temperature=0" → {"name", "backend", "model", "options"} """
+    parts = text.split(":", 2)
+    if len(parts) < 2:
+        raise ValueError(f"配置格式应为 后端:模型[:参数=值,...]，收到: {text}")
+    options = {}
+    for item in (parts[2].split(",") if len(parts) == 3 and parts[2] else []):
+        key, _, value = item.partition("=")
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+    return {"name": text, "backend": parts[0], "model": parts[1], "options": options}
+
+
+def find_songs(songs_dir):
+    """歌曲集目录中有同名 .ass 参考字幕的音频"""
+    songs = []
+    for name in sorted(os.listdir(songs_dir)):
+        stem, ext = os.path.splitext(name)
+        ref_ass = os.path.join(songs_dir, stem + ".ass")
+        if ext.lower() in AUDIO_EXTENSIONS and os.path.exists(ref_ass):
+            songs.append({"name": stem, "audio": os.path.join(songs_dir, name), "ref_ass": ref_ass})
+    return songs
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 为 KB，macOS 为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_config(config, songs, st_type, work_dir, results):
+    """子进程中运行一个配置：模型加载一次，逐首运行 prepare（不使用识别缓存和指纹复用）"""
+    from main import prepare
+    from transcribe import load_model
+    from utils import pcm_cache
+    from utils.audio_split import SAMPLE_RATE
+
+    start = time.perf_counter()
+    load_model(config["model"], config["backend"])
+    load_s = time.perf_counter() - start
+
+    song_results = []
+    for song in songs:
+        output_dir = os.path.join(work_dir, song["name"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            prepare(song["audio"], output_dir, st_type=st_type, model_name=config["model"], use_cache=False,
+                    force=True, backend=config["backend"], fingerprint=False, decode_options=config["options"])
+            transcribe_s = time.perf_counter() - start
+        result = score_song(song["ref_ass"], os.path.join(output_dir, "old_lyrics.ass"), st_type)
+        result.update(
+            name=song["name"],
+            audio_s=len(pcm_cache.load(song["audio"])) / SAMPLE_RATE,
+            transcribe_s=transcribe_s,
+        )
+        song_results.append(result)
+
+    summary = summarize(song_results)
+    summary.update(load_s=round(load_s, 2), peak_rss_bytes=_peak_rss_bytes())
+    summary["per_song"] = {
+        s["name"]: {"cer": round(s["edits"] / s["ref_chars"], 4) if s["ref_chars"] else None,
+                    "rtf": round(s["transcribe_s"] / s["audio_s"], 4) if s["audio_s"] else None}
+        for s in song_results
+    }
+    results.put(summary)
+
+
+def _wait_result(proc, results):
+    """
+    等待子进程的结果：先读取再 join，结果大于管道缓冲区时子进程要等结果被读走才能退出
+    :return: 结果；子进程没有写入结果就退出时返回 None
+    """
+    while True:
+        try:
+            return results.get(timeout=1)
+        except Empty:
+            if not proc.is_alive():
+                break
+    # 子进程退出前写入的结果可能还在管道中
+    try:
+        return results.get(timeout=1)
+    except Empty:
+        return None
+
+
+def _fmt(value, spec, suffix=""):
+    return "-" if value is None else f"{value:{spec}}{suffix}"
+
+
+def run(configs, songs, st_type="s"):
+    # torch 不支持 fork 后再使用；每个配置独立进程，峰值内存互不影响
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    print(f"{'config':<40} {'RTF':>8} {'CER':>7} {'mean':>8} {'p50':>8} {'p90':>8} {'peak':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for index, config in enumerate(configs):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_config,
+                               args=(config, songs, st_type, os.path.join(work_dir, str(index)), queue))
+            proc.start()
+            r = _wait_result(proc, queue)
+            proc.join()
+            if proc.exitcode != 0 or r is None:
+                print(f"{config['name']:<40} ❌ 运行失败 (exit {proc.exitcode})")
+                continue
+            results[config["name"]] = r
+            peak = f"{r['peak_rss_bytes'] / 1024 ** 2:.0f}MiB" if r["peak_rss_bytes"] else "-"
+            print(f"{config['name']:<40} {_fmt(r['rtf'], '.3f'):>8} {_fmt(r['cer'], '.2%'):>7} "
+                  f"{_fmt(r.get('timing_mean_ms'), '.0f', 'ms'):>8} {_fmt(r.get('timing_p50_ms'), '.0f', 'ms'):>8} "
+                  f"{_fmt(r.get('timing_p90_ms'), '.0f', 'ms'):>8} {peak:>9}")
+    return results
+
+
+def pick_cheapest(results, max_cer=None, max_timing_ms=None):
+    """满足质量要求（CER、p90 逐字时间误差）的配置中 RTF 最小的；缺少 RTF 或 CER 的配置不参与"""
+    passing = [
+        (r["rtf"], name) for name, r in results.items()
+        if r["rtf"] is not None and r["cer"] is not None
+        and (max_cer is None or r["cer"] <= max_cer)
+        and (max_timing_ms is None or r.get("timing_p90_ms", float("inf")) <= max_timing_ms)
+    ]
+    return min(passing)[1] if passing else None
+
+
+def compare(results, baseline, threshold, cer_tolerance):
+    """与基线对比：RTF、p90 时间误差变差超过 threshold（比例），或 CER 增加超过 cer_tolerance（绝对值）"""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("rtf", "timing_p90_ms"):
+            if base.get(metric) and value.get(metric) is not None \
+                    and value[metric] > base[metric] * (1 + threshold):
+                regressions.append((name, metric, base[metric], value[metric]))
+        if value["cer"] is not None and base.get("cer") is not None \
+                and value["cer"] > base["cer"] + cer_tolerance:
+            regressions.append((name, "cer", base["cer"], value["cer"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别准确率 / 速度基准测试")
+    parser.add_argument("--songs", required=True, help="歌曲集目录（音频 + 同名参考 .ass）")
+    parser.add_argument("--configs", nargs="+", required=True,
+                        help="配置列表，每个为 后端:模型[:参数=值,...]，如 whisper:medium:beam_size=5")
+    parser.add_argument("--st_type", choices=["s", "t"], default="s", help="参考字幕的简繁 (默认: s)")
+    parser.add_argument("--max_cer", type=float, help="质量要求：CER 上限，如 0.08")
+    parser.add_argument("--max_timing_ms", type=float, help="质量要求：p90 逐字时间误差上限（毫秒）")
+    parser.add_argument("--save", help="将结果保存为基线 JSON")
+    parser.add_argument("--baseline", help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="RTF / 时间误差回退阈值 (默认: 0.2)")
+    parser.add_argument("--cer_tolerance", type=float, default=0.01, help="CER 回退阈值，绝对值 (默认: 0.01)")
+    args = parser.parse_args()
+
+    songs = find_songs(args.songs)
+    if not songs:
+        print(f"❌ {args.songs} 中没有带参考 .ass 的音频")
+        sys.exit(1)
+    print(f"{len(songs)} 首歌曲，{len(args.configs)} 个配置")
+    results = run([parse_config(c) for c in args.configs], songs, args.st_type)
+
+    if args.max_cer is not None or args.max_timing_ms is not None:
+        best = pick_cheapest(results, args.max_cer, args.max_timing_ms)
+        print(f"✅ 达标的最快配置: {best}" if best else "❌ 没有配置达到质量要求")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"✅ 基线已保存: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.cer_tolerance)
+        if regressions:
+            print("❌ 回退：")
+            for name, metric, old, new in regressions:
+                print(f"  {name} {metric}: {old:.6g} → {new:.6g}")
+            sys.exit(1)
+        print("✅ 无回退")
+
+
+if __name__ == "__main__":
+    main()
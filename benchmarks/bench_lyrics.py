@@ -0,0 +1,150 @@
+"""
+歌词 / ASS 处理热点函数的基准测试。
+
+每个函数在 1×、10×、100×（可选 1000×）歌曲长度的合成数据上运行，报告耗时与峰值内存（tracemalloc），
+可保存为基线，之后与基线对比标记性能回退。
+
+python benchmarks/bench_lyrics.py                               # 运行并打印
+python benchmarks/bench_lyrics.py --save benchmarks/baseline.json
+python benchmarks/bench_lyrics.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_whisper_result, make_edited_lyrics  # noqa: E402
+from generate_ass import whisper_to_ass  # noqa: E402
+from update_lyric import replace_ass_lyrics  # noqa: E402
+from convert_chinese import convert_file  # noqa: E402
+from utils.sequence_diff import find_misalignment_intervals  # noqa: E402
+from utils.st_utils import simplized, traditionalized  # noqa: E402
+from utils.ass_document import AssDocument, AssTime  # noqa: E402
+
+
+def _measure(func, repeat):
+    """返回 (耗时中位数, 最短耗时, 峰值内存字节)"""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+    # 峰值内存单独跑一次，避免 tracemalloc 影响计时
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), min(times), peak
+
+
+def build_cases(scale, work_dir):
+    """为某个规模准备输入数据，返回 {名称: 无参函数}"""
+    result = make_whisper_result(scale)
+    case_dir = os.path.join(work_dir, f"x{scale}")
+    os.makedirs(case_dir, exist_ok=True)
+    ass_path, raw_txt_path = whisper_to_ass(result, None, case_dir)
+
+    raw_lines = [seg["text"] for seg in result["segments"]]
+    edited_lines = make_edited_lyrics(raw_lines)
+    same_count_lines = make_edited_lyrics(raw_lines, edits_per_100_lines=0)
+    edited_txt = os.path.join(case_dir, "lyrics_edited.txt")
+    same_txt = os.path.join(case_dir, "lyrics_same.txt")
+    with open(edited_txt, "w", encoding="utf-8") as f:
+        f.write("\n".join(edited_lines))
+    with open(same_txt, "w", encoding="utf-8") as f:
+        f.write("\n".join(same_count_lines))
+
+    old_str = "".join(raw_lines)
+    new_str = "".join(edited_lines).replace(" ", "")
+    text = "\n".join(raw_lines)
+    trad_text = traditionalized(text)
+    out_ass = os.path.join(case_dir, "lyrics.ass")
+    out_txt = os.path.join(case_dir, "converted.txt")
+    times = [e.start for e in AssDocument.load(ass_path).dialogues]
+    time_strs = [str(AssTime(t)) for t in times]
+
+    return {
+        "whisper_to_ass": lambda: whisper_to_ass(result, None, case_dir),
+        "replace_ass_lyrics": lambda: replace_ass_lyrics(same_txt, ass_path, out_ass, interactive=False),
+        "replace_ass_lyrics_edited": lambda: replace_ass_lyrics(edited_txt, ass_path, out_ass,
+                                                                interactive=False),
+        "find_misalignment_intervals": lambda: find_misalignment_intervals(old_str, new_str, 3, 10),
+        "convert_file": lambda: convert_file(raw_txt_path, "t", out_txt),
+        "traditionalized": lambda: traditionalized(text),
+        "simplized": lambda: simplized(trad_text),
+        "ass_time_parse": lambda: [AssTime(s) for s in time_strs],
+        "ass_time_format": lambda: [str(AssTime(t)) for t in times],
+    }
+
+
+def run(scales, repeat, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in scales:
+            for name, func in build_cases(scale, work_dir).items():
+                if only and name not in only:
+                    continue
+                median, best, peak = _measure(func, repeat if scale < 100 else 1)
+                key = f"{name}@x{scale}"
+                results[key] = {"median_s": median, "min_s": best, "peak_bytes": peak}
+                print(f"{key:<40} {median * 1000:>10.2f} ms {peak / 1024:>12.1f} KiB")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """与基线对比，返回回退项列表"""
+    regressions = []
+    for key, value in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("median_s", "peak_bytes"):
+            if base[metric] and value[metric] > base[metric] * (1 + threshold):
+                regressions.append((key, metric, base[metric], value[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="歌词/ASS 处理基准测试")
+    parser.add_argument("--scales", default="1,10,100", help="歌曲长度倍数，逗号分隔 (默认: 1,10,100)")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取中位数 (默认: 5)")
+    parser.add_argument("--only", help="只运行指定函数，逗号分隔")
+    parser.add_argument("--save", help="将结果保存为基线 JSON")
+    parser.add_argument("--baseline", help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回退阈值 (默认: 0.2，即慢 20%%)")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    results = run(scales, args.repeat, only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ 基线已保存: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("❌ 性能回退：")
+            for key, metric, old, new in regressions:
+                print(f"  {key} {metric}: {old:.6g} → {new:.6g} ({new / old - 1:+.0%})")
+            sys.exit(1)
+        print("✅ 无性能回退")
+
+
+if __name__ == "__main__":
+    main()
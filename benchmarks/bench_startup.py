@@ -0,0 +1,113 @@
+"""
+CLI 启动开销基准测试：在子进程中实际运行 main.py 的轻量子命令，报告总耗时与模块导入耗时，
+并检查这些子命令没有导入 whisper/torch、numpy、moviepy 等较重的依赖。
+
+python benchmarks/bench_startup.py                 # 运行并打印
+python benchmarks/bench_startup.py --max_ms 300    # 任一子命令中位数超过 300ms 或导入了重依赖时返回非 0
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_whisper_result, make_edited_lyrics  # noqa: E402
+from generate_ass import whisper_to_ass  # noqa: E402
+
+# 不需要识别/渲染的子命令不应导入的模块
+HEAVY_MODULES = ("torch", "whisper", "faster_whisper", "ctranslate2", "numpy", "moviepy")
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def build_cases(work_dir):
+    """准备一首合成歌曲的输出目录，返回 {名称: main.py 参数列表}"""
+    result = make_whisper_result()
+    ass_path, raw_txt_path = whisper_to_ass(result, None, work_dir)
+    # 字数不变：retime 测量的是启动与常规更新时间轴的开销，不走字数不一致时的重新分配
+    edited = make_edited_lyrics([seg["text"] for seg in result["segments"]], edits_per_100_lines=0)
+    txt_path = os.path.join(work_dir, "lyrics.txt")
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(edited))
+    audio = os.path.join(work_dir, "song.mp3")
+
+    return {
+        "help": ["--help"],
+        "retime": ["retime", "--audio", audio, "--output_dir", work_dir, "--yes", "--force"],
+        "convert": ["convert", raw_txt_path, "--st_type", "t", "--output", os.path.join(work_dir, "t.txt")],
+        # 视频不存在，ffmpeg 立即失败：测量的是导入与分发开销
+        "burn": ["burn", "--video", os.path.join(work_dir, "missing.mp4"), "--ass", ass_path,
+                 "--output", os.path.join(work_dir, "out.mp4")],
+    }
+
+
+def _run_once(argv):
+    """返回 (总耗时秒, 导入耗时秒, 导入的顶层模块集合)"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py")] + argv,
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    import_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        modules.add(match.group(4).split(".")[0])
+        # 只累加最外层导入的累计耗时
+        if len(match.group(3)) == 1:
+            import_us += int(match.group(2))
+    return wall, import_us / 1e6, modules
+
+
+def run(repeat, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        cases = build_cases(work_dir)
+        print(f"{'command':<12} {'median':>10} {'imports':>10}  heavy modules")
+        for name, argv in cases.items():
+            if only and name not in only:
+                continue
+            runs = [_run_once(argv) for _ in range(repeat)]
+            heavy = sorted(set.union(*(m for _, _, m in runs)) & set(HEAVY_MODULES))
+            results[name] = {
+                "median_s": statistics.median(r[0] for r in runs),
+                "import_s": statistics.median(r[1] for r in runs),
+                "heavy": heavy,
+            }
+            r = results[name]
+            print(f"{name:<12} {r['median_s'] * 1000:>8.1f}ms {r['import_s'] * 1000:>8.1f}ms  {', '.join(heavy) or '-'}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 启动开销基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取中位数 (默认: 5)")
+    parser.add_argument("--only", help="只运行指定子命令，逗号分隔")
+    parser.add_argument("--max_ms", type=float, help="中位数耗时上限（毫秒），超过时返回非 0")
+    args = parser.parse_args()
+
+    only = set(args.only.split(",")) if args.only else None
+    results = run(args.repeat, only)
+
+    failures = [f"{name} 导入了 {', '.join(r['heavy'])}" for name, r in results.items() if r["heavy"]]
+    if args.max_ms:
+        failures += [f"{name} {r['median_s'] * 1000:.1f}ms > {args.max_ms}ms"
+                     for name, r in results.items() if r["median_s"] * 1000 > args.max_ms]
+    if failures:
+        print("❌ 启动开销回退：")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("✅ 轻量子命令未导入重依赖")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+基准测试用的合成数据：Whisper 风格的识别结果、ass 字幕、人工修改后的歌词。
+歌曲由若干主歌 + 重复的副歌组成，scale 为歌曲长度倍数（1 约为一首 4 分钟的歌）。
+"""
+import random
+
+_CHARS = '我你他的爱人天空海阔心中梦想在远方风雨花开落时光走过回忆永远不会忘记夜晚星辰'
+_VERSE_LINES = 6
+_CHORUS_LINES = 4
+_SECTIONS = 4
+
+
+def _random_line(rng, min_len=6, max_len=12):
+    return ''.join(rng.choice(_CHARS) for _ in range(rng.randint(min_len, max_len)))
+
+
+def make_lyric_lines(scale=1, seed=0):
+    """生成歌词行：每段主歌不同，副歌重复（scale 倍长度）"""
+    rng = random.Random(seed)
+    chorus = [_random_line(rng) for _ in range(_CHORUS_LINES)]
+    lines = []
+    for _ in range(_SECTIONS * scale):
+        lines += [_random_line(rng) for _ in range(_VERSE_LINES)]
+        lines += chorus
+    return lines
+
+
+def make_whisper_result(scale=1, seed=0):
+    """生成与 model.transcribe(..., word_timestamps=True) 结构相同的结果"""
+    rng = random.Random(seed)
+    t = 5.0
+    segments = []
+    for i, line in enumerate(make_lyric_lines(scale, seed)):
+        words = []
+        for ch in line:
+            dur = round(rng.uniform(0.15, 0.6), 2)
+            words.append({"word": ch, "start": round(t, 2), "end": round(t + dur, 2), "probability": 0.9})
+            t += dur
+        segments.append({
+            "id": i,
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": line,
+            "words": words,
+        })
+        # 行间停顿
+        t += rng.uniform(0.3, 3.0)
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "zh"}
+
+
+def make_edited_lyrics(lines, seed=0, edits_per_100_lines=3):
+    """
+    模拟人工修改：重新断行、加空格，并注入少量增删改（字数会变化）。
+    :param edits_per_100_lines: 每 100 行的增删改次数，为 0 时原样返回（字数不变的情况）
+    :return: 修改后的歌词行
+    """
+    if edits_per_100_lines <= 0:
+        return list(lines)
+    rng = random.Random(seed)
+    chars = list(''.join(lines))
+    edits = len(lines) * edits_per_100_lines // 100
+    for _ in range(edits):
+        pos = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            del chars[pos]
+        elif op < 0.8:
+            chars.insert(pos, rng.choice(_CHARS))
+        else:
+            chars[pos] = rng.choice(_CHARS)
+
+    text = ''.join(chars)
+    new_lines = []
+    i = 0
+    while i < len(text):
+        n = rng.randint(4, 14)
+        part = text[i:i + n]
+        if rng.random() < 0.2:
+            part = ' '.join(part[j:j + 2] for j in range(0, len(part), 2))
+        new_lines.append(part)
+        i += n
+    return new_lines
@@ -0,0 +1,369 @@
+import os
+import re
+import shutil
+import tempfile
+import argparse
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.ass_document import AssDocument
+from utils import media_probe
+from utils.ffmpeg_utils import filter_path, run_ffmpeg, split_filter_graph
+
+_KARAOKE_TAG = re.compile(r'(\\[kK][fo]?)(\d+)')
+
+
+def burn_ass(video_input, ass_path, output_path, threads=None):
+    # ffmpeg -i audio.mp4 -vf ass=lyrics.ass output.mp4
+    run_ffmpeg([
+        "-i", video_input,
+        "-vf", f"ass={filter_path(ass_path)}",
+        *(["-threads", str(threads)] if threads else []),
+        output_path
+    ])
+
+
+def burn_ass_variants(video_input, variants, threads=None):
+    """
+    一次 ffmpeg 运行写入多个版本的字幕：视频只解码一次，split 成多路后各自缩放、写入字幕并分别编码
+    :param variants: [{"ass": 字幕路径, "output": 输出路径, "width": 宽, "height": 高}, ...]，宽高为空时保持原尺寸
+    """
+    filter_graph, video_labels, _ = split_filter_graph("0:v", variants)
+    outputs = []
+    for variant, video_label in zip(variants, video_labels):
+        outputs += [
+            "-map", video_label,
+            "-map", "0:a?",
+            *(["-threads", str(threads)] if threads else []),
+            variant["output"]
+        ]
+    run_ffmpeg([
+        "-i", video_input,
+        "-filter_complex", filter_graph,
+        *outputs
+    ])
+
+
+def _trim_karaoke(text, trim_cs):
+    """从歌词开头扣除 trim_cs 百分秒的卡拉OK时长，用于开头被截断的字幕行"""
+    remaining = [trim_cs]
+
+    def repl(match):
+        dur = int(match.group(2))
+        cut = min(dur, remaining[0])
+        remaining[0] -= cut
+        return f"{match.group(1)}{dur - cut}"
+
+    return _KARAOKE_TAG.sub(repl, text)
+
+
+def shift_ass(ass_path, output_path, offset_cs, end_cs=None):
+    """
+    将 ass 字幕整体前移 offset_cs 百分秒，只保留与 [offset_cs, end_cs) 有交集的字幕行。
+    开头早于 offset_cs 的行从 0 开始，并扣除已经唱过部分的卡拉OK时长，保证逐字高亮位置不变。
+    """
+    doc = AssDocument.load(ass_path)
+    events = []
+    for event in doc.events:
+        if event.end <= offset_cs or (end_cs is not None and event.start >= end_cs):
+            continue
+        start = event.start - offset_cs
+        text = event.text
+        if start < 0:
+            text = _trim_karaoke(text, -start)
+            start = 0
+        events.append(event.copy(start=start, end=event.end - offset_cs, text=text))
+    doc.set_events(events)
+    doc.save(output_path)
+
+
+def split_at_keyframes(keyframes, duration, jobs):
+    """把 [0, duration) 按关键帧切成最多 jobs 段，切点取最接近均分点的关键帧"""
+    cuts = []
+    for i in range(1, jobs):
+        target = duration * i / jobs
+        nearest = min(keyframes, key=lambda k: abs(k - target), default=None)
+        if nearest is not None and 0 < nearest < duration and (not cuts or nearest > cuts[-1]):
+            cuts.append(nearest)
+    bounds = [0.0] + cuts + [duration]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def concat_with_audio(chunk_videos, video_input, output_path, work_dir, output_args=()):
+    """
+    无损拼接各段视频流，并合并原视频的音频
+    :param output_args: 追加的输出参数（如 -video_track_timescale）
+    """
+    list_path = os.path.join(work_dir, "concat.txt")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in chunk_videos:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    run_ffmpeg([
+        "-f", "concat",
+        "-safe", "0",
+        "-i", list_path,
+        "-i", video_input,
+        "-map", "0:v",
+        "-map", "1:a?",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        *output_args,
+        output_path
+    ], quiet=True)
+
+
+def burn_ass_parallel(video_input, ass_path, output_path, jobs=None):
+    """
+    并行写入字幕：按关键帧把视频切成 jobs 段，每段用各自平移后的字幕同时编码，
+    再无损拼接视频流并合并原音频。
+    :param jobs: 并行的 ffmpeg 进程数，默认为 CPU 核数
+    """
+    jobs = jobs or os.cpu_count() or 1
+    duration = media_probe.duration(video_input)
+    ranges = split_at_keyframes(media_probe.keyframes(video_input), duration, jobs)
+    if len(ranges) <= 1:
+        burn_ass(video_input, ass_path, output_path)
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // len(ranges))
+    print(f"视频切分为 {len(ranges)} 段并行写入字幕，每段 {threads} 线程")
+    work_dir = tempfile.mkdtemp(prefix="burn_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        def burn_chunk(index):
+            start, end = ranges[index]
+            chunk_ass = os.path.join(work_dir, f"chunk_{index}.ass")
+            chunk_video = os.path.join(work_dir, f"chunk_{index}.mp4")
+            shift_ass(ass_path, chunk_ass, round(start * 100), round(end * 100))
+            run_ffmpeg([
+                "-ss", f"{start:.6f}",
+                "-i", video_input,
+                "-t", f"{end - start:.6f}",
+                "-map", "0:v:0",
+                "-an",
+                "-vf", f"ass={filter_path(chunk_ass)}",
+                "-threads", str(threads),
+                chunk_video
+            ], quiet=True)
+            return chunk_video
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            chunk_videos = list(pool.map(burn_chunk, range(len(ranges))))
+
+        concat_with_audio(chunk_videos, video_input, output_path, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# 可以和重新编码的片段直接拼接的源视频编码：编码器、转为 Annex B 的比特流滤镜
+_COPY_CODECS = {
+    "h264": ("libx264", "h264_mp4toannexb"),
+    "hevc": ("libx265", "hevc_mp4toannexb"),
+}
+
+# ffprobe 的 h264 profile 名称 → libx264 的 -profile:v
+_X264_PROFILES = {
+    "Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+    "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444",
+}
+# ffprobe 的 hevc profile 名称 → libx265 的 -profile:v
+_X265_PROFILES = {"Main": "main", "Main 10": "main10", "Main Still Picture": "mainstillpicture"}
+
+
+def matching_encode_args(video, codec):
+    """
+    重新编码片段使用的编码参数：与源视频流的 profile、level、像素格式、帧率、SAR 和色彩信息一致，
+    这样拼接后整条视频流的参数不变，播放器不会在片段交界处出错
+    :param video: ffprobe 的视频流信息（MediaInfo.video）
+    :param codec: 源视频编码，_COPY_CODECS 中的键
+    :return: (追加到 -vf 的滤镜, 编码参数列表)
+    """
+    encoder, _ = _COPY_CODECS[codec]
+    args = ["-c:v", encoder, "-pix_fmt", video.get("pix_fmt", "yuv420p")]
+
+    profile = (_X264_PROFILES if codec == "h264" else _X265_PROFILES).get(video.get("profile"))
+    if profile:
+        args += ["-profile:v", profile]
+    level = video.get("level", -1)
+    if level > 0:
+        if codec == "h264":
+            args += ["-level:v", f"{level / 10:g}"]
+        else:
+            # hevc 的 level 为 30 × 级别号，libx265 只能通过 x265-params 指定
+            args += ["-x265-params", f"level-idc={level / 30:g}:log-level=error"]
+
+    # 恒定帧率时固定输出帧率；可变帧率保留原时间戳
+    rate = video.get("r_frame_rate")
+    if rate and rate != "0/0" and rate == video.get("avg_frame_rate"):
+        args += ["-r", rate]
+    for key, option in (("color_range", "-color_range"), ("color_space", "-colorspace"),
+                        ("color_primaries", "-color_primaries"), ("color_transfer", "-color_trc")):
+        if video.get(key) not in (None, "unknown", "reserved"):
+            args += [option, video[key]]
+
+    sar = video.get("sample_aspect_ratio", "")
+    video_filter = f",setsar={sar.replace(':', '/')}" if sar and not sar.startswith("0:") else ""
+    return video_filter, args
+
+
+def copy_segments(video_input, cuts, work_dir, bsf):
+    """
+    一次 ffmpeg 运行把视频流按关键帧切成 len(cuts) + 1 段（不重新编码）。
+    segment 复用器按数据包切分，只在关键帧处开始新的一段，段与段之间不会有重复或缺失的帧
+    （逐段用 -ss/-t 复制时，B 帧解码顺序会把下一个关键帧也带进来）。
+    :param cuts: 切分时间（秒），必须是关键帧时间
+    :return: 各段路径；实际段数不对时返回 None
+    """
+    pattern = os.path.join(work_dir, "copy_%d.ts")
+    run_ffmpeg([
+        "-i", video_input,
+        "-map", "0:v:0",
+        "-an",
+        "-c:v", "copy",
+        "-bsf:v", bsf,
+        "-f", "segment",
+        "-segment_format", "mpegts",
+        # 略早于关键帧，避免小数舍入后落在关键帧之后而切到下一个关键帧
+        "-segment_times", ",".join(f"{max(t - 0.0005, 0):.6f}" for t in cuts),
+        pattern
+    ], quiet=True)
+    paths = [pattern % i for i in range(len(cuts) + 1)]
+    if not all(os.path.exists(p) for p in paths) or os.path.exists(pattern % (len(cuts) + 1)):
+        return None
+    return paths
+
+
+def dialogue_ranges(ass_path):
+    """ass 中所有 Dialogue 行覆盖的时间区间（秒），已排序"""
+    doc = AssDocument.load(ass_path)
+    return sorted((e.start / 100, e.end / 100) for e in doc.dialogues if e.end > e.start)
+
+
+def plan_spans(ranges, keyframes, duration, min_copy=2.0):
+    """
+    把 [0, duration) 划分为需要重新编码（有字幕）和可以直接复制（无字幕）的片段。
+    有字幕的区间向前扩展到之前最近的关键帧、向后扩展到之后最近的关键帧，保证复制的片段从关键帧开始；
+    相邻编码片段之间的空隙短于 min_copy 秒时合并，不值得单独复制。
+    :return: [(start, end, 是否重新编码), ...]，首尾相接
+    """
+    frames = sorted(k for k in keyframes if 0 < k < duration)
+    encode = []
+    for start, end in ranges:
+        start, end = max(start, 0.0), min(end, duration)
+        if end <= start:
+            continue
+        i = bisect_right(frames, start) - 1
+        j = bisect_left(frames, end)
+        start = frames[i] if i >= 0 else 0.0
+        end = frames[j] if j < len(frames) else duration
+        if encode and start - encode[-1][1] < min_copy:
+            encode[-1][1] = max(encode[-1][1], end)
+        else:
+            encode.append([start, end])
+    if encode and encode[0][0] < min_copy:
+        encode[0][0] = 0.0
+    if encode and duration - encode[-1][1] < min_copy:
+        encode[-1][1] = duration
+
+    spans = []
+    cursor = 0.0
+    for start, end in encode:
+        if start > cursor:
+            spans.append((cursor, start, False))
+        spans.append((start, end, True))
+        cursor = end
+    if cursor < duration:
+        spans.append((cursor, duration, False))
+    return spans
+
+
+def burn_ass_copy_gaps(video_input, ass_path, output_path, jobs=1, min_copy=2.0):
+    """
+    只重新编码有字幕的片段：按 Dialogue 时间区间找出没有字幕的片段（前奏、间奏、尾奏），
+    在关键帧处切开直接复制视频流，有字幕的片段用平移后的字幕、与源视频一致的编码参数重新编码，
+    最后拼接并合并原音频。
+    源视频编码不是 h264/hevc，或没有可以复制的片段时，退化为 burn_ass。
+    :param jobs: 同时编码的片段数
+    :param min_copy: 短于该秒数的无字幕片段不单独复制
+    """
+    info = media_probe.probe(video_input)
+    codec = info.video.get("codec_name") if info.video else None
+    if codec not in _COPY_CODECS:
+        print(f"⚠️ 视频编码 {codec} 不支持分段复制，整体重新编码")
+        burn_ass(video_input, ass_path, output_path)
+        return
+
+    # 关键帧为绝对时间戳，字幕和 -ss 都以文件开始时间为 0
+    origin = float(info.data.get("format", {}).get("start_time", 0) or 0)
+    keyframes = [k - origin for k in media_probe.closed_keyframes(video_input)]
+    spans = plan_spans(dialogue_ranges(ass_path), keyframes, info.duration, min_copy)
+    if all(encode for _, _, encode in spans):
+        print("没有可以直接复制的片段（或关键帧都在开放 GOP 中），整体重新编码")
+        burn_ass(video_input, ass_path, output_path)
+        return
+    copied = sum(end - start for start, end, encode in spans if not encode)
+    print(f"视频分为 {len(spans)} 段，直接复制 {copied:.1f} 秒（{copied / info.duration:.0%}），其余重新编码")
+
+    _, bsf = _COPY_CODECS[codec]
+    video_filter, encode_args = matching_encode_args(info.video, codec)
+    threads = max(1, (os.cpu_count() or 1) // max(1, jobs))
+    work_dir = tempfile.mkdtemp(prefix="burn_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # MPEG-TS 中参数集随关键帧写入，复制的片段和重新编码的片段可以直接拼接
+        copies = copy_segments(video_input, [start for start, _, _ in spans[1:]], work_dir, bsf)
+        if copies is None:
+            print("⚠️ 关键帧切分结果与计划不一致，整体重新编码")
+            burn_ass(video_input, ass_path, output_path)
+            return
+
+        def encode_span(index):
+            start, end, _ = spans[index]
+            chunk_ass = os.path.join(work_dir, f"chunk_{index}.ass")
+            chunk_video = os.path.join(work_dir, f"chunk_{index}.ts")
+            shift_ass(ass_path, chunk_ass, round(start * 100), round(end * 100))
+            run_ffmpeg([
+                "-ss", f"{start:.6f}",
+                "-i", video_input,
+                "-t", f"{end - start:.6f}",
+                "-map", "0:v:0",
+                "-an",
+                "-vf", f"ass={filter_path(chunk_ass)}{video_filter}",
+                *encode_args,
+                "-threads", str(threads),
+                chunk_video
+            ], quiet=True)
+            return chunk_video
+
+        encoded = [i for i, (_, _, encode) in enumerate(spans) if encode]
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            for index, chunk_video in zip(encoded, pool.map(encode_span, encoded)):
+                copies[index] = chunk_video
+
+        # mp4 的视频时间刻度与源视频一致
+        time_base = info.video.get("time_base", "")
+        timescale = time_base.split("/")[1] if time_base.startswith("1/") else None
+        concat_with_audio(copies, video_input, output_path, work_dir,
+                          ["-video_track_timescale", timescale] if timescale else [])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="视频写入 ass 字幕")
+    parser.add_argument("--video", required=True, help="输入视频路径")
+    parser.add_argument("--ass", required=True, help="ass 字幕路径")
+    parser.add_argument("--output", default="output.mp4", help="输出视频路径 (默认: output.mp4)")
+    parser.add_argument("--jobs", type=int, default=1, help="并行 ffmpeg 进程数 (默认: 1，不切分)")
+    parser.add_argument("--copy_gaps", action="store_true", help="没有字幕的片段直接复制，只重新编码有字幕的片段")
+
+    args = parser.parse_args()
+    if args.copy_gaps:
+        burn_ass_copy_gaps(args.video, args.ass, args.output, args.jobs)
+    elif args.jobs > 1:
+        burn_ass_parallel(args.video, args.ass, args.output, args.jobs)
+    else:
+        burn_ass(args.video, args.ass, args.output)
+
+# example usage:
+# python burn_subtitle.py --video inputs/video.mp4 --ass inputs/lyrics.ass --output video_subtitled.mp4 --jobs 8
+# python burn_subtitle.py --video inputs/mv.mp4 --ass inputs/lyrics.ass --output mv_subtitled.mp4 --copy_gaps
@@ -1,5 +1,41 @@
-from utils.st_utils import traditionalized, simplized
+from utils.st_utils import traditionalized, simplized, convert_stream
+from concurrent.futures import ProcessPoolExecutor
 import os
+import re
+
+# ass 歌词中的 {...} 标签
+_ASS_TAG = re.compile(r'(\{[^}]*\})')
+
+# 大文件按块读取转换，每块字符数
+CHUNK_SIZE = 1 << 20
+
+
+def _normalize_mode(mode: str) -> str:
+    if mode.lower() in ('t', 'trad', 'traditional'):
+        return 't'
+    if mode.lower() in ('s', 'simp', 'simplified'):
+        return 's'
+    raise ValueError("mode 参数必须是 's' (简体) 或 't' (繁体)")
+
+
+def convert_text(text: str, mode: str) -> str:
+    """转换字符串为简体或繁体"""
+    return traditionalized(text) if _normalize_mode(mode) == 't' else simplized(text)
+
+
+def _convert_path(txt_path: str, mode: str, output_path: str):
+    def read_chunks(f):
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    with open(txt_path, 'r', encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as dst:
+        for converted in convert_stream(read_chunks(src), mode):
+            dst.write(converted)
+    return output_path
+
 
 def convert_file(txt_path: str, mode: str, output_path: str):
     """
@@ -11,23 +47,85 @@ def convert_file(txt_path: str, mode: str, output_path: str):
     if not os.path.exists(txt_path):
         raise FileNotFoundError(f"输入文件不存在：{txt_path}")
 
-    with open(txt_path, 'r', encoding='utf-8') as f:
-        text = f.read()
+    mode = _normalize_mode(mode)
+    direction = "简体 → 繁体" if mode == 't' else "繁体 → 简体"
+    _convert_path(txt_path, mode, output_path)
 
-    if mode.lower() in ('t', 'trad', 'traditional'):
-        result = traditionalized(text)
-        direction = "简体 → 繁体"
-    elif mode.lower() in ('s', 'simp', 'simplified'):
-        result = simplized(text)
-        direction = "繁体 → 简体"
+    print(f"✅ 转换完成：{direction}")
+    print(f"📄 输出文件：{output_path}")
+
+
+def convert_ass_text(text: str, mode: str) -> str:
+    """
+    转换一行 ass 歌词的简繁，{...} 标签原样保留。
+    标签之间的文字拼接后整体转换（词组可以跨越逐字标签），再按原长度切回各段。
+    """
+    parts = _ASS_TAG.split(text)
+    plain = parts[::2]
+    joined = convert_text(''.join(plain), mode)
+    if len(joined) == sum(len(p) for p in plain):
+        pos = 0
+        for i in range(0, len(parts), 2):
+            length = len(parts[i])
+            parts[i] = joined[pos:pos + length]
+            pos += length
     else:
-        raise ValueError("mode 参数必须是 's' (简体) 或 't' (繁体)")
+        # 转换改变了长度时退化为逐段转换
+        for i in range(0, len(parts), 2):
+            parts[i] = convert_text(parts[i], mode)
+    return ''.join(parts)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(result)
 
-    print(f"✅ 转换完成：{direction}")
-    print(f"📄 输出文件：{output_path}")
+def convert_ass(ass_path: str, mode: str, output_path: str):
+    """
+    转换 ass 字幕中所有 Dialogue 歌词的简繁，时间和卡拉OK标签不变，
+    用于从同一份时间轴生成简体/繁体两个版本的字幕。
+    """
+    from utils.ass_document import AssDocument
+
+    doc = AssDocument.load(ass_path)
+    doc.set_events([
+        event.copy(text=convert_ass_text(event.text, mode)) if event.kind == 'Dialogue' else event
+        for event in doc.events
+    ])
+    doc.save(output_path)
+    return output_path
+
+
+def convert_files(txt_paths, mode: str, output_dir: str = None, workers: int = None):
+    """
+    批量转换多个文本文件（如整个歌词库），多进程并行。
+    :param txt_paths: 输入txt文件路径列表
+    :param mode: 's' 表示转简体，'t' 表示转繁体
+    :param output_dir: 输出目录，为 None 时原地覆盖
+    :param workers: 进程数，默认为 CPU 核数
+    :return: 输出文件路径列表
+    """
+    mode = _normalize_mode(mode)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for path in txt_paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"输入文件不存在：{path}")
+        output_path = os.path.join(output_dir, os.path.basename(path)) if output_dir else path
+        jobs.append((path, output_path))
+
+    # 原地覆盖时先写到临时文件
+    def temp_of(src, dst):
+        return dst + '.tmp' if src == dst else dst
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_convert_path, src, mode, temp_of(src, dst)) for src, dst in jobs]
+        for future in futures:
+            future.result()
+    for src, dst in jobs:
+        if src == dst:
+            os.replace(dst + '.tmp', dst)
+
+    print(f"✅ 批量转换完成：{len(jobs)} 个文件")
+    return [dst for _, dst in jobs]
+
 
 if __name__ == "__main__":
     # 示例用法
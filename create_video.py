@@ -1,5 +1,7 @@
 import argparse
-from moviepy.editor import ImageClip, AudioFileClip
+
+from utils import media_probe
+from utils.ffmpeg_utils import filter_path, run_ffmpeg, split_filter_graph
 
 def image_to_video(image_path, audio_path, output_path="output.mp4", volume=1.0):
     """
@@ -9,9 +11,12 @@ def image_to_video(image_path, audio_path, output_path="output.mp4", volume=1.0)
     :param output_path: 输出视频路径 (默认 output.mp4)
     :param volume: 音量大小 (1.0为原音量，0.5为一半音量)
     """
+    # moviepy 导入较慢，只有这个函数用到
+    from moviepy.editor import ImageClip, AudioFileClip
+
     # 加载音频
     audio = AudioFileClip(audio_path).volumex(volume)
-    duration = audio.duration  # 音频持续时间
+    duration = media_probe.duration(audio_path)  # 音频持续时间
     print(duration)
 
     # 创建图片视频片段（持续时间与音频相同）
@@ -36,15 +41,95 @@ def image_to_video(image_path, audio_path, output_path="output.mp4", volume=1.0)
     print(f"✅ 视频已生成: {output_path}")
     # print(f"🎵 音频长度: {duration:.2f} 秒")
 
+def image_to_video_with_ass(image_path, audio_path, ass_path, output_path="output.mp4", volume=1.0,
+                            fps=24, width=720, height=480, threads=None):
+    """
+    单次 ffmpeg 编码生成带字幕的视频：循环单张图片 + 背景音乐 + ass 字幕
+    与 image_to_video + burn_ass 相比，不经过 moviepy 逐帧渲染，也不生成中间视频，只编码一次
+    :param image_path: 图片路径 (jpg/png/jpeg)
+    :param audio_path: 音频路径 (mp3)
+    :param ass_path: ass 字幕路径
+    :param output_path: 输出视频路径 (默认 output.mp4)
+    :param volume: 音量大小 (1.0为原音量，0.5为一半音量)
+    :param fps: 帧率
+    :param width: 视频宽度
+    :param height: 视频高度
+    :param threads: ffmpeg 编码线程数，默认由 ffmpeg 决定
+    """
+    filter_graph = (
+        f"[0:v]scale={width}:{height},format=yuv420p,ass={filter_path(ass_path)}[v];"
+        f"[1:a]volume={volume}[a]"
+    )
+    run_ffmpeg([
+        "-loop", "1",
+        "-framerate", str(fps),
+        "-i", image_path,
+        "-i", audio_path,
+        "-filter_complex", filter_graph,
+        "-map", "[v]",
+        "-map", "[a]",
+        "-c:v", "libx264",
+        "-tune", "stillimage",
+        "-c:a", "aac",
+        "-shortest",
+        "-movflags", "+faststart",
+        *(["-threads", str(threads)] if threads else []),
+        output_path
+    ])
+
+    print(f"✅ 视频已生成: {output_path}")
+
+
+def image_to_videos_with_ass(image_path, audio_path, variants, volume=1.0, fps=24, threads=None):
+    """
+    一次 ffmpeg 运行生成多个版本（如简体/繁体、不同分辨率）：图片和音频只解码一次，
+    split 成多路后各自缩放、写入字幕并分别编码
+    :param variants: [{"ass": 字幕路径, "output": 输出路径, "width": 宽, "height": 高}, ...]
+    :param threads: ffmpeg 编码线程数，默认由 ffmpeg 决定
+    """
+    variants = [{"width": 720, "height": 480, **v} for v in variants]
+    filter_graph, video_labels, audio_labels = split_filter_graph(
+        "0:v", variants, prefix="format=yuv420p,", audio_in="1:a", audio_filter=f"volume={volume}"
+    )
+    outputs = []
+    for variant, video_label, audio_label in zip(variants, video_labels, audio_labels):
+        outputs += [
+            "-map", video_label,
+            "-map", audio_label,
+            "-c:v", "libx264",
+            "-tune", "stillimage",
+            "-c:a", "aac",
+            "-shortest",
+            "-movflags", "+faststart",
+            *(["-threads", str(threads)] if threads else []),
+            variant["output"]
+        ]
+    run_ffmpeg([
+        "-loop", "1",
+        "-framerate", str(fps),
+        "-i", image_path,
+        "-i", audio_path,
+        "-filter_complex", filter_graph,
+        *outputs
+    ])
+
+    for variant in variants:
+        print(f"✅ 视频已生成: {variant['output']}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="图片 + 音频生成视频")
     parser.add_argument("--image", required=True, help="输入图片路径 (jpg/png/jpeg)")
     parser.add_argument("--audio", required=True, help="输入音频路径 (mp3)")
     parser.add_argument("--output", default="output.mp4", help="输出视频文件名 (默认: output.mp4)")
     parser.add_argument("--volume", type=float, default=1.0, help="音量大小 (默认: 1.0，0.5为一半音量)")
+    parser.add_argument("--ass", help="ass 字幕路径（提供时单次编码直接写入字幕）")
 
     args = parser.parse_args()
-    image_to_video(args.image, args.audio, args.output, args.volume)
+    if args.ass:
+        image_to_video_with_ass(args.image, args.audio, args.ass, args.output, args.volume)
+    else:
+        image_to_video(args.image, args.audio, args.output, args.volume)
 
 # example usage:
 # python create_video.py --image img/cover.png --audio mp3/audio.mp3 --output mp4/video.mp4 --volume 1
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+
+from utils.word_timing import WordTiming, DEFAULT_HEADER, sidecar_path
+
+
+def format_ass_time(sec):
+    h = int(sec // 3600)
+    m = int((sec % 3600) // 60)
+    s = int(sec % 60)
+    cs = int((sec - int(sec)) * 100)
+    return f"{h:d}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+class AssWriter:
+    """
+    逐行写入 old_lyrics.ass 和 lyrics_raw.txt，每行写完立即落盘，
+    流式识别时边识别边输出，不需要整份识别结果都在内存中。
+    关闭时写入逐字时间旁路文件。
+    """
+
+    def __init__(self, output_dir, skip_credits=True):
+        """
+        :param skip_credits: 忽略 whisper 在开头或结尾附加的「詞曲 李宗盛」（歌词为已知文本时不需要）
+        """
+        self.skip_credits = skip_credits
+        self.ass_path = os.path.join(output_dir, "old_lyrics.ass")
+        self.txt_path = os.path.join(output_dir, "lyrics_raw.txt")
+        self._ass = open(self.ass_path, "w", encoding="utf-8")
+        self._txt = open(self.txt_path, "w", encoding="utf-8")
+        self._ass.write(DEFAULT_HEADER)
+        self.lines = 0
+        self._segments = 0
+        # 最后一个 segment 要等到结束时才知道是否需要忽略，先暂存
+        self._pending = None
+        # 逐字时间旁路文件的数据：绝对开始/结束（百分秒）、行号、文字
+        self._word_starts, self._word_ends, self._word_rows, self._word_texts = [], [], [], []
+
+    def add(self, seg):
+        self._segments += 1
+        # whisper有时会在开头或结尾添加「詞曲 李宗盛」，有则忽略
+        if self.skip_credits and self._segments == 1 and "李宗盛" in seg.get("text", ""):
+            return
+        if self._pending is not None:
+            self._write(self._pending)
+        self._pending = seg
+
+    def _write(self, seg):
+        words = seg.get("words", [])
+        if not words:
+            return
+
+        line_start = words[0]["start"]
+        line_end = words[-1]["end"]
+
+        ass_lyric = ""
+        text = ""
+
+        for w in words:
+            dur_cs = int((w["end"] - w["start"]) * 100)
+            ass_lyric += f"{{\\kf{dur_cs}}}{w['word']}"
+            text += w["word"]
+            self._word_starts.append(int(w["start"] * 100))
+            self._word_ends.append(int(w["end"] * 100))
+            self._word_rows.append(self.lines)
+            self._word_texts.append(w["word"])
+
+        separator = "\n" if self.lines else ""
+        self._ass.write(
+            f"{separator}Dialogue: 0,{format_ass_time(line_start)},{format_ass_time(line_end)},Default,,0,0,0,,{ass_lyric}"
+        )
+        self._txt.write(separator + text)
+        self._ass.flush()
+        self._txt.flush()
+        self.lines += 1
+
+    def close(self):
+        if self._ass.closed:
+            return
+        if self._pending is not None and not (self.skip_credits and "李宗盛" in self._pending.get("text", "")):
+            self._write(self._pending)
+        self._pending = None
+        self._ass.close()
+        self._txt.close()
+        WordTiming.from_words(self._word_starts, self._word_ends, self._word_rows,
+                              self._word_texts).save(sidecar_path(self.ass_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def whisper_to_ass(result, audio_file, output_dir, skip_credits=True):
+    with AssWriter(output_dir, skip_credits) as writer:
+        for seg in result["segments"]:
+            writer.add(seg)
+    return writer.ass_path, writer.txt_path
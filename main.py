@@ -2,13 +2,12 @@ import os
 import sys
 import shutil
 import argparse
-import subprocess
-import whisper
-from moviepy.editor import VideoFileClip, AudioFileClip
 
-from convert_chinese import convert_file
-from update_lyric import replace_ass_lyrics
-from create_video import image_to_video
+# 只导入轻量模块；whisper/torch、numpy、moviepy 等较重的依赖在用到的函数中再导入，
+# burn / retime 等不需要识别的子命令启动时不必加载它们（见 benchmarks/bench_startup.py）
+from utils.asr_backends import BACKENDS, DEFAULT_BACKEND, DEFAULT_MODEL
+from utils.stage_state import StageState
+from utils import media_probe, run_report
 
 
 # ---------------------------
@@ -21,74 +20,9 @@ def clean_output_dir(path):
     os.makedirs(path)
 
 
-def format_ass_time(sec):
-    h = int(sec // 3600)
-    m = int((sec % 3600) // 60)
-    s = int(sec % 60)
-    cs = int((sec - int(sec)) * 100)
-    return f"{h:d}:{m:02d}:{s:02d}.{cs:02d}"
-
-
-def whisper_to_ass(result, audio_file, output_dir):
-    header = """[Script Info]
-Title: Karaoke Lyrics
-ScriptType: v4.00+
-PlayResX: 1280
-PlayResY: 720
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,48,&H0000FF00,&H00FFFFFF,&H00000000,&H64000000,-1,0,0,0,100,100,0,0,1,3,0,2,10,10,30,1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-
-    events = []
-    text_lines = []
-    segments = result["segments"]
-
-    for i, seg in enumerate(segments):
-        if i == 0 or i == len(segments) - 1:
-            # whisper有时会在开头或结尾添加「詞曲 李宗盛」，有则忽略
-            text = seg.get("text", "")
-            if "李宗盛" in text:
-                continue
-        words = seg.get("words", [])
-        if not words:
-            continue
-
-        line_start = words[0]["start"]
-        line_end = words[-1]["end"]
-
-        ass_lyric = ""
-        text = ""
-
-        for w in words:
-            dur_cs = int((w["end"] - w["start"]) * 100)
-            ass_lyric += f"{{\\kf{dur_cs}}}{w['word']}"
-            text += w["word"]
-
-        events.append(
-            f"Dialogue: 0,{format_ass_time(line_start)},{format_ass_time(line_end)},Default,,0,0,0,,{ass_lyric}"
-        )
-        text_lines.append(text)
-
-    ass_path = os.path.join(output_dir, "old_lyrics.ass")
-    txt_path = os.path.join(output_dir, "lyrics_raw.txt")
-
-    with open(ass_path, "w", encoding="utf-8") as f:
-        f.write(header + "\n".join(events))
-
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(text_lines))
-
-    return ass_path, txt_path
-
-
 def check_video_duration(video_path, audio_path):
-    video_duration = VideoFileClip(video_path).duration
-    audio_duration = AudioFileClip(audio_path).duration
+    video_duration = media_probe.duration(video_path)
+    audio_duration = media_probe.duration(audio_path)
 
     print(f"视频时长: {video_duration:.2f}s")
     print(f"音频时长: {audio_duration:.2f}s")
@@ -97,132 +31,736 @@ def check_video_duration(video_path, audio_path):
         raise ValueError("❌ 视频时长小于音频时长！")
 
 
-def burn_ass(video_input, ass_path, output_path):
-    # ffmpeg -i audio.mp4 -vf ass=lyrics.ass output.mp4
-    # 下面的ass=参数不能用"\\"作为路径分隔符，必须使用"/"
-    ass_path = ass_path.replace("\\", "/")
-    subprocess.run([
-        "ffmpeg",
-        "-y",
-        "-i", video_input,
-        "-vf", f"ass={ass_path}",
-        output_path
-    ], check=True)
+def record_encode(record, output_path):
+    """在运行报告中记录输出视频的帧数，用于计算编码 fps（多个输出时累加）"""
+    try:
+        info = media_probe.probe(output_path)
+    except Exception:
+        return
+    if info.video and info.video.get("nb_frames", "").isdigit():
+        record["frames"] = record.get("frames", 0) + int(info.video["nb_frames"])
+    elif info.duration and info.fps:
+        record["frames"] = record.get("frames", 0) + int(info.duration * info.fps)
+    # 部分容器 ffprobe 不报告大小，直接读取文件大小
+    size = info.size if info.size is not None else os.path.getsize(output_path)
+    record["output_bytes"] = record.get("output_bytes", 0) + size
+
+
+def save_report(report, output_dir, aggregate_path=None):
+    run_report.end_run()
+    path = report.save(os.path.join(output_dir, f"run_report_{report.data['mode']}.json"), aggregate_path)
+    print(f"📊 运行报告: {path}")
+
+
+def burn(video_input, ass_path, output_path, jobs=1, threads=None, copy_gaps=False):
+    from burn_subtitle import burn_ass, burn_ass_copy_gaps, burn_ass_parallel
+
+    if copy_gaps:
+        burn_ass_copy_gaps(video_input, ass_path, output_path, jobs)
+    elif jobs > 1:
+        burn_ass_parallel(video_input, ass_path, output_path, jobs)
+    else:
+        burn_ass(video_input, ass_path, output_path, threads=threads)
+
+
+def prepare(audio, output_dir, st_type="s", model_name=DEFAULT_MODEL, use_cache=True, refresh_cache=False,
+            workers=1, threads_per_worker=None, result=None, force=False, backend=DEFAULT_BACKEND,
+            stream=False, window=120.0, overlap=10.0, fingerprint=True, decode_options=None, lyrics=None):
+    """
+    准备阶段：识别音频，生成 old_lyrics.ass、lyrics_raw.txt 和待修改的 lyrics.txt。
+    音频和参数未变的阶段直接跳过，已修改的 lyrics.txt 不会被覆盖。
+    :param result: 已有的识别结果（如批量模式中提前识别好的），提供时跳过识别
+    :param force: 清空输出目录后全部重新运行
+    :param backend: 识别后端 (whisper / faster-whisper)
+    :param stream: 流式识别：按 window 秒的窗口逐段识别并逐行写入 ass/txt，内存只与窗口长度有关（不使用识别缓存）
+    :param window: 流式识别的窗口长度（秒）
+    :param overlap: 流式识别相邻窗口的最小重叠（秒）
+    :param fingerprint: 先在指纹索引中查找同一录音（重新编码、不同码率等），找到时直接复用其修正好的歌词
+    :param decode_options: 其余解码参数（beam_size、temperature 等），原样传给识别后端
+    :param lyrics: 已知的歌词文本路径：不做自由识别，把这些歌词强制对齐到音频（只支持 whisper 后端）
+    :return: (old_lyrics.ass 路径, lyrics.txt 路径)
+    """
+    from convert_chinese import convert_file
+    from generate_ass import AssWriter, whisper_to_ass
+    from transcribe import transcribe_audio, transcribe_stream
+    from utils.transcribe_cache import TranscribeCache
+    from utils.word_timing import sidecar_path
+
+    if force:
+        clean_output_dir(output_dir)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    stages = StageState(output_dir)
+
+    ass_path = os.path.join(output_dir, "old_lyrics.ass")
+    raw_txt_path = os.path.join(output_dir, "lyrics_raw.txt")
+    simplified_txt_path = os.path.join(output_dir, "lyrics.txt")
+
+    if refresh_cache:
+        TranscribeCache().invalidate(audio)
+        stages.invalidate("ass_generate")
+
+    ass_outputs = [ass_path, raw_txt_path, sidecar_path(ass_path)]
+    ass_inputs = [audio, lyrics] if lyrics else [audio]
+    ass_params = {"backend": backend, "model": model_name}
+    if decode_options:
+        ass_params["decode"] = decode_options
+    if stream and result is None:
+        ass_params["stream"] = [window, overlap]
+    if lyrics:
+        ass_params = {"align": model_name}
+    if stages.fresh("ass_generate", ass_inputs, ass_outputs, ass_params):
+        print("[1][2] 音频未变，跳过识别和生成 ASS")
+    elif lyrics:
+        from align import align_lyrics, read_lyrics
+
+        if backend != "whisper":
+            print(f"⚠️ 强制对齐只支持 whisper 后端，忽略 --backend {backend}")
+        print("[1][2] 已知歌词，强制对齐到音频并生成 ASS + TXT")
+        result = align_lyrics(audio, read_lyrics(lyrics), model_name)
+        with run_report.stage("ass_generate") as record:
+            ass_path, raw_txt_path = whisper_to_ass(result, audio, output_dir, skip_credits=False)
+            record["segments"] = len(result["segments"])
+        stages.done("ass_generate", ass_inputs, ass_outputs, ass_params)
+    elif fingerprint and not stream and result is None and reuse_matched_lyrics(audio, output_dir):
+        stages.done("ass_generate", ass_inputs, ass_outputs, ass_params)
+    elif stream and result is None:
+        print(f"[1][2] 流式识别（窗口 {window:g} 秒），逐行写入 ASS + TXT")
+        with run_report.stage("ass_generate", stream=True) as record, AssWriter(output_dir) as writer:
+            for seg in transcribe_stream(audio, model_name, window=window, overlap=overlap, backend=backend,
+                                         decode_options=decode_options):
+                writer.add(seg)
+            record["segments"] = writer.lines
+        stages.done("ass_generate", ass_inputs, ass_outputs, ass_params)
+    else:
+        if result is None:
+            print("[1] 识别音频（命中缓存时跳过 Whisper）...")
+            result = transcribe_audio(
+                audio,
+                model_name=model_name,
+                use_cache=use_cache,
+                workers=workers,
+                threads_per_worker=threads_per_worker,
+                backend=backend,
+                decode_options=decode_options
+            )
+
+        print("[2] 生成原始 ASS + TXT")
+        with run_report.stage("ass_generate") as record:
+            ass_path, raw_txt_path = whisper_to_ass(result, audio, output_dir)
+            record["segments"] = len(result["segments"])
+        stages.done("ass_generate", ass_inputs, ass_outputs, ass_params)
+
+    mode = "t" if st_type == "t" else "s"
+    # lyrics.txt 是供人工修改的文件，只要原始歌词和简繁设置未变就保留
+    if stages.fresh("convert", [raw_txt_path], [simplified_txt_path], {"mode": mode}, verify_outputs=False):
+        print("[3] 保留已有的 lyrics.txt")
+    else:
+        print("[3] 转换为简体/繁体中文")
+        with run_report.stage("convert", inputs=[raw_txt_path]):
+            convert_file(
+                txt_path=raw_txt_path,
+                mode=mode,
+                output_path=simplified_txt_path
+            )
+        stages.done("convert", [raw_txt_path], [simplified_txt_path], {"mode": mode})
+    return ass_path, simplified_txt_path
+
+
+def reuse_matched_lyrics(audio, output_dir):
+    """
+    在指纹索引中查找同一录音的已处理歌曲，找到时把它修正好的 lyrics.ass 按时间偏移平移后作为 old_lyrics.ass，
+    并按平移后的字幕行生成 lyrics_raw.txt（与 old_lyrics.ass 逐行对应），跳过识别。
+    平移后有字幕行落在本文件音频之外（被裁掉）时不复用
+    :return: 是否复用成功
+    """
+    from burn_subtitle import shift_ass
+    from utils.ass_document import AssDocument
+    from utils.fingerprint import FingerprintIndex
+    from utils.word_timing import WordTiming, sidecar_path
+
+    with run_report.stage("fingerprint_query", inputs=[audio]) as record:
+        try:
+            with FingerprintIndex() as fp_index:
+                match = fp_index.query(audio, exclude=output_dir)
+        except Exception as e:
+            print(f"⚠️ 查询指纹索引失败: {e}")
+            match = None
+        record["hit"] = match is not None
+        if match is None:
+            return False
+        src_ass = os.path.join(match["output_dir"], "lyrics.ass")
+        if not os.path.exists(src_ass):
+            record["hit"] = False
+            return False
+
+        ass_path = os.path.join(output_dir, "old_lyrics.ass")
+        shift_ass(src_ass, ass_path, round(match["offset"] * 100))
+        dialogues = AssDocument.load(ass_path).dialogues
+        source_lines = len(AssDocument.load(src_ass).dialogues)
+        if len(dialogues) != source_lines:
+            print(f"⚠️ 同一录音 {match['output_dir']} 的歌词平移后只剩 {len(dialogues)}/{source_lines} 行，不复用")
+            os.remove(ass_path)
+            record["hit"] = False
+            return False
+
+        print(f"[1][2] 找到同一录音 {match['output_dir']}（偏移 {-match['offset']:+.2f} 秒），复用已修正的歌词")
+        texts = ["".join(w.text for w in event.karaoke_words(ignore_space=False)).strip() for event in dialogues]
+        with open(os.path.join(output_dir, "lyrics_raw.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(texts))
+        WordTiming.from_ass(ass_path).save(sidecar_path(ass_path))
+        record.update(source=match["output_dir"], offset=match["offset"], matches=match["matches"])
+    return True
+
+
+def index_song(audio, output_dir):
+    """
+    把歌词已经人工校对的歌曲加入指纹索引（音频未变时跳过），之后同一录音的其他文件可以直接复用。
+    未经校对的识别结果不能加入，否则识别错误会被复用到同一录音的其他文件
+    """
+    from utils.fingerprint import FingerprintIndex
+
+    with run_report.stage("fingerprint_index", inputs=[audio]) as record:
+        try:
+            with FingerprintIndex() as fp_index:
+                record["updated"] = fp_index.add(audio, output_dir)
+        except Exception as e:
+            print(f"⚠️ 加入指纹索引失败: {e}")
+
+
+def retime(output_dir, interactive=True, force=False):
+    """
+    按 lyrics.txt 更新时间轴生成 lyrics.ass；lyrics.txt 与 old_lyrics.ass 未变时跳过
+    :return: lyrics.ass 路径；用户取消时返回 None
+    """
+    from update_lyric import replace_ass_lyrics
+
+    txt_path = os.path.join(output_dir, "lyrics.txt")
+    old_ass_path = os.path.join(output_dir, "old_lyrics.ass")
+    final_ass_path = os.path.join(output_dir, "lyrics.ass")
+    stages = StageState(output_dir)
+
+    retime_inputs = [txt_path, old_ass_path]
+    with run_report.stage("retime", inputs=retime_inputs) as record:
+        if not force and stages.fresh("retime", retime_inputs, [final_ass_path]):
+            print("⏭️ 歌词未修改，跳过时间轴更新")
+            record["skipped"] = True
+            return final_ass_path
+        intervals = replace_ass_lyrics(
+            txt_path=txt_path,
+            ass_path=old_ass_path,
+            output_path=final_ass_path,
+            ignore_space=True,
+            interactive=interactive,
+            report_path=os.path.join(output_dir, "misalignment.json")
+        )
+        if intervals is None:
+            return None
+        stages.done("retime", retime_inputs, [final_ass_path])
+    return final_ass_path
+
+
+def finalize(audio, output_dir, image=None, video=None, interactive=True, jobs=1, threads=None, force=False,
+             copy_gaps=False, index_lyrics=False):
+    """
+    生成最终视频阶段：按 lyrics.txt 更新时间轴，生成带字幕视频。
+    中间文件保留在输出目录中，再次运行时只重新执行输入有变化的阶段
+    （只修改了 lyrics.txt 时重新更新时间轴并编码；什么都没改时直接返回已有结果）。
+    :param threads: 每个 ffmpeg 进程的线程数，默认由 ffmpeg 决定
+    :param force: 忽略已完成的阶段，全部重新运行
+    :param copy_gaps: 自定义视频中没有字幕的片段直接复制，只重新编码有字幕的片段
+    :param index_lyrics: lyrics.txt 已人工校对，加入指纹索引供同一录音的其他文件复用（批量等无人值守时不要开启）
+    :return: [lyrics.ass 路径, lyrics.txt 路径, 视频路径]；用户取消时返回 None
+    """
+    from create_video import image_to_video_with_ass
+
+    song_name = os.path.splitext(os.path.basename(audio))[0]
+    txt_path = os.path.join(output_dir, "lyrics.txt")
+    final_video = os.path.join(output_dir, f"{song_name}.mp4")
+
+    final_ass_path = retime(output_dir, interactive, force)
+    if final_ass_path is None:
+        return None
+    if index_lyrics:
+        index_song(audio, output_dir)
+    stages = StageState(output_dir)
+
+    # 情况1：图片 + 音频，单次 ffmpeg 编码直接生成带字幕视频
+    if image:
+        render_inputs = [image, audio, final_ass_path]
+        with run_report.stage("render", inputs=render_inputs) as record:
+            if not force and stages.fresh("render", render_inputs, [final_video]):
+                print("⏭️ 字幕和素材未变，跳过渲染")
+                record["skipped"] = True
+            else:
+                image_to_video_with_ass(image, audio, final_ass_path, final_video, threads=threads)
+                record_encode(record, final_video)
+                stages.done("render", render_inputs, [final_video])
+
+    # 情况2：自定义视频 + 音频
+    else:
+        burn_inputs = [video, final_ass_path]
+        burn_params = {"copy_gaps": True} if copy_gaps else None
+        with run_report.stage("probe", inputs=[video, audio]):
+            check_video_duration(video, audio)
+        with run_report.stage("burn", inputs=burn_inputs, copy_gaps=copy_gaps) as record:
+            if not force and stages.fresh("burn", burn_inputs, [final_video], burn_params):
+                print("⏭️ 字幕和视频未变，跳过写入字幕")
+                record["skipped"] = True
+            else:
+                burn(video, final_ass_path, final_video, jobs, threads, copy_gaps)
+                record_encode(record, final_video)
+                stages.done("burn", burn_inputs, [final_video], burn_params)
+
+    return [final_ass_path, txt_path, final_video]
+
+
+def parse_sizes(text):
+    """ "1280x720,720x480" → [(1280, 720), (720, 480)] """
+    sizes = []
+    for item in text.split(","):
+        width, _, height = item.strip().lower().partition("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def render_variants(audio, output_dir, st_types, sizes, image=None, video=None, interactive=True, threads=None,
+                    force=False, index_lyrics=False):
+    """
+    一次生成多个版本的视频（简体/繁体 × 多种分辨率）：时间轴只更新一次，
+    各版本字幕由 lyrics.ass 转换简繁得到，素材只解码一次，split 后各自写入字幕并分别编码。
+    :param st_types: 字幕版本列表，如 ["s", "t"]
+    :param sizes: 分辨率列表，如 [(1280, 720), (720, 480)]；自定义视频时为空表示保持原尺寸
+    :param index_lyrics: lyrics.txt 已人工校对，加入指纹索引（同 finalize）
+    :return: [lyrics.ass 路径, lyrics.txt 路径, 各版本视频路径...]；用户取消时返回 None
+    """
+    from convert_chinese import convert_ass
+
+    song_name = os.path.splitext(os.path.basename(audio))[0]
+    txt_path = os.path.join(output_dir, "lyrics.txt")
+
+    final_ass_path = retime(output_dir, interactive, force)
+    if final_ass_path is None:
+        return None
+    if index_lyrics:
+        index_song(audio, output_dir)
+    stages = StageState(output_dir)
+
+    variants = []
+    for st_type in st_types:
+        ass_path = os.path.join(output_dir, f"lyrics.{st_type}.ass")
+        convert_ass(final_ass_path, st_type, ass_path)
+        for width, height in sizes or [(None, None)]:
+            suffix = f".{height}p" if height else ""
+            variants.append({
+                "ass": ass_path,
+                "output": os.path.join(output_dir, f"{song_name}.{st_type}{suffix}.mp4"),
+                "width": width,
+                "height": height,
+            })
+    ass_paths = sorted({v["ass"] for v in variants})
+    outputs = [v["output"] for v in variants]
+
+    media_inputs = [image, audio] if image else [video]
+    render_inputs = media_inputs + ass_paths
+    params = {"st_types": list(st_types), "sizes": [list(size) for size in sizes]}
+    if video:
+        with run_report.stage("probe", inputs=[video, audio]):
+            check_video_duration(video, audio)
+    with run_report.stage("render_variants", inputs=render_inputs) as record:
+        if not force and stages.fresh("render_variants", render_inputs, outputs, params):
+            print("⏭️ 字幕和素材未变，跳过渲染")
+            record["skipped"] = True
+        else:
+            if image:
+                from create_video import image_to_videos_with_ass
+                image_to_videos_with_ass(image, audio, variants, threads=threads)
+            else:
+                from burn_subtitle import burn_ass_variants
+                burn_ass_variants(video, variants, threads)
+            for path in outputs:
+                record_encode(record, path)
+            stages.done("render_variants", render_inputs, outputs, params)
+
+    return [final_ass_path, txt_path] + outputs
 
 
 # ---------------------------
-# 主流程
+# 子命令
 # ---------------------------
 
-def main():
-    parser = argparse.ArgumentParser(description="歌词视频生成工具")
-
-    parser.add_argument("--audio", help="音频路径")
+def song_output_dir(args):
+    if getattr(args, "output_dir", None):
+        return args.output_dir
+    song_name = os.path.splitext(os.path.basename(args.audio))[0]
+    return os.path.join("outputs", song_name)
+
+
+def clear_transcribe_cache():
+    from utils.transcribe_cache import TranscribeCache
+
+    removed = TranscribeCache().clear()
+    print(f"🧹 已清空识别缓存（{removed} 条）")
+
+
+def cmd_transcribe(args):
+    """识别音频，生成 old_lyrics.ass 和待修改的 lyrics.txt（原 prepare 模式）"""
+    if args.clear_cache:
+        clear_transcribe_cache()
+
+    print("=== 准备阶段 ===")
+    output_dir = song_output_dir(args)
+    report = run_report.start_run("prepare", song=os.path.basename(output_dir), audio=args.audio,
+                                  backend=args.backend, model=args.model, workers=args.workers)
+    prepare(
+        args.audio,
+        output_dir,
+        st_type=args.st_type,
+        model_name=args.model,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh_cache,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        force=args.force,
+        backend=args.backend,
+        stream=args.stream,
+        window=args.window,
+        overlap=args.overlap,
+        fingerprint=not args.no_fingerprint,
+        lyrics=args.lyrics
+    )
+    save_report(report, output_dir, args.report_aggregate)
+    print("✅ 请修改歌词后运行 render")
+
+
+def cmd_retime(args):
+    """按 lyrics.txt 更新时间轴，只生成 lyrics.ass"""
+    ass_path = retime(song_output_dir(args), interactive=not args.yes, force=args.force)
+    if ass_path is None:
+        return 1
+    print(f"✅ 已生成: {ass_path}")
+
+
+def cmd_convert(args):
+    """简繁转换歌词文本"""
+    from convert_chinese import convert_file, convert_files
+
+    if args.output and len(args.txt) == 1:
+        convert_file(args.txt[0], args.st_type, args.output)
+    else:
+        convert_files(args.txt, args.st_type, output_dir=args.output_dir)
+
+
+def cmd_render(args):
+    """更新时间轴并生成带字幕的最终视频（原 finalize 模式）"""
+    if not args.image and not args.video:
+        print("❌ render 必须提供 --image 或 --video")
+        return 1
+
+    print("=== 生成最终视频阶段 ===")
+    output_dir = song_output_dir(args)
+    report = run_report.start_run("finalize", song=os.path.basename(output_dir), audio=args.audio,
+                                  jobs=args.jobs)
+    # 交互式 render 是人工修改 lyrics.txt 之后运行的；--yes 时只有明确指定 --index_lyrics 才加入指纹索引
+    index_lyrics = args.index_lyrics or not args.yes
+    if args.variants or args.sizes:
+        # 多版本：一次解码、一次 ffmpeg 运行输出全部版本
+        st_types = args.variants.split(",") if args.variants else [args.st_type]
+        sizes = parse_sizes(args.sizes) if args.sizes else ([] if args.video else [(720, 480)])
+        outputs = render_variants(
+            args.audio,
+            output_dir,
+            st_types,
+            sizes,
+            image=args.image,
+            video=args.video,
+            interactive=not args.yes,
+            force=args.force,
+            index_lyrics=index_lyrics
+        )
+    else:
+        outputs = finalize(
+            args.audio,
+            output_dir,
+            image=args.image,
+            video=args.video,
+            interactive=not args.yes,
+            jobs=args.jobs,
+            force=args.force,
+            copy_gaps=args.copy_gaps,
+            index_lyrics=index_lyrics
+        )
+    if outputs is None:
+        run_report.end_run()
+        return 1
+    save_report(report, output_dir, args.report_aggregate)
+
+    print("✅ 完成！输出文件：")
+    for path in outputs:
+        print(path)
+
+
+def cmd_burn(args):
+    """把已有的 ass 字幕直接写入视频"""
+    print("=== 直接插入字幕模式 ===")
+    output_path = args.output or os.path.splitext(args.video)[0] + "_subtitled.mp4"
+    try:
+        burn(args.video, args.ass, output_path, args.jobs, copy_gaps=args.copy_gaps)
+    except Exception as e:
+        print("❌ 插入字幕失败：", e)
+        return 1
+    print(f"✅ 生成完成: {output_path}")
+
+
+def cmd_preview(args):
+    """低分辨率快速预览一段时间或几行歌词"""
+    from preview import preview
+
+    if not args.image and not args.video:
+        print("❌ preview 必须提供 --image 或 --video")
+        return 1
+
+    print("=== 预览 ===")
+    output_dir = song_output_dir(args)
+    ass_path = retime(output_dir, interactive=not args.yes)
+    if ass_path is None:
+        return 1
+    preview(
+        ass_path,
+        os.path.join(output_dir, "preview.mp4"),
+        start=args.start,
+        end=args.end,
+        lines=args.lines,
+        image=args.image,
+        audio=args.audio,
+        video=args.video
+    )
+
+
+def cmd_player(args):
+    """生成免编码的 HTML 预览播放器"""
+    from player import write_player, write_player_data, watch
+
+    print("=== 预览播放器 ===")
+    output_dir = song_output_dir(args)
+    ass_path = retime(output_dir, interactive=not args.yes)
+    if ass_path is None:
+        return 1
+    write_player(ass_path, args.audio, output_dir)
+    print("请在浏览器中打开上面的 player.html")
+    if args.watch:
+        def on_change():
+            # 监视模式下不询问，字数不一致时直接自动分配时间
+            if retime(output_dir, interactive=False):
+                write_player_data(ass_path, output_dir)
+                print("🔄 播放器已更新")
+
+        print("👀 监视 lyrics.txt 修改中（Ctrl+C 结束）...")
+        watch([os.path.join(output_dir, "lyrics.txt")], on_change)
+
+
+COMMANDS = {
+    "transcribe": cmd_transcribe,
+    "retime": cmd_retime,
+    "convert": cmd_convert,
+    "render": cmd_render,
+    "burn": cmd_burn,
+    "preview": cmd_preview,
+    "player": cmd_player,
+}
+
+
+def _add_song_args(parser):
+    parser.add_argument("--audio", required=True, help="音频路径")
+    parser.add_argument("--output_dir", help="输出目录 (默认: outputs/歌名)")
+
+
+def _add_transcribe_args(parser):
+    parser.add_argument("--st_type", choices=["s", "t"], default="s", help="s: 简体, t: 繁体")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help="识别后端：whisper，或 CPU 上更快的 faster-whisper（int8 量化）")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="模型大小: small / medium / large ...")
+    parser.add_argument("--workers", type=int, default=1, help="大于 1 时在静音处切分音频并多进程并行识别")
+    parser.add_argument("--threads_per_worker", type=int, help="并行识别时每个进程的推理线程数（默认平分 CPU 核数）")
+    parser.add_argument("--lyrics", help="已知的歌词文本（每行一句）：不做识别，直接把歌词强制对齐到音频")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式识别：逐窗口识别并逐行写出结果，内存只与窗口长度有关（适合数小时的录音）")
+    parser.add_argument("--window", type=float, default=120.0, help="流式识别的窗口长度，秒 (默认: 120)")
+    parser.add_argument("--overlap", type=float, default=10.0, help="流式识别相邻窗口的最小重叠，秒 (默认: 10)")
+    parser.add_argument("--no_cache", action="store_true", help="不使用识别结果缓存")
+    parser.add_argument("--no_fingerprint", action="store_true",
+                        help="不在指纹索引中查找同一录音的已修正歌词，总是重新识别")
+    parser.add_argument("--refresh_cache", action="store_true", help="删除该音频的识别缓存后重新识别")
+    parser.add_argument("--clear_cache", action="store_true", help="清空全部识别缓存")
+
+
+def _add_media_args(parser):
     parser.add_argument("--image", help="图片路径")
     parser.add_argument("--video", help="自定义视频路径")
-    parser.add_argument("--ass", help="已有ASS字幕路径（直接插入模式）")
-    parser.add_argument("--mode", choices=["prepare", "finalize"])
-    parser.add_argument("--st_type", choices=["s", "t"], default="s", help="s: 简体, t: 繁体")
 
-    args = parser.parse_args()
 
-    # ==============================
-    # 模式3：仅视频 + ass 直接插入
-    # ==============================
-    if args.video and args.ass and not args.audio:
-        print("=== 直接插入字幕模式 ===")
-        try:
-            output_path = os.path.splitext(args.video)[0] + "_subtitled.mp4"
-            burn_ass(args.video, args.ass, output_path)
-            print(f"✅ 生成完成: {output_path}")
-        except Exception as e:
-            print("❌ 插入字幕失败：", e)
-        return
+def _add_yes_arg(parser):
+    parser.add_argument("--yes", action="store_true", help="新旧歌词字数不一致时不询问，直接自动分配时间")
 
-    # ==============================
-    # prepare / finalize 模式
-    # ==============================
-    if not args.audio:
-        print("❌ prepare/finalize 模式必须提供 --audio")
-        return
 
-    song_name = os.path.splitext(os.path.basename(args.audio))[0]
-    output_dir = os.path.join("outputs", song_name)
+def _add_index_arg(parser):
+    parser.add_argument("--index_lyrics", action="store_true",
+                        help="歌词已人工校对：即使使用 --yes 也加入指纹索引，供同一录音的其他文件复用")
 
-    if args.mode == "prepare":
-        print("=== 准备阶段 ===")
-        clean_output_dir(output_dir)
 
-        print("[1] 加载 Whisper...")
-        model = whisper.load_model("medium")
-        
-        print("[2] 识别音频...")
-        result = model.transcribe(args.audio, language="zh", word_timestamps=True)
-
-        print("[3] 生成原始 ASS + TXT")
-        ass_path, raw_txt_path = whisper_to_ass(result, args.audio, output_dir)
-
-        simplified_txt_path = os.path.join(output_dir, "lyrics.txt")
-        
-        print("[4] 转换为简体/繁体中文")
-        convert_file(
-            txt_path=raw_txt_path,
-            mode="t" if args.st_type == "t" else "s",
-            output_path=simplified_txt_path
-        )
+def _add_force_arg(parser, help_text="忽略已完成的阶段，全部重新运行"):
+    parser.add_argument("--force", action="store_true", help=help_text)
 
-        print("✅ 请修改歌词后运行 finalize")
 
-    elif args.mode == "finalize":
-        print("=== 生成最终视频阶段 ===")
+def _add_jobs_arg(parser):
+    parser.add_argument("--jobs", type=int, default=1, help="写入字幕时按关键帧切分视频的并行 ffmpeg 进程数")
+    parser.add_argument("--copy_gaps", action="store_true",
+                        help="写入字幕时没有歌词的片段（前奏、间奏等）直接复制，只重新编码有歌词的片段")
 
-        txt_path = os.path.join(output_dir, "lyrics.txt")
-        old_ass_path = os.path.join(output_dir, "old_lyrics.ass")
-        final_ass_path = os.path.join(output_dir, "lyrics.ass")
 
-        replace_ass_lyrics(
-            txt_path=txt_path,
-            ass_path=old_ass_path,
-            output_path=final_ass_path,
-            ignore_space=True
-        )
+def _add_variants_args(parser):
+    parser.add_argument("--variants", help="一次生成多个字幕版本，例如 s,t（简体和繁体）")
+    parser.add_argument("--sizes", help="一次生成多种分辨率，例如 1280x720,720x480")
 
-        # 情况1：图片 + 音频
-        if args.image:
-            temp_video = os.path.join(output_dir, "temp_video.mp4")
-            image_to_video(args.image, args.audio, temp_video)
 
-        # 情况2：自定义视频 + 音频
-        elif args.video:
-            check_video_duration(args.video, args.audio)
-            temp_video = args.video
+def _add_report_arg(parser):
+    parser.add_argument("--report_aggregate", help="将本次运行报告追加到该 JSONL 文件，用于汇总多次运行")
 
-        else:
-            print("❌ finalize 阶段必须提供 --image 或 --video")
+
+def _add_preview_args(parser):
+    parser.add_argument("--start", help="开始时间，秒或 分:秒")
+    parser.add_argument("--end", help="结束时间，默认开始后 20 秒")
+    parser.add_argument("--lines", help="预览指定的歌词行，例如 3,5,12-15（从 1 开始）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="歌词视频生成工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("transcribe", help=cmd_transcribe.__doc__)
+    _add_song_args(p)
+    _add_transcribe_args(p)
+    _add_force_arg(p, "清空输出目录后全部重新运行")
+    _add_report_arg(p)
+
+    p = subparsers.add_parser("retime", help=cmd_retime.__doc__)
+    _add_song_args(p)
+    _add_yes_arg(p)
+    _add_force_arg(p)
+
+    p = subparsers.add_parser("convert", help=cmd_convert.__doc__)
+    p.add_argument("txt", nargs="+", help="歌词文本路径")
+    p.add_argument("--st_type", choices=["s", "t"], default="s", help="s: 转简体, t: 转繁体")
+    p.add_argument("--output", help="输出路径（单个文件时）")
+    p.add_argument("--output_dir", help="输出目录，默认原地覆盖")
+
+    p = subparsers.add_parser("render", help=cmd_render.__doc__)
+    _add_song_args(p)
+    _add_media_args(p)
+    _add_variants_args(p)
+    p.add_argument("--st_type", choices=["s", "t"], default="s", help="只指定 --sizes 时的字幕版本")
+    _add_yes_arg(p)
+    _add_index_arg(p)
+    _add_jobs_arg(p)
+    _add_force_arg(p)
+    _add_report_arg(p)
+
+    p = subparsers.add_parser("burn", help=cmd_burn.__doc__)
+    p.add_argument("--video", required=True, help="视频路径")
+    p.add_argument("--ass", required=True, help="ass 字幕路径")
+    p.add_argument("--output", help="输出路径 (默认: 视频名_subtitled.mp4)")
+    _add_jobs_arg(p)
+
+    p = subparsers.add_parser("preview", help=cmd_preview.__doc__)
+    _add_song_args(p)
+    _add_media_args(p)
+    _add_preview_args(p)
+    _add_yes_arg(p)
+
+    p = subparsers.add_parser("player", help=cmd_player.__doc__)
+    _add_song_args(p)
+    _add_yes_arg(p)
+    p.add_argument("--watch", action="store_true", help="lyrics.txt 修改后自动重新对齐并刷新播放器")
+
+    return parser
+
+
+# ---------------------------
+# 旧版 --mode 参数（兼容）
+# ---------------------------
+
+LEGACY_MODES = {
+    "prepare": cmd_transcribe,
+    "finalize": cmd_render,
+    "preview": cmd_preview,
+    "player": cmd_player,
+}
+
+
+def legacy_main(argv):
+    parser = argparse.ArgumentParser(description="歌词视频生成工具（旧版参数，推荐使用子命令）")
+
+    parser.add_argument("--audio", help="音频路径")
+    _add_media_args(parser)
+    parser.add_argument("--ass", help="已有ASS字幕路径（直接插入模式）")
+    parser.add_argument("--mode", choices=list(LEGACY_MODES))
+    _add_transcribe_args(parser)
+    _add_variants_args(parser)
+    _add_yes_arg(parser)
+    _add_index_arg(parser)
+    _add_jobs_arg(parser)
+    _add_report_arg(parser)
+    _add_preview_args(parser)
+    parser.add_argument("--watch", action="store_true", help="player：lyrics.txt 修改后自动重新对齐并刷新播放器")
+    _add_force_arg(parser, "忽略已完成的阶段全部重新运行（prepare 会清空输出目录）")
+    parser.set_defaults(output=None, output_dir=None)
+
+    args = parser.parse_args(argv)
+
+    if args.clear_cache:
+        clear_transcribe_cache()
+        # 已经清空，prepare 中不再重复
+        args.clear_cache = False
+        if not args.mode and not args.ass:
             return
 
-        final_video = os.path.join(output_dir, f"{song_name}.mp4")
+    # ==============================
+    # 仅视频 + ass 直接插入
+    # ==============================
+    if args.video and args.ass and not args.audio:
+        return cmd_burn(args)
 
-        burn_ass(temp_video, final_ass_path, final_video)
+    if not args.audio or not args.mode:
+        print("❌ prepare/finalize 模式必须提供 --audio 和 --mode")
+        return 1
+    return LEGACY_MODES[args.mode](args)
 
-        for f in ["old_lyrics.ass", "lyrics_raw.txt", "temp_video.mp4"]:
-            path = os.path.join(output_dir, f)
-            if os.path.exists(path):
-                os.remove(path)
 
-        print("✅ 完成！输出文件：")
-        print(final_ass_path)
-        print(txt_path)
-        print(final_video)
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in COMMANDS or argv[0] in ("-h", "--help"):
+        args = build_parser().parse_args(argv)
+        return COMMANDS[args.command](args)
+    return legacy_main(argv)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
 # example usage
+# python main.py transcribe --audio inputs/audio.mp3 [--st_type t] [--backend faster-whisper]
+# python main.py transcribe --audio inputs/live.mp3 --stream
+# python main.py transcribe --audio inputs/audio.mp3 --lyrics lyrics/audio.txt
+# python main.py render --audio inputs/audio.mp3 --image img/cover.png
+# python main.py render --audio inputs/audio.mp3 --video inputs/video.mp4
+# python main.py render --audio inputs/audio.mp3 --image img/cover.png --variants s,t --sizes 1280x720,720x480
+# python main.py retime --audio inputs/audio.mp3 --yes
+# python main.py convert outputs/audio/lyrics.txt --st_type t
+# python main.py preview --audio inputs/audio.mp3 --image img/cover.png --start 1:05 --end 1:30
+# python main.py player --audio inputs/audio.mp3 --watch
+# python main.py burn --ass inputs/lyrics.ass --video inputs/video.mp4
+
+# 旧版参数仍然可用：
 # python main.py --audio inputs/audio.mp3 --mode prepare [--st_type t]
 # python main.py --audio inputs/audio.mp3 --image img/cover.png --mode finalize
-
-# python main.py --audio inputs/audio.mp3 --video inputs/video.mp4 --mode finalize
-
 # python main.py --ass inputs/lyrics.ass --video inputs/video.mp4
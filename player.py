@@ -0,0 +1,235 @@
+"""
+免编码的卡拉OK预览播放器：把 lyrics.ass 的逐字 \\kf 时间导出为 JS 数据，生成一个本地 HTML 页面，
+浏览器播放音频时按时间逐字高亮，不需要任何视频编码。
+页面每秒重新加载数据文件，lyrics.ass 重新生成后（例如 main.py --mode player --watch）自动刷新歌词。
+"""
+import os
+import re
+import html
+import json
+import time
+import argparse
+from urllib.parse import quote
+
+from utils.ass_document import AssDocument, KaraokeTiming
+
+PLAYER_HTML = "player.html"
+PLAYER_DATA = "player_data.js"
+
+_HTML = """<!DOCTYPE html>
+<html lang="zh">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { margin: 0; background: #111; color: #eee; font-family: sans-serif; }
+  header { padding: 12px 20px; background: #1b1b1b; display: flex; gap: 16px; align-items: center; }
+  header audio { flex: 1; }
+  #status { font-size: 12px; color: #888; white-space: nowrap; }
+  #stage { padding: 40px 20px; text-align: center; min-height: 140px; }
+  .big { font-size: 40px; line-height: 1.6; min-height: 64px; }
+  .next { color: #777; font-size: 28px; }
+  #lines { padding: 0 20px 40px; font-size: 18px; line-height: 1.9; }
+  #lines div { cursor: pointer; padding: 0 8px; border-radius: 4px; }
+  #lines div:hover { background: #222; }
+  #lines div.active { background: #2a2a40; }
+  #lines .time { color: #666; font-family: monospace; margin-right: 12px; }
+  .w { background-image: linear-gradient(to right, #4fc3f7 50%, #eee 50%); background-size: 200% 100%;
+       background-position: 100% 0; -webkit-background-clip: text; background-clip: text; color: transparent; }
+</style>
+</head>
+<body>
+<header>
+  <audio id="audio" controls src="__AUDIO__"></audio>
+  <span id="status"></span>
+</header>
+<div id="stage"><div id="current" class="big"></div><div id="next" class="big next"></div></div>
+<div id="lines"></div>
+<script>
+(function () {
+  var audio = document.getElementById("audio");
+  var data = null, version = null, lineEls = [], current = -1;
+
+  function fmt(t) {
+    var m = Math.floor(t / 60), s = (t - m * 60).toFixed(2);
+    return m + ":" + (s < 10 ? "0" : "") + s;
+  }
+
+  function renderWords(el, line) {
+    el.innerHTML = "";
+    if (!line) return;
+    line.words.forEach(function (w) {
+      var span = document.createElement("span");
+      span.className = "w";
+      span.textContent = w.text;
+      el.appendChild(span);
+    });
+  }
+
+  function render() {
+    var list = document.getElementById("lines");
+    list.innerHTML = "";
+    lineEls = data.lines.map(function (line) {
+      var div = document.createElement("div");
+      div.innerHTML = '<span class="time">' + fmt(line.start) + "</span>";
+      div.appendChild(document.createTextNode(line.words.map(function (w) { return w.text; }).join("")));
+      div.onclick = function () { audio.currentTime = line.start; audio.play(); };
+      list.appendChild(div);
+      return div;
+    });
+    current = -1;
+    document.getElementById("status").textContent =
+      data.lines.length + " 行 · 更新于 " + new Date(version * 1000).toLocaleTimeString();
+  }
+
+  function findLine(t) {
+    // 二分查找最后一个 start <= t 的行
+    var lo = 0, hi = data.lines.length - 1, found = -1;
+    while (lo <= hi) {
+      var mid = (lo + hi) >> 1;
+      if (data.lines[mid].start <= t) { found = mid; lo = mid + 1; } else { hi = mid - 1; }
+    }
+    return found;
+  }
+
+  function tick() {
+    if (data && data.lines.length) {
+      var t = audio.currentTime, index = findLine(t);
+      if (index !== current) {
+        if (lineEls[current]) lineEls[current].classList.remove("active");
+        current = index;
+        renderWords(document.getElementById("current"), data.lines[index]);
+        renderWords(document.getElementById("next"), data.lines[index + 1]);
+        if (lineEls[index]) {
+          lineEls[index].classList.add("active");
+          lineEls[index].scrollIntoView({ block: "nearest" });
+        }
+      }
+      var line = data.lines[index], spans = document.getElementById("current").children;
+      if (line && t <= line.end) {
+        line.words.forEach(function (w, i) {
+          var p = w.end > w.start ? (t - w.start) / (w.end - w.start) : (t >= w.start ? 1 : 0);
+          p = Math.max(0, Math.min(1, p));
+          spans[i].style.backgroundPosition = (100 - p * 100) + "% 0";
+        });
+      }
+    }
+    requestAnimationFrame(tick);
+  }
+
+  // 通过 script 标签加载数据，file:// 下也可用；每秒重新加载，版本变化时刷新歌词
+  window.karaokeData = function (payload) {
+    if (payload.version !== version) {
+      version = payload.version;
+      data = payload;
+      render();
+    }
+  };
+  function poll() {
+    var script = document.createElement("script");
+    script.src = "__DATA__?t=" + Date.now();
+    script.onload = script.onerror = function () { script.remove(); };
+    document.body.appendChild(script);
+  }
+  poll();
+  setInterval(poll, 1000);
+  requestAnimationFrame(tick);
+})();
+</script>
+</body>
+</html>
+"""
+
+
+def export_timing(ass_path, ignore_space=False):
+    """
+    从 ass 导出逐字时间（秒）：[{"start", "end", "words": [{"text", "start", "end"}]}]
+    与字幕渲染一致，字的开始时间 = 行开始时间 + 该行之前各字的 \\kf 时长之和
+    """
+    doc = AssDocument.load(ass_path)
+    dialogues = doc.dialogues
+    words = doc.karaoke_words(ignore_space)
+    timing = KaraokeTiming(dialogues, words)
+
+    lines = [{"start": e.start / 100, "end": e.end / 100, "words": []} for e in dialogues]
+    for i, word in enumerate(words):
+        lines[word.row]["words"].append({
+            "text": word.text,
+            "start": timing.start(i) / 100,
+            "end": timing.end(i) / 100,
+        })
+    for line, event in zip(lines, dialogues):
+        if not line["words"]:
+            # 没有卡拉OK标签的行整行显示
+            line["words"].append({"text": event.text, "start": line["start"], "end": line["start"]})
+    return lines
+
+
+def write_player_data(ass_path, output_dir):
+    """重新导出数据文件，已打开的页面会在一秒内自动刷新"""
+    payload = {"version": time.time(), "lines": export_timing(ass_path)}
+    path = os.path.join(output_dir, PLAYER_DATA)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"karaokeData({json.dumps(payload, ensure_ascii=False)});\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_player(ass_path, audio_path, output_dir, title=None):
+    """
+    生成 player.html 和 player_data.js，音频按相对路径引用，不复制
+    :return: player.html 路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    write_player_data(ass_path, output_dir)
+    audio_src = os.path.relpath(os.path.abspath(audio_path), os.path.abspath(output_dir)).replace(os.sep, "/")
+    title = title or os.path.splitext(os.path.basename(audio_path))[0]
+    # 标题按 HTML 文本转义，音频路径先按 URL 编码（#、?、% 等）再按属性值转义；
+    # 一次替换所有占位符，标题中出现占位符文本也不会被再次替换
+    values = {
+        "__TITLE__": html.escape(title),
+        "__AUDIO__": html.escape(quote(audio_src), quote=True),
+        "__DATA__": PLAYER_DATA,
+    }
+    page = re.sub("|".join(values), lambda m: values[m.group(0)], _HTML)
+    path = os.path.join(output_dir, PLAYER_HTML)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    print(f"✅ 播放器已生成: {path}")
+    return path
+
+
+def watch(paths, on_change, interval=1.0):
+    """轮询 paths 的修改时间，有变化时调用 on_change()，Ctrl+C 结束"""
+    def snapshot():
+        return [os.path.getmtime(p) if os.path.exists(p) else None for p in paths]
+
+    last = snapshot()
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot()
+            if current != last:
+                last = current
+                on_change()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成免编码的卡拉OK预览播放器")
+    parser.add_argument("--ass", required=True, help="ass 字幕路径")
+    parser.add_argument("--audio", required=True, help="音频路径")
+    parser.add_argument("--output_dir", help="输出目录（默认与 ass 相同）")
+    parser.add_argument("--watch", action="store_true", help="ass 修改后自动更新播放器数据")
+
+    args = parser.parse_args()
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.ass))
+    write_player(args.ass, args.audio, output_dir)
+    if args.watch:
+        print("👀 监视字幕修改中（Ctrl+C 结束）...")
+        watch([args.ass], lambda: print(f"🔄 已更新: {write_player_data(args.ass, output_dir)}"))
+
+# example usage:
+# python player.py --ass outputs/song/lyrics.ass --audio inputs/song.mp3 --watch
@@ -0,0 +1,138 @@
+"""
+快速预览：只渲染一小段时间（或 lyrics.ass 中指定的几行歌词），低分辨率 + 快速编码预设，
+用于修改歌词后检查卡拉OK时间轴，几秒内出结果。
+"""
+import os
+import shutil
+import tempfile
+import argparse
+
+from burn_subtitle import shift_ass
+from utils.ass_document import AssDocument
+from utils.ffmpeg_utils import filter_path, run_ffmpeg
+
+DEFAULT_HEIGHT = 360
+DEFAULT_PRESET = "ultrafast"
+# 按歌词行预览时前后多留的秒数
+DEFAULT_PADDING = 1.0
+
+
+def parse_timestamp(value):
+    """ "75.5" / "1:15.5" / "0:01:15.5" → 秒 """
+    seconds = 0.0
+    for part in str(value).split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_lines(spec):
+    """ "3,5,12-15" → [3, 5, 12, 13, 14, 15]（从 1 开始的 Dialogue 行号） """
+    lines = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            lines.extend(range(int(first), int(last) + 1))
+        else:
+            lines.append(int(part))
+    return lines
+
+
+def lines_window(ass_path, lines, padding=DEFAULT_PADDING):
+    """指定 Dialogue 行覆盖的时间范围（秒），前后各留 padding 秒"""
+    dialogues = AssDocument.load(ass_path).dialogues
+    selected = [dialogues[i - 1] for i in lines if 1 <= i <= len(dialogues)]
+    if not selected:
+        raise ValueError(f"歌词行号超出范围：共 {len(dialogues)} 行")
+    start = min(e.start for e in selected) / 100
+    end = max(e.end for e in selected) / 100
+    return max(0.0, start - padding), end + padding
+
+
+def render_preview(ass_path, output_path, start, end, image=None, audio=None, video=None,
+                   height=DEFAULT_HEIGHT, preset=DEFAULT_PRESET, fps=24, threads=None):
+    """
+    渲染 [start, end) 秒的预览：音频/视频在输入端直接 seek，字幕平移到从 0 开始。
+    图片模式使用 image + audio，视频模式使用 video 自带的音轨（与 finalize 一致）。
+    """
+    if image is None and video is None:
+        raise ValueError("预览必须提供 image 或 video")
+    duration = end - start
+    work_dir = tempfile.mkdtemp(prefix="preview_")
+    shifted_ass = os.path.join(work_dir, "preview.ass")
+    try:
+        shift_ass(ass_path, shifted_ass, round(start * 100), round(end * 100))
+        # 先缩小再渲染字幕，libass 按 PlayRes 等比缩放字幕
+        video_filter = f"scale=-2:{height},format=yuv420p,ass={filter_path(shifted_ass)}"
+        seek = ["-ss", f"{start:.3f}", "-t", f"{duration:.3f}"]
+        if image:
+            inputs = ["-loop", "1", "-framerate", str(fps), "-t", f"{duration:.3f}", "-i", image,
+                      *seek, "-i", audio]
+            maps = ["-map", "0:v", "-map", "1:a"]
+        else:
+            inputs = [*seek, "-i", video]
+            maps = ["-map", "0:v:0", "-map", "0:a?"]
+        run_ffmpeg([
+            *inputs,
+            *maps,
+            "-vf", video_filter,
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", "30",
+            "-c:a", "aac",
+            "-shortest",
+            "-movflags", "+faststart",
+            *(["-threads", str(threads)] if threads else []),
+            output_path
+        ], quiet=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"✅ 预览已生成: {output_path}（{start:.2f}s - {end:.2f}s）")
+    return output_path
+
+
+def preview(ass_path, output_path, start=None, end=None, lines=None, image=None, audio=None, video=None,
+            padding=DEFAULT_PADDING, **options):
+    """
+    按时间范围或歌词行生成预览。
+    :param start: 开始时间（秒或 "分:秒"），与 lines 二选一
+    :param end: 结束时间，默认开始后 20 秒
+    :param lines: Dialogue 行号列表或 "3,5,12-15"
+    """
+    if lines:
+        if isinstance(lines, str):
+            lines = parse_lines(lines)
+        start, end = lines_window(ass_path, lines, padding)
+    else:
+        start = parse_timestamp(start or 0)
+        end = parse_timestamp(end) if end is not None else start + 20
+    if end <= start:
+        raise ValueError("预览结束时间必须晚于开始时间")
+    return render_preview(ass_path, output_path, start, end, image=image, audio=audio, video=video, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="快速预览一段带字幕视频")
+    parser.add_argument("--ass", required=True, help="ass 字幕路径")
+    parser.add_argument("--image", help="图片路径（与 --audio 一起使用）")
+    parser.add_argument("--audio", help="音频路径")
+    parser.add_argument("--video", help="视频路径（使用视频自带音轨）")
+    parser.add_argument("--start", help="开始时间，秒或 分:秒")
+    parser.add_argument("--end", help="结束时间，默认开始后 20 秒")
+    parser.add_argument("--lines", help="预览指定的歌词行，例如 3,5,12-15（从 1 开始）")
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT, help=f"预览高度 (默认: {DEFAULT_HEIGHT})")
+    parser.add_argument("--preset", default=DEFAULT_PRESET, help=f"x264 预设 (默认: {DEFAULT_PRESET})")
+    parser.add_argument("--output", default="preview.mp4", help="输出路径 (默认: preview.mp4)")
+
+    args = parser.parse_args()
+    if not args.video and not (args.image and args.audio):
+        parser.error("必须提供 --video，或 --image 和 --audio")
+    preview(args.ass, args.output, args.start, args.end, args.lines, image=args.image, audio=args.audio,
+            video=args.video, height=args.height, preset=args.preset)
+
+# example usage:
+# python preview.py --ass outputs/song/lyrics.ass --image img/cover.png --audio inputs/song.mp3 --start 1:05 --end 1:30
+# python preview.py --ass outputs/song/lyrics.ass --video inputs/video.mp4 --lines 12-15
@@ -0,0 +1,298 @@
+"""
+本地渲染服务：常驻进程，模型只加载一次，通过 HTTP（或 Unix socket）提交 prepare / finalize / burn 任务。
+
+python server.py --port 8765 --workers 2 --preload medium
+python server.py --socket /tmp/karaoke.sock
+
+提交任务：
+curl -X POST localhost:8765/jobs -d '{"type": "prepare", "audio": "inputs/a.mp3"}'
+curl -X POST localhost:8765/jobs -d '{"type": "finalize", "audio": "inputs/a.mp3", "image": "img/cover.png"}'
+curl -X POST localhost:8765/jobs -d '{"type": "burn", "video": "inputs/v.mp4", "ass": "inputs/lyrics.ass"}'
+查询任务：
+curl localhost:8765/jobs/<id>
+curl localhost:8765/jobs
+"""
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+import traceback
+import socketserver
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from main import prepare, finalize, burn
+from transcribe import load_model, DEFAULT_MODEL
+from utils.asr_backends import BACKENDS, DEFAULT_BACKEND
+from utils import run_report
+
+JOB_TYPES = ("prepare", "finalize", "burn")
+
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = params["type"]
+        self.params = params
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.outputs = None
+        self.error = None
+        self.report = None
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+        if self.report is not None:
+            data["stage"] = self.report.current_stage
+            data["stages_done"] = [s["name"] for s in self.report.data["stages"]]
+        return data
+
+
+def _check_params(params):
+    job_type = params.get("type")
+    if job_type not in JOB_TYPES:
+        return f"type 必须是 {' / '.join(JOB_TYPES)}"
+    if job_type in ("prepare", "finalize") and not params.get("audio"):
+        return "prepare / finalize 必须提供 audio"
+    if job_type == "finalize" and not params.get("image") and not params.get("video"):
+        return "finalize 必须提供 image 或 video"
+    if params.get("backend", DEFAULT_BACKEND) not in BACKENDS:
+        return f"backend 必须是 {' / '.join(BACKENDS)}"
+    if job_type == "burn" and not (params.get("video") and params.get("ass")):
+        return "burn 必须提供 video 和 ass"
+    for key in ("audio", "image", "video", "ass"):
+        if params.get(key) and not os.path.exists(params[key]):
+            return f"文件不存在: {params[key]}"
+    return None
+
+
+class JobQueue:
+    """
+    任务队列：有界的等待队列 + 固定大小的工作线程池，任务状态保存在内存中。
+    已结束的任务只保留最近 keep_finished 个，常驻运行时内存不会无限增长。
+    写同一输出目录（或同一输出视频）的任务依次执行，不会同时改写 lyrics.txt、阶段状态等文件
+    """
+
+    def __init__(self, workers=1, max_queue=100, output_root="outputs", keep_finished=200):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_queue = max_queue
+        self.output_root = output_root
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        # 已结束任务的 id，按结束顺序
+        self.finished = deque()
+        self.lock = threading.Lock()
+        # 输出路径 -> [锁, 使用中的任务数]，没有任务使用时删除
+        self.output_locks = {}
+
+    def pending_count(self):
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def submit(self, params):
+        error = _check_params(params)
+        if error:
+            raise ValueError(error)
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_queue:
+                raise OverflowError("任务队列已满")
+            job = Job(params)
+            self.jobs[job.id] = job
+        self.pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _forget_old(self, job):
+        """记录任务结束，删除超出保留数量的最早结束的任务"""
+        with self.lock:
+            self.finished.append(job.id)
+            while len(self.finished) > self.keep_finished:
+                self.jobs.pop(self.finished.popleft(), None)
+
+    @contextmanager
+    def _output_lock(self, path):
+        """持有某个输出路径的锁，直到任务结束"""
+        key = os.path.abspath(path)
+        with self.lock:
+            entry = self.output_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.output_locks[key]
+
+    def _run(self, job):
+        params = job.params
+        output_dir = output_path = None
+        if params.get("audio"):
+            song_name = os.path.splitext(os.path.basename(params["audio"]))[0]
+            output_dir = os.path.join(self.output_root, song_name)
+        if job.type == "burn":
+            output_path = params.get("output") or os.path.splitext(params["video"])[0] + "_subtitled.mp4"
+        # 等待同一输出路径上的任务结束，整个任务（包括保存运行报告）期间持有锁
+        with self._output_lock(output_path or output_dir):
+            self._execute(job, output_dir, output_path)
+
+    def _execute(self, job, output_dir, output_path):
+        job.status = "running"
+        job.started_at = time.time()
+        params = job.params
+        job.report = run_report.start_run(job.type, job_id=job.id, params=params)
+        try:
+            if job.type == "prepare":
+                job.outputs = list(prepare(
+                    params["audio"],
+                    output_dir,
+                    st_type=params.get("st_type", "s"),
+                    model_name=params.get("model", DEFAULT_MODEL),
+                    use_cache=not params.get("no_cache", False),
+                    backend=params.get("backend", DEFAULT_BACKEND)
+                ))
+            elif job.type == "finalize":
+                job.outputs = finalize(
+                    params["audio"],
+                    output_dir,
+                    image=params.get("image"),
+                    video=params.get("video"),
+                    interactive=False,
+                    jobs=params.get("jobs", 1)
+                )
+            else:
+                burn(params["video"], params["ass"], output_path, params.get("jobs", 1))
+                job.outputs = [output_path]
+            job.status = "done"
+        except Exception:
+            job.status = "failed"
+            job.error = traceback.format_exc()
+        finally:
+            run_report.end_run()
+            if output_dir and os.path.isdir(output_dir):
+                job.report.save(os.path.join(output_dir, f"run_report_{job.type}.json"))
+            job.finished_at = time.time()
+            self._forget_old(job)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # 由 serve() 设置
+    queue = None
+
+    def address_string(self):
+        # Unix socket 没有客户端地址
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "pending": self.queue.pending_count()})
+        elif path == "/jobs":
+            self._send_json(200, [job.to_dict() for job in self.queue.list()])
+        elif path.startswith("/jobs/"):
+            job = self.queue.get(path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "任务不存在"})
+            else:
+                self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {"error": "未知路径"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "未知路径"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            job = self.queue.submit(params)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except OverflowError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        self._send_json(202, job.to_dict())
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(host="127.0.0.1", port=8765, socket_path=None, workers=1, max_queue=100, preload=None,
+          backend=DEFAULT_BACKEND, keep_finished=200):
+    if preload:
+        print(f"预加载识别模型: {backend} / {preload}")
+        load_model(preload, backend)
+
+    RequestHandler.queue = JobQueue(workers=workers, max_queue=max_queue, keep_finished=keep_finished)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, RequestHandler)
+        print(f"✅ 服务已启动: unix:{socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+        print(f"✅ 服务已启动: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地歌词视频渲染服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口 (默认: 8765)")
+    parser.add_argument("--socket", help="改为监听 Unix socket 路径")
+    parser.add_argument("--workers", type=int, default=1, help="同时执行的任务数 (默认: 1)")
+    parser.add_argument("--max_queue", type=int, default=100, help="最多排队/执行中的任务数 (默认: 100)")
+    parser.add_argument("--keep_finished", type=int, default=200,
+                        help="内存中保留的已结束任务数，更早的任务不再可查询 (默认: 200)")
+    parser.add_argument("--preload", default=DEFAULT_MODEL, help="启动时预加载的模型，传空字符串则不预加载")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="预加载模型的识别后端")
+
+    args = parser.parse_args()
+    serve(args.host, args.port, args.socket, args.workers, args.max_queue, args.preload, args.backend,
+          args.keep_finished)
+
+
+if __name__ == "__main__":
+    main()
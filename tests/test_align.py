@@ -0,0 +1,118 @@
+"""
+align 的测试：用模拟的 whisper 模块（find_alignment 按已知的真实时间返回词，超出窗口的词压缩到窗口末尾）
+验证窗口推进不会跳过歌词行的真实开始位置。
+
+python -m unittest tests.test_align
+"""
+import os
+import sys
+import types
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcribe  # noqa: E402
+from align import align_lyrics  # noqa: E402
+from utils.audio_split import SAMPLE_RATE  # noqa: E402
+
+N_SAMPLES = 30 * SAMPLE_RATE
+HOP_LENGTH = 160
+N_FRAMES = N_SAMPLES // HOP_LENGTH
+
+
+class _Mel:
+    """模拟的梅尔频谱，只记录窗口在音频中的开始时间（样本值就是时间）"""
+
+    def __init__(self, chunk):
+        self.offset = float(chunk[0])
+
+    def to(self, device):
+        return self
+
+
+class _Word:
+
+    def __init__(self, word, start, end):
+        self.word = word
+        self.start = start
+        self.end = end
+        self.probability = 1.0
+
+
+def fake_whisper(timeline):
+    """
+    构造模拟的 whisper 模块
+    :param timeline: 每行歌词的真实 (开始, 结束) 时间，行文本为 "L<序号>"
+    """
+    def find_alignment(model, tokenizer, tokens, mel, num_frames):
+        window_s = num_frames * HOP_LENGTH / SAMPLE_RATE
+        words = []
+        for name in "".join(tokens).split(" ")[1:]:
+            start, end = timeline[int(name[1:])]
+            start, end = start - mel.offset, end - mel.offset
+            if end > window_s:
+                # 窗口之外的歌词被压缩到窗口末尾
+                start, end = window_s - 0.5, window_s
+            words.append(_Word(" " + name, max(start, 0.0), end))
+        find_alignment.calls += 1
+        return words
+    find_alignment.calls = 0
+
+    tokenizer = types.SimpleNamespace(encode=list)
+    whisper = types.ModuleType("whisper")
+    whisper.log_mel_spectrogram = lambda chunk, n_mels: _Mel(chunk)
+    whisper.pad_or_trim = lambda mel, length: mel
+    audio = types.ModuleType("whisper.audio")
+    audio.N_FRAMES, audio.N_SAMPLES, audio.HOP_LENGTH = N_FRAMES, N_SAMPLES, HOP_LENGTH
+    timing = types.ModuleType("whisper.timing")
+    timing.find_alignment = find_alignment
+    tokenizer_module = types.ModuleType("whisper.tokenizer")
+    tokenizer_module.get_tokenizer = lambda *args, **kwargs: tokenizer
+    torch = types.ModuleType("torch")
+    torch.no_grad = mock.MagicMock
+    modules = {"torch": torch, "whisper": whisper, "whisper.audio": audio,
+               "whisper.timing": timing, "whisper.tokenizer": tokenizer_module}
+    return modules, find_alignment
+
+
+class AlignLyricsTest(unittest.TestCase):
+
+    def align(self, timeline, duration):
+        modules, find_alignment = fake_whisper(timeline)
+        model = types.SimpleNamespace(dims=types.SimpleNamespace(n_mels=80), device="cpu",
+                                      is_multilingual=True, num_languages=99)
+        samples = np.arange(int(duration * SAMPLE_RATE), dtype=np.float64) / SAMPLE_RATE
+        with mock.patch.dict(sys.modules, modules), \
+                mock.patch.object(transcribe, "load_model", return_value=types.SimpleNamespace(model=model)), \
+                mock.patch.object(transcribe, "decode_audio", return_value=(None, samples)), \
+                mock.patch.dict(transcribe._MODEL_LOCKS, {("whisper", "medium"): threading.Lock()}):
+            result = align_lyrics("song.mp3", [f"L{i}" for i in range(len(timeline))], model_name="medium")
+        return result, find_alignment.calls
+
+    def assert_onsets(self, result, timeline):
+        self.assertEqual([seg["text"] for seg in result["segments"]], [f"L{i}" for i in range(len(timeline))])
+        for seg, (start, end) in zip(result["segments"], timeline):
+            self.assertAlmostEqual(seg["start"], start, delta=0.1, msg=seg["text"])
+            self.assertAlmostEqual(seg["end"], end, delta=0.1, msg=seg["text"])
+
+    def test_first_line_ending_in_margin_keeps_its_onset(self):
+        # 前奏较长：第一行在 23 秒开始、在窗口末尾的保护区内结束
+        timeline = [(23.0, 25.5), (27.0, 29.0), (32.0, 35.0), (40.0, 44.0), (47.0, 50.0), (58.0, 61.0)]
+        result, _ = self.align(timeline, 70.0)
+        self.assert_onsets(result, timeline)
+
+    def test_instrumental_window_advances_a_full_stride(self):
+        # 前 60 秒没有歌词：所有词都被压缩到窗口末尾，整体向后移动窗口
+        timeline = [(70.0, 72.0), (74.0, 77.0), (80.0, 83.0)]
+        result, calls = self.align(timeline, 100.0)
+        self.assert_onsets(result, timeline)
+        # 0-30、25-55 秒两个间奏窗口，50-80 秒对齐第一行，72 秒开始的最后一个窗口对齐其余两行
+        self.assertEqual(calls, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+burn_subtitle 分段复制模式的测试：用 ffmpeg 生成的测试视频验证复制片段与重新编码片段拼接后
+帧数、编码参数与源视频一致，复制的片段逐帧无损。
+
+python -m unittest tests.test_burn_subtitle
+"""
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+os.environ.setdefault("KARAOKE_CACHE_DIR", tempfile.mkdtemp(prefix="karaoke_cache_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from burn_subtitle import burn_ass_copy_gaps, matching_encode_args, plan_spans  # noqa: E402
+
+HAS_FFMPEG = bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+
+ASS = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 640
+PlayResY: 360
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, \
+Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, \
+MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,40,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:08.20,0:00:11.50,Default,,0,0,0,,{\\kf50}hello {\\kf100}world
+"""
+
+# 与拼接结果比较的视频流参数
+STREAM_ENTRIES = "stream=codec_name,profile,level,pix_fmt,r_frame_rate,time_base,sample_aspect_ratio,nb_read_frames"
+
+
+def ffprobe_stream(path):
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-count_frames", "-select_streams", "v:0",
+         "-show_entries", STREAM_ENTRIES, "-of", "default=noprint_wrappers=1", path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return dict(line.split("=", 1) for line in out.splitlines())
+
+
+def frame_hashes(path):
+    """每帧解码结果的 md5（按显示顺序）"""
+    out = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-map", "0:v", "-f", "framemd5", "-"],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return [line.rsplit(",", 1)[1].strip() for line in out.splitlines() if not line.startswith("#")]
+
+
+class PlanSpansTest(unittest.TestCase):
+
+    def test_spans_start_at_keyframes(self):
+        spans = plan_spans([(8.2, 11.5)], [0, 4, 8, 12, 16], 20.0)
+        self.assertEqual(spans, [(0.0, 8, False), (8, 12, True), (12, 20.0, False)])
+
+    def test_short_gaps_are_merged(self):
+        spans = plan_spans([(1.0, 3.0), (4.5, 6.0)], [0, 2, 4, 6, 8], 10.0, min_copy=2.0)
+        self.assertEqual(spans, [(0.0, 6, True), (6, 10.0, False)])
+
+
+class MatchingEncodeArgsTest(unittest.TestCase):
+
+    def test_h264(self):
+        video_filter, args = matching_encode_args({
+            "codec_name": "h264", "profile": "Main", "level": 31, "pix_fmt": "yuv420p",
+            "r_frame_rate": "30000/1001", "avg_frame_rate": "30000/1001", "sample_aspect_ratio": "4:3",
+            "color_space": "bt709", "color_range": "tv",
+        }, "h264")
+        self.assertEqual(video_filter, ",setsar=4/3")
+        joined = " ".join(args)
+        for expected in ("-c:v libx264", "-pix_fmt yuv420p", "-profile:v main", "-level:v 3.1",
+                         "-r 30000/1001", "-colorspace bt709", "-color_range tv"):
+            self.assertIn(expected, joined)
+
+    def test_hevc_level_and_variable_frame_rate(self):
+        video_filter, args = matching_encode_args({
+            "codec_name": "hevc", "profile": "Main 10", "level": 93, "pix_fmt": "yuv420p10le",
+            "r_frame_rate": "60/1", "avg_frame_rate": "5997/100", "sample_aspect_ratio": "0:1",
+        }, "hevc")
+        self.assertEqual(video_filter, "")
+        self.assertIn("main10", args)
+        self.assertIn("level-idc=3.1:log-level=error", args)
+        self.assertNotIn("-r", args)
+
+
+@unittest.skipUnless(HAS_FFMPEG, "需要 ffmpeg 和 ffprobe")
+class CopyGapsConcatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="copy_gaps_")
+        self.ass = os.path.join(self.work_dir, "lyrics.ass")
+        with open(self.ass, "w", encoding="utf-8") as f:
+            f.write(ASS)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def make_source(self, name, video_args, rate="30000/1001"):
+        path = os.path.join(self.work_dir, name)
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error",
+             "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate={rate}:duration=20",
+             "-f", "lavfi", "-i", "sine=frequency=440:duration=20",
+             *video_args, "-c:a", "aac", "-shortest", path],
+            check=True
+        )
+        return path
+
+    def assert_concat_matches(self, source):
+        output = os.path.join(self.work_dir, "output.mp4")
+        burn_ass_copy_gaps(source, self.ass, output)
+
+        # 拼接结果与源视频的流参数、帧数一致，且能无错误解码
+        self.assertEqual(ffprobe_stream(output), ffprobe_stream(source))
+        decode = subprocess.run(["ffmpeg", "-v", "error", "-i", output, "-f", "null", "-"],
+                                capture_output=True, text=True)
+        self.assertEqual(decode.returncode, 0)
+        self.assertEqual(decode.stderr, "")
+
+        # 只有字幕所在的片段被重新编码，其余帧与源视频逐帧相同
+        before, after = frame_hashes(source), frame_hashes(output)
+        self.assertEqual(len(before), len(after))
+        changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+        self.assertTrue(changed)
+        fps = len(before) / 20
+        self.assertLessEqual(changed[0] / fps, 8.2)
+        self.assertGreaterEqual(changed[-1] / fps, 11.4)
+        self.assertLess(len(changed), len(before) / 2)
+
+    def test_h264_encoded_span_joins_copied_spans(self):
+        source = self.make_source("h264.mp4", [
+            "-vf", "setsar=4/3", "-c:v", "libx264", "-profile:v", "main", "-level:v", "3.1",
+            "-pix_fmt", "yuv420p", "-g", "30", "-keyint_min", "30", "-sc_threshold", "0",
+        ])
+        self.assert_concat_matches(source)
+
+    def test_hevc_encoded_span_joins_copied_spans(self):
+        source = self.make_source("hevc.mp4", [
+            "-c:v", "libx265", "-pix_fmt", "yuv420p",
+            "-x265-params", "keyint=25:min-keyint=25:scenecut=0:open-gop=0:log-level=error",
+        ], rate="25")
+        self.assert_concat_matches(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+player 的测试：生成的页面中标题和音频路径经过转义。
+
+python -m unittest tests.test_player
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_ass import whisper_to_ass  # noqa: E402
+from player import write_player  # noqa: E402
+
+
+class _PageParser(HTMLParser):
+    """收集 <title> 文本和 <audio> 的 src"""
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.audio_src = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag == "audio":
+            self.audio_src = dict(attrs).get("src")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+class WritePlayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="player_")
+        result = {"segments": [{"start": 1.0, "end": 2.0, "text": "你好",
+                                "words": [{"word": "你", "start": 1.0, "end": 1.5},
+                                          {"word": "好", "start": 1.5, "end": 2.0}]}]}
+        self.ass_path, _ = whisper_to_ass(result, None, self.work_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_title_and_audio_are_escaped(self):
+        audio_dir = os.path.join(self.work_dir, "my songs")
+        os.makedirs(audio_dir)
+        audio = os.path.join(audio_dir, "live #2 ?100%.mp3")
+        open(audio, "wb").close()
+        output_dir = os.path.join(self.work_dir, "out")
+        title = 'a<b>&"c" __AUDIO__'
+
+        path = write_player(self.ass_path, audio, output_dir, title=title)
+        with open(path, "r", encoding="utf-8") as f:
+            page = f.read()
+
+        self.assertNotIn("<b>", page)
+        parser = _PageParser()
+        parser.feed(page)
+        self.assertEqual(parser.title, title)
+        # src 中没有会截断路径的字符，解码后就是相对路径
+        self.assertNotIn(" ", parser.audio_src)
+        self.assertNotIn("#", parser.audio_src)
+        self.assertNotIn("?", parser.audio_src)
+        self.assertEqual(unquote(parser.audio_src), "../my songs/live #2 ?100%.mp3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+update_lyric 的测试：新旧歌词字数不一致时自动重新分配插入字的时间。
+
+python -m unittest tests.test_update_lyric
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from update_lyric import retime_lyrics  # noqa: E402
+from utils.ass_document import AssDocument  # noqa: E402
+
+ASS = """[Script Info]
+ScriptType: v4.00+
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:08.20,0:00:11.50,Default,,0,0,0,,{\\kf50}hello {\\kf2}world
+Dialogue: 0,0:00:12.00,0:00:13.00,Default,,0,0,0,,{\\kf50}你{\\kf50}好
+"""
+
+
+def retime(lines):
+    doc, _ = retime_lyrics(AssDocument.parse(ASS), lines, interactive=False)
+    return [(e.start, e.end, e.text) for e in doc.dialogues]
+
+
+class RedistributeInsertTest(unittest.TestCase):
+
+    def test_insert_inside_word_joins_the_word(self):
+        self.assertEqual(retime(["hello worlxd", "你好"])[0], (820, 1150, "{\\kf50}hello {\\kf2}worlxd"))
+
+    def test_inserted_characters_get_at_least_one_centisecond(self):
+        self.assertEqual(retime(["hello wxyzorld", "你好"])[0][2], "{\\kf50}hello {\\kf1}w{\\kf1}x{\\kf1}y{\\kf1}zorld")
+
+    def test_insert_after_word_shares_its_duration(self):
+        self.assertEqual(retime(["hellox world", "你好"])[0][2], "{\\kf25}hello{\\kf25}x {\\kf2}world")
+
+    def test_trailing_line_extends_after_last_word(self):
+        self.assertEqual(retime(["hello world", "你好", "再见"])[1:], [
+            (1200, 1300, "{\\kf50}你{\\kf50}好"),
+            (1300, 1400, "{\\kf50}再{\\kf50}见"),
+        ])
+        self.assertEqual(retime(["hello world", "你好再见"])[1], (1200, 1400, "{\\kf50}你{\\kf50}好{\\kf50}再{\\kf50}见"))
+
+
+if __name__ == "__main__":
+    unittest.main()
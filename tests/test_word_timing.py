@@ -0,0 +1,33 @@
+"""
+word_timing 的测试：按时间查找正在唱的字。
+
+python -m unittest tests.test_word_timing
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.word_timing import WordTiming  # noqa: E402
+
+
+class WordAtTest(unittest.TestCase):
+
+    def test_word_at(self):
+        timing = WordTiming.from_words([100, 150, 300], [150, 200, 350], [0, 0, 1], ["你", "好", "吗"])
+        self.assertEqual(timing.word_at(120), 0)
+        self.assertEqual(timing.word_at(150), 1)
+        self.assertEqual(timing.word_at(250), -1)
+        np.testing.assert_array_equal(timing.word_at([0, 199, 300, 400]), [-1, 1, 2, -1])
+
+    def test_empty_timing(self):
+        timing = WordTiming.from_words([], [], [], [])
+        self.assertEqual(timing.word_at(100), -1)
+        np.testing.assert_array_equal(timing.word_at([0, 100]), [-1, -1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+import os
+import subprocess
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import run_report
+from utils.asr_backends import DEFAULT_BACKEND, DEFAULT_MODEL, get_backend
+from utils import pcm_cache
+from utils.audio_split import SAMPLE_RATE, split_on_silence
+from utils.transcribe_cache import TranscribeCache
+
+# 已加载的模型，(后端, 模型名) → AsrBackend，同一进程内复用
+_MODELS = {}
+# whisper 解码时会在模型上挂 kv-cache 钩子，同一模型不能在多个线程中同时识别
+_MODEL_LOCKS = {}
+_LOAD_LOCK = threading.Lock()
+
+
+def load_model(model_name=DEFAULT_MODEL, backend=DEFAULT_BACKEND, threads=None):
+    """
+    加载（或复用已加载的）识别模型
+    :param backend: 识别后端，见 utils.asr_backends.BACKENDS
+    :param threads: 推理线程数，只在首次加载时生效
+    """
+    key = (backend, model_name)
+    with _LOAD_LOCK:
+        if key not in _MODELS:
+            _MODELS[key] = get_backend(backend)(model_name, threads)
+            _MODEL_LOCKS[key] = threading.Lock()
+    return _MODELS[key]
+
+
+# ---------------------------
+# 并行识别（子进程）
+# ---------------------------
+
+def _init_worker(backend, model_name, threads):
+    load_model(model_name, backend, threads)
+
+
+def _transcribe_chunk(backend, model_name, pcm_file, start, end, options):
+    # 子进程直接映射同一个 PCM 文件，不通过进程间传输复制音频数据
+    samples = pcm_cache.open_pcm(pcm_file)[start:end]
+    offset = start / SAMPLE_RATE
+    result = load_model(model_name, backend).transcribe(samples, **options)
+    for seg in result["segments"]:
+        seg["start"] += offset
+        seg["end"] += offset
+        for w in seg.get("words", []):
+            w["start"] += offset
+            w["end"] += offset
+    return result
+
+
+def decode_audio(audio_path):
+    """
+    解码为 16kHz 单声道 PCM：每个文件只解码一次，之后各阶段和各子进程都从 memmap 缓存零拷贝读取
+    :return: (PCM 缓存文件路径, float32 数组)
+    """
+    with run_report.stage("audio_decode", inputs=[audio_path]) as record:
+        pcm_file, hit = pcm_cache.decode(audio_path)
+        samples = pcm_cache.open_pcm(pcm_file)
+        record["audio_s"] = round(len(samples) / SAMPLE_RATE, 2)
+        record["pcm_cached"] = hit
+    return pcm_file, samples
+
+
+def merge_chunk_results(results):
+    """将各片段的识别结果（时间已加偏移）按顺序拼接为一个结果"""
+    segments = []
+    for result in results:
+        for seg in result["segments"]:
+            seg["id"] = len(segments)
+            segments.append(seg)
+    return {
+        "text": "".join(r["text"] for r in results),
+        "segments": segments,
+        "language": results[0].get("language") if results else None,
+    }
+
+
+def transcribe_parallel(audio_path, model_name=DEFAULT_MODEL, options=None, workers=2,
+                        threads_per_worker=None, split_options=None, backend=DEFAULT_BACKEND):
+    """
+    在静音/间奏处切分音频，多进程并行识别，再按全局时间偏移拼接结果。
+    每个进程各自加载一份模型，内存占用约为 workers 倍。
+    :param workers: 进程数
+    :param threads_per_worker: 每个进程的推理线程数，默认平分 CPU 核数
+    :param split_options: 传给 split_on_silence 的参数
+    :param backend: 识别后端
+    """
+    options = options or {}
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+    pcm_file, samples = decode_audio(audio_path)
+    chunks = split_on_silence(samples, **(split_options or {}))
+    print(f"音频切分为 {len(chunks)} 段，使用 {workers} 个进程 × {threads} 线程识别")
+
+    # torch 不支持 fork 后再使用，统一用 spawn
+    ctx = multiprocessing.get_context("spawn")
+    with run_report.stage("transcribe", backend=backend, model=model_name, workers=workers, chunks=len(chunks)), \
+            ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx,
+                                initializer=_init_worker, initargs=(backend, model_name, threads)) as pool:
+        futures = [
+            pool.submit(_transcribe_chunk, backend, model_name, pcm_file, start, end, options)
+            for start, end in chunks
+        ]
+        results = [f.result() for f in futures]
+
+    return merge_chunk_results(results)
+
+
+# ---------------------------
+# 流式识别（内存只与窗口长度有关）
+# ---------------------------
+
+def _shift_segment(seg, offset):
+    seg["start"] += offset
+    seg["end"] += offset
+    for w in seg.get("words", []):
+        w["start"] += offset
+        w["end"] += offset
+    return seg
+
+
+def format_duration(sec):
+    m, s = divmod(int(sec), 60)
+    h, m = divmod(m, 60)
+    return f"{h:d}:{m:02d}:{s:02d}"
+
+
+def transcribe_stream(audio_path, model_name=DEFAULT_MODEL, language="zh", window=120.0, overlap=10.0,
+                      backend=DEFAULT_BACKEND, decode_options=None):
+    """
+    流式识别：ffmpeg 解码输出通过管道按窗口读取，逐窗口识别，按时间顺序逐个产出 segment（时间为全局时间）。
+    不解码整个文件、不保留整份识别结果，内存只与窗口长度有关，适合数小时的现场录音。
+
+    窗口末尾 overlap 秒内结束的 segment 可能被窗口截断，不在本窗口输出；
+    下一个窗口从最后输出的 segment 结束处开始，重新识别被截断的部分，因此既不重复也不遗漏。
+    :param window: 每个识别窗口的长度（秒）
+    :param overlap: 窗口末尾不输出的保护区长度（秒），即相邻窗口至少重叠的长度
+    :param decode_options: 其余解码参数（beam_size 等）
+    """
+    if overlap >= window:
+        raise ValueError("overlap 必须小于 window")
+    window_size = int(window * SAMPLE_RATE)
+    guard = int(overlap * SAMPLE_RATE)
+    options = {"language": language, "word_timestamps": True, **(decode_options or {})}
+
+    print(f"加载识别模型: {backend} / {model_name}")
+    with run_report.stage("model_load", backend=backend, model=model_name):
+        model = load_model(model_name, backend)
+    model_lock = _MODEL_LOCKS[(backend, model_name)]
+
+    proc = subprocess.Popen([
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", audio_path,
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-"
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    buffer = np.zeros(0, dtype=np.float32)
+    # buffer[0] 在整段音频中的采样序号
+    buffer_start = 0
+    eof = False
+    windows = 0
+    try:
+        while True:
+            # 补满一个窗口
+            while not eof and len(buffer) < window_size:
+                data = proc.stdout.read((window_size - len(buffer)) * 4)
+                if not data:
+                    eof = True
+                    break
+                data = data[:len(data) // 4 * 4]
+                buffer = np.concatenate([buffer, np.frombuffer(data, dtype=np.float32)])
+            if not len(buffer):
+                break
+
+            offset = buffer_start / SAMPLE_RATE
+            limit = offset + (len(buffer) - guard) / SAMPLE_RATE
+            with run_report.stage("transcribe_window", backend=backend, model=model_name, window=windows,
+                                  audio_s=round(len(buffer) / SAMPLE_RATE, 2)), model_lock:
+                result = model.transcribe(buffer, **options)
+            windows += 1
+
+            last_end = None
+            for seg in result["segments"]:
+                seg = _shift_segment(seg, offset)
+                # 最后一个窗口全部输出；否则保护区内结束的 segment 留给下一个窗口
+                # （本窗口一个都没输出时仍输出第一个，保证前进）
+                if not eof and seg["end"] > limit and last_end is not None:
+                    break
+                yield seg
+                last_end = seg["end"]
+                if not eof and last_end > limit:
+                    break
+            print(f"已识别至 {format_duration(offset + len(buffer) / SAMPLE_RATE)}")
+            if eof:
+                break
+
+            # 下一个窗口从最后输出的 segment 结束处开始；没有输出时跳过保护区之前的部分
+            advance = len(buffer) - guard
+            if last_end is not None:
+                advance = min(max(int(last_end * SAMPLE_RATE) - buffer_start, 1), len(buffer))
+            buffer = buffer[advance:].copy()
+            buffer_start += advance
+    finally:
+        # 提前结束（如调用方中断）时 ffmpeg 可能还在输出
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        stderr = proc.stderr.read().decode(errors="ignore")
+        proc.stderr.close()
+    if proc.returncode and not buffer_start and not windows:
+        raise RuntimeError(f"音频解码失败: {stderr}")
+
+
+def transcribe_audio(audio_path, model_name=DEFAULT_MODEL, language="zh", use_cache=True, cache=None,
+                     workers=1, threads_per_worker=None, split_options=None, backend=DEFAULT_BACKEND,
+                     decode_options=None):
+    """
+    识别音频，返回 whisper 格式的 segments/words 结果。
+    启用缓存时，相同音频内容 + 后端 + 模型 + 参数直接返回缓存结果，不加载模型。
+    :param audio_path: 音频路径
+    :param model_name: 模型名 (small / medium / large ...)
+    :param language: 识别语言
+    :param use_cache: 是否使用识别结果缓存
+    :param cache: TranscribeCache 实例，默认使用默认缓存目录
+    :param workers: 大于 1 时按静音切分后多进程并行识别
+    :param threads_per_worker: 并行识别时每个进程的推理线程数
+    :param split_options: 并行识别时传给 split_on_silence 的参数
+    :param backend: 识别后端 (whisper / faster-whisper)
+    :param decode_options: 其余解码参数（beam_size、temperature 等），计入缓存键
+    """
+    options = {"language": language, "word_timestamps": True, **(decode_options or {})}
+    # 切分方式会影响识别结果，需要计入缓存键；进程数只影响速度，不计入
+    cache_options = dict(options)
+    if workers > 1:
+        cache_options["split"] = split_options or {}
+    model_key = get_backend(backend).cache_key(model_name)
+
+    if use_cache:
+        cache = cache or TranscribeCache()
+        with run_report.stage("cache_lookup", inputs=[audio_path]) as record:
+            result = cache.get(audio_path, model_key, cache_options)
+            record["hit"] = result is not None
+        if result is not None:
+            print("✅ 命中识别缓存，跳过识别")
+            return result
+
+    if workers > 1:
+        result = transcribe_parallel(audio_path, model_name, options, workers,
+                                     threads_per_worker, split_options, backend)
+    else:
+        print(f"加载识别模型: {backend} / {model_name}")
+        with run_report.stage("model_load", backend=backend, model=model_name):
+            model = load_model(model_name, backend)
+        _, samples = decode_audio(audio_path)
+        with run_report.stage("transcribe", backend=backend, model=model_name), _MODEL_LOCKS[(backend, model_name)]:
+            result = model.transcribe(samples, **options)
+
+    if use_cache:
+        cache.put(audio_path, model_key, cache_options, result)
+    return result
@@ -1,125 +1,161 @@
-import re
-from io import StringIO
-from utils.sequence_diff import find_misalignment_intervals
-
-
-class AssTime:
-    def __init__(self, arg):
-        """
-        time_str: 字符串，格式为 "时:分:秒.百分秒"，例如 "0:00:12.41
-        """
-        if isinstance(arg, int):
-            self.total_hundredths = arg
-        else:
-            hours, minutes, rest = arg.split(':')
-            seconds, hundredths = rest.split('.')
-            self.total_hundredths = (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 100 + int(hundredths)
+import json
 
-    def add(self, add_time):
-        self.total_hundredths += add_time
+from utils.ass_document import AssDocument, AssTime, KaraokeTiming, KaraokeWord, format_karaoke
+from utils.sequence_diff import find_misalignment_intervals, get_opcodes
 
-    def __str__(self):
-        total_seconds = self.total_hundredths // 100
-        remaining_hundredths = self.total_hundredths % 100
 
-        hours = total_seconds // 3600
-        remaining_seconds = total_seconds % 3600
-        minutes = remaining_seconds // 60
-        seconds = remaining_seconds % 60
+# print(AssTime("0:01:23.45"))
 
-        return f"{hours}:{minutes:02d}:{seconds:02d}.{remaining_hundredths:02d}"
-    
-    def copy(self):
-        return AssTime(self.total_hundredths)
 
+def _split_evenly(total, count):
+    """把 total 百分秒尽量平均地分成 count 份（整数，和不变）"""
+    base, extra = divmod(total, count)
+    return [base + (1 if i < extra else 0) for i in range(count)]
 
-# print(AssTime("0:01:23.45"))
 
+def redistribute_timing(lyric_words, starts, opcodes):
+    """
+    新旧歌词字数不一致时，按差分结果把旧字的时间重新分配给新歌词的每个字。
+    - 替换：被替换片段的总时长平均分给新字
+    - 删除：被删字的时长并入同一行中前一个字（行首则并入后一个字）
+    - 插入：与前一个词（文首则与后一个字）平分其时长，每个字至少 1 百分秒；插在多字符词中间时并入该词；
+      文末插入的字接在最后一个字之后，延长最后一行
+    :param lyric_words: 旧歌词的 KaraokeWord 列表（每个字恰好一个非空白字符）
+    :param starts: 旧歌词每个字的绝对开始时间（百分秒）
+    :param opcodes: get_opcodes(旧歌词, 新歌词) 的结果
+    :return: (新的 KaraokeWord 列表, 每个字的绝对开始时间)，与新歌词逐字对应
+    """
+    starts = list(starts)
+    durations = [w.duration for w in lyric_words]
+    words = []
+    new_starts = []
+
+    def add_word(row, start, duration=None, template=None):
+        """duration 为 None 时不加时长标签（多字符词的后续字符）"""
+        word = KaraokeWord('?', row, template.tag if template is not None else None)
+        if duration is not None:
+            word.set_duration(duration)
+        words.append(word)
+        new_starts.append(start)
+
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            for i in range(i1, i2):
+                word = lyric_words[i]
+                if durations[i] != word.duration:
+                    word.set_duration(durations[i])
+                words.append(word)
+                new_starts.append(starts[i])
+        elif tag == 'replace':
+            span_start = starts[i1]
+            span_end = max(span_start, starts[i2 - 1] + durations[i2 - 1])
+            count = j2 - j1
+            offset = 0
+            for k, duration in enumerate(_split_evenly(span_end - span_start, count)):
+                template = lyric_words[i1 + k * (i2 - i1) // count]
+                add_word(template.row, span_start + offset, duration, template)
+                offset += duration
+        elif tag == 'delete':
+            row = lyric_words[i1].row
+            if words and words[-1].row == row:
+                # 前一个字延长到被删片段结束
+                prev = words[-1]
+                prev.set_duration(starts[i2 - 1] + durations[i2 - 1] - new_starts[-1])
+            elif i2 < len(lyric_words) and lyric_words[i2].row == row:
+                # 后一个字提前到被删片段开始
+                durations[i2] += starts[i2] - starts[i1]
+                starts[i2] = starts[i1]
+        else:  # insert
+            count = j2 - j1
+            if words and i1 == len(lyric_words):
+                # 文末插入：接在最后一个字之后，每个字取最后一行的平均字时长，延长最后一行而不是压缩最后一个字
+                prev = words[-1]
+                row_durations = [w.duration for w in words if w.row == prev.row]
+                duration = max(sum(row_durations) // len(row_durations), 1)
+                start = new_starts[-1] + prev.duration
+                for _ in range(count):
+                    add_word(prev.row, start, duration, prev)
+                    start += duration
+            elif words and words[-1].tag is None and lyric_words[i1].tag is None \
+                    and lyric_words[i1].row == words[-1].row:
+                # 插在一个多字符词（如英文单词）中间：并入该词，不拆出时长为 0 的片段
+                for _ in range(count):
+                    add_word(words[-1].row, new_starts[-1])
+            elif words:
+                # 与前一个词平分其时长（每份至少 1 百分秒）；前一个字是多字符词的后续字符时取该词开头的字
+                head = len(words) - 1
+                while head > 0 and words[head].tag is None and words[head - 1].row == words[head].row:
+                    head -= 1
+                prev = words[head]
+                shares = [max(share, 1) for share in _split_evenly(prev.duration, count + 1)]
+                prev.set_duration(shares[0])
+                start = new_starts[head] + shares[0]
+                for duration in shares[1:]:
+                    add_word(prev.row, start, duration, prev)
+                    start += duration
+            elif i1 < len(lyric_words):
+                following = lyric_words[i1]
+                shares = [max(share, 1) for share in _split_evenly(durations[i1], count + 1)]
+                start = starts[i1]
+                for duration in shares[:-1]:
+                    add_word(following.row, start, duration, following)
+                    start += duration
+                durations[i1] = shares[-1]
+                starts[i1] = start
+            else:
+                for _ in range(count):
+                    add_word(0, 0, 1)
+
+    return words, new_starts
 
-def replace_ass_lyrics(txt_path, ass_path, output_path, ignore_space=True):
+
+def retime_lyrics(doc, txt_lines, ignore_space=True, interactive=True, offset_tolerance=10):
     """
-    ignore_space: 是否忽略原歌词中的空格
+    将修改后的歌词逐字替换到 ass 文档中，并按新的换行重新计算每行的起止时间。
+    新旧歌词字数不一致时，用差分找出增删的字，自动重新分配这些字的时间。
+    :param doc: AssDocument，原始（Whisper 生成的）字幕
+    :param txt_lines: 修改后的歌词行
+    :param ignore_space: 是否忽略原歌词中的空格
+    :param interactive: 字数不一致时是否询问用户是否继续（False 时直接自动分配时间）
+    :param offset_tolerance: 差分允许的最大累计错位字数
+    :return: (新的 AssDocument, 错位区间列表)；用户选择退出时 AssDocument 为 None
     """
-    # 读取修改后的 txt 歌词
-    with open(txt_path, 'r', encoding='utf-8') as f:
-        txt_lines = [line.strip() for line in f.readlines() if line.strip()]
+    dialogues = doc.dialogues
+    # 格式化旧歌词，每个字记录所在 dialogue 行号和时长标签
+    lyric_words = doc.karaoke_words(ignore_space)
 
-    # 读取原始 ass 文件
-    with open(ass_path, 'r', encoding='utf-8') as f:
-        ass_lines = f.readlines()
-
-    # 找到 [Events] 段起始索引
-    event_start = None
-    for i, line in enumerate(ass_lines):
-        if line.strip().startswith('[Events]'):
-            event_start = i
-            break
-    if event_start is None:
-        raise ValueError("ASS 文件中未找到 [Events] 段")
-
-    # 分离出元信息和歌词部分
-    header = ass_lines[:event_start + 2]
-    dialogue_lines = ass_lines[event_start + 2:]
-
-    # 格式化旧歌词 [[word, dialogue_time_row, tag]]
-    lyric_words = []
-    # 存储每个dialogue的时间[start_time, end_time]
-    dialogue_time_rows = []
-
-    for i, line in enumerate(dialogue_lines):
-        parts = line.strip().split(',', 9)
-        dialogue_time_rows.append([AssTime(parts[1]), AssTime(parts[2])])
-        lyric_part = parts[9].strip()
-        j = 0
-        lyric_len = len(lyric_part)
-        current_lyric_word = [None, i, None]
-        while j < lyric_len:
-            c = lyric_part[j]
-            j += 1
-            if c == ' ':
-                if ignore_space:
-                    continue
-                if current_lyric_word[2] is None:
-                    lyric_words[-1][0] += ' '
-                elif current_lyric_word[0] is None:
-                    current_lyric_word[0] = ' '
-                else:
-                    current_lyric_word[0] += ' '
-                continue
-            if c == '{':
-                t = j
-                while j < lyric_len and lyric_part[j] != '}':
-                    j += 1
-                current_lyric_word[2] = lyric_part[t: j]
-                j += 1
-                continue
-            current_lyric_word[0] = c if current_lyric_word[0] is None else current_lyric_word[0] + c
-            lyric_words.append(current_lyric_word)
-            current_lyric_word = [None, i, None]
-   
-   
     # 将新旧歌词全部转为字符串进行对比，找出错位区间，先去除所有空白字符
-    old_lyric_str = ''.join(w[0] for w in lyric_words).replace(' ', '')
+    old_lyric_str = ''.join(w.text for w in lyric_words).replace(' ', '')
     new_lyric_str = ''.join(line.replace(' ', '') for line in txt_lines)
     print(f'原歌词总字数（不含空格）: {len(old_lyric_str)}')
     print(f'新歌词总字数（不含空格）: {len(new_lyric_str)}')
+    # 逐字计算时间需在替换文字前完成（只依赖时长标签和行号）
+    timing = KaraokeTiming(dialogues, lyric_words)
+    starts = [timing.start(i) for i in range(len(lyric_words))]
+
+    intervals = []
     if len(old_lyric_str) != len(new_lyric_str):
-        print('⚠️ 警告：新旧歌词字数不匹配，可能导致时间信息错乱！')
+        print('⚠️ 警告：新旧歌词字数不匹配，将自动重新分配增删字的时间')
         intervals = find_misalignment_intervals(
             ref=old_lyric_str,
             pred=new_lyric_str,
             min_match_len=3,
-            offset_tolerance=10
+            offset_tolerance=offset_tolerance
         )
         print('错位区间列表(括号里表示字在歌词中的位置):')
         for i, inteval in enumerate(intervals):
             print(f'  {i + 1}. 新歌词({inteval["start_pred"]}): {inteval["lyric_pred"]}')
             print(f'     原歌词({inteval["start_ref"]}): {inteval["lyric_ref"]}')
-        print('请确认是否无视这些错位区间并继续？')
-        temp = input('输入 y 继续，其他键退出: ')
-        if temp.lower() != 'y':
-            print('已退出。')
-            return
+        if interactive:
+            print('请确认是否无视这些错位区间并继续？')
+            temp = input('输入 y 继续，其他键退出: ')
+            if temp.lower() != 'y':
+                print('已退出。')
+                return None, intervals
+        lyric_words, starts = redistribute_timing(
+            lyric_words, starts, get_opcodes(old_lyric_str, new_lyric_str, band=offset_tolerance)
+        )
+
     # 歌词替换
     word_index = 0
     new_word_rows = []
@@ -130,84 +166,75 @@ def replace_ass_lyrics(txt_path, ass_path, output_path, ignore_space=True):
         for c in line:
             if word_index >= total_words:
                 break
+            word = lyric_words[word_index]
             if c == ' ':
-                if lyric_words[word_index][0][0] != ' ' and lyric_words[word_index - 1][0][-1] != ' ':
-                    lyric_words[word_index - 1][0] += ' '
+                if word.text[0] != ' ' and lyric_words[word_index - 1].text[-1] != ' ':
+                    lyric_words[word_index - 1].text += ' '
                 continue
-            if lyric_words[word_index][0][0] == ' ':
-                lyric_words[word_index][0] = ' ' + c
-            elif lyric_words[word_index][0][-1] == ' ':
-                lyric_words[word_index][0] = c + ' '
+            if word.text[0] == ' ':
+                word.text = ' ' + c
+            elif word.text[-1] == ' ':
+                word.text = c + ' '
             else:
-                lyric_words[word_index][0] = c
-            row.append(lyric_words[word_index])
+                word.text = c
+            row.append(word)
             word_index += 1
 
     # 生成新的 dialogue 行
-    dialogue_example_line = dialogue_lines[0]
-    example_parts = dialogue_example_line.strip().split(',', 9)
-
     new_dialogues = []
-
     word_index = 0
-    for i, word_row in enumerate(new_word_rows):
+    for word_row in new_word_rows:
         if not word_row:
             continue
-
-        # 计算 start_time
-        start_time_row_index = word_row[0][1]
-        t = word_index - 1
-        while t >= 0 and lyric_words[t][1] == start_time_row_index:
-            t -= 1
-        if t < word_index - 1:
-            temp_start = dialogue_time_rows[lyric_words[t + 1][1]][0].copy()
-            for p in range(t + 1, word_index):
-                tag = lyric_words[p][2]
-                if tag:
-                    temp_start.add(int(re.search(r'\d+', tag).group()))
-            start_time = temp_start
-        else:
-            start_time = dialogue_time_rows[start_time_row_index][0]
-        
-        # 计算 end_time (如果最后一个字恰好是该行最后一个字，则取该行end_time而非start_time加偏移量)
+        first_index = word_index
         word_index += len(word_row)
-        end_time_row_index = word_row[-1][1]
-        if word_index < total_words and lyric_words[word_index][1] > end_time_row_index:
-            end_time = dialogue_time_rows[end_time_row_index][1]
+        last_index = word_index - 1
+
+        # 行开始时间 = 第一个字在原时间轴上的开始时间
+        start_time = starts[first_index]
+
+        # 如果最后一个字恰好是原行最后一个字，则取原行 end_time，
+        # 否则（旧歌词的 end_time 会稍有偏移量）取最后一个字的结束时间
+        end_row = word_row[-1].row
+        if word_index < total_words and lyric_words[word_index].row > end_row:
+            end_time = timing.row_end[end_row]
         else:
-            # 旧歌词的end_time会稍有偏移量，故采用start_time加偏移量的方式计算
-            t = 2
-            while t < len(word_row) and lyric_words[word_index - t][1] == end_time_row_index:
-                t += 1
-            temp_end = dialogue_time_rows[lyric_words[word_index - t][1]][0].copy()
-            for p in range(word_index - t, word_index):
-                tag = lyric_words[p][2]
-                if tag:
-                    temp_end.add(int(re.search(r'\d+', tag).group()))
-            end_time = temp_end
-
-        # 生成新的 lyric 部分
-        new_lyric_part_io = StringIO()
-        for w in word_row:
-            if w[2]:
-                new_lyric_part_io.write('{' + w[2] + '}')
-            new_lyric_part_io.write(w[0])
-
-        example_parts[1] = str(start_time)
-        example_parts[2] = str(end_time)
-        example_parts[9] = new_lyric_part_io.getvalue()
-
-        new_dialogue_line = ','.join(example_parts) + '\n'
-        new_dialogues.append(new_dialogue_line)
-
-    # 生成新的 ASS 内容
-    new_ass = header + new_dialogues
+            end_time = starts[last_index] + lyric_words[last_index].duration
+
+        new_dialogues.append(dialogues[word_row[0].row].copy(
+            start=start_time,
+            end=end_time,
+            text=format_karaoke(word_row)
+        ))
+
+    doc.set_events([e for e in doc.events if e.kind != 'Dialogue'] + new_dialogues)
+    return doc, intervals
+
+
+def replace_ass_lyrics(txt_path, ass_path, output_path, ignore_space=True, interactive=True, report_path=None):
+    """
+    ignore_space: 是否忽略原歌词中的空格
+    interactive: 新旧歌词字数不一致时是否询问用户是否继续
+    report_path: 若提供，将错位区间以 JSON 写入该文件
+    返回错位区间列表；用户选择退出时返回 None
+    """
+    # 读取修改后的 txt 歌词
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        txt_lines = [line.strip() for line in f.readlines() if line.strip()]
+
+    # 读取原始 ass 文件
+    doc, intervals = retime_lyrics(AssDocument.load(ass_path), txt_lines, ignore_space, interactive)
+    if report_path and intervals:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(intervals, f, ensure_ascii=False, indent=2)
+    if doc is None:
+        return None
 
     # 写入新文件
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(new_ass)
+    doc.save(output_path)
 
     print(f'✅ 已生成新的 ASS 文件: {output_path}')
+    return intervals
 
 
 # 示例用法
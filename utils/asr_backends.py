@@ -0,0 +1,106 @@
+"""
+语音识别后端。所有后端的 transcribe() 都返回与 openai-whisper 相同结构的结果：
+{"text", "language", "segments": [{"id", "start", "end", "text", "words": [{"word", "start", "end", "probability"}]}]}
+whisper_to_ass、识别缓存、并行拼接都只依赖这个结构。
+
+- whisper: openai-whisper（PyTorch，FP32）
+- faster-whisper: CTranslate2 int8 量化推理，CPU 上更快、内存更小（需安装 faster-whisper）
+"""
+
+DEFAULT_BACKEND = "whisper"
+DEFAULT_MODEL = "medium"
+
+
+class AsrBackend:
+    name = None
+
+    def __init__(self, model_name, threads=None):
+        """
+        :param model_name: 模型名 (small / medium / large-v3 ...)
+        :param threads: 推理使用的 CPU 线程数，默认由后端决定
+        """
+        self.model_name = model_name
+        self.threads = threads
+
+    @classmethod
+    def cache_key(cls, model_name):
+        """写入识别缓存键的模型标识，不同后端/精度的结果分开缓存；不加载模型即可得到"""
+        return f"{cls.name}/{model_name}"
+
+    def transcribe(self, samples, language=None, word_timestamps=True, **options):
+        """
+        :param samples: 16kHz 单声道 float32 PCM
+        :param options: 其余解码参数（beam_size、temperature 等），原样传给后端
+        """
+        raise NotImplementedError
+
+
+class WhisperBackend(AsrBackend):
+    name = "whisper"
+
+    def __init__(self, model_name, threads=None):
+        super().__init__(model_name, threads)
+        import whisper
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_name)
+
+    @classmethod
+    def cache_key(cls, model_name):
+        # 与引入多后端之前的缓存键保持一致，已有缓存继续有效
+        return model_name
+
+    def transcribe(self, samples, language=None, word_timestamps=True, **options):
+        return self.model.transcribe(samples, language=language, word_timestamps=word_timestamps, **options)
+
+
+class FasterWhisperBackend(AsrBackend):
+    name = "faster-whisper"
+    compute_type = "int8"
+
+    def __init__(self, model_name, threads=None):
+        super().__init__(model_name, threads)
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_name, device="cpu", compute_type=self.compute_type,
+                                  cpu_threads=threads or 0)
+
+    @classmethod
+    def cache_key(cls, model_name):
+        return f"{cls.name}-{cls.compute_type}/{model_name}"
+
+    def transcribe(self, samples, language=None, word_timestamps=True, **options):
+        segments, info = self.model.transcribe(samples, language=language, word_timestamps=word_timestamps,
+                                               **options)
+        result_segments = []
+        for seg in segments:
+            result_segments.append({
+                "id": len(result_segments),
+                "start": float(seg.start),
+                "end": float(seg.end),
+                "text": seg.text,
+                "words": [
+                    {"word": w.word, "start": float(w.start), "end": float(w.end),
+                     "probability": float(w.probability)}
+                    for w in (seg.words or [])
+                ],
+            })
+        return {
+            "text": "".join(seg["text"] for seg in result_segments),
+            "segments": result_segments,
+            "language": info.language,
+        }
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"未知的识别后端: {name}，可选: {' / '.join(BACKENDS)}")
+    return BACKENDS[name]
@@ -0,0 +1,340 @@
+import re
+from itertools import accumulate
+
+# 卡拉OK标签 \k \K \kf \ko 的时长（百分秒）
+_KARAOKE_DURATION = re.compile(r'(\\[kK][fo]?)(\d+)')
+# 歌词文本切分：{...} 标签（允许缺少右括号）或单个字符
+_TOKEN = re.compile(r'\{[^}]*\}?|[^{]')
+
+DEFAULT_EVENT_FORMAT = ['Layer', 'Start', 'End', 'Style', 'Name', 'MarginL', 'MarginR', 'MarginV', 'Effect', 'Text']
+
+
+def parse_time(time_str):
+    """ "时:分:秒.百分秒" → 百分秒整数 """
+    hours, minutes, rest = time_str.split(':')
+    seconds, hundredths = rest.split('.')
+    return (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 100 + int(hundredths)
+
+
+def format_time(total_hundredths):
+    """ 百分秒整数 → "时:分:秒.百分秒" """
+    total_seconds, remaining_hundredths = divmod(total_hundredths, 100)
+    hours, remaining_seconds = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remaining_seconds, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{remaining_hundredths:02d}"
+
+
+class AssTime:
+    def __init__(self, arg):
+        """
+        time_str: 字符串，格式为 "时:分:秒.百分秒"，例如 "0:00:12.41
+        """
+        if isinstance(arg, int):
+            self.total_hundredths = arg
+        else:
+            self.total_hundredths = parse_time(arg)
+
+    def add(self, add_time):
+        self.total_hundredths += add_time
+
+    def __str__(self):
+        return format_time(self.total_hundredths)
+
+    def copy(self):
+        return AssTime(self.total_hundredths)
+
+
+class KaraokeWord:
+    """
+    卡拉OK中的一个字：text 为字本身（可能带前/后空格），row 为所在 Dialogue 行序号，
+    tag 为字前 {} 中的原始标签内容，duration 为标签中的卡拉OK时长（百分秒，解析时计算一次）
+    """
+    __slots__ = ('text', 'row', 'tag', 'duration')
+
+    def __init__(self, text, row, tag=None):
+        self.text = text
+        self.row = row
+        self.tag = tag
+        match = _KARAOKE_DURATION.search(tag) if tag else None
+        self.duration = int(match.group(2)) if match else 0
+
+    def set_duration(self, duration):
+        """修改卡拉OK时长，同步改写标签（没有卡拉OK标签时追加 \\kf）"""
+        self.duration = duration
+        if self.tag and _KARAOKE_DURATION.search(self.tag):
+            self.tag = _KARAOKE_DURATION.sub(lambda m: f"{m.group(1)}{duration}", self.tag, count=1)
+        else:
+            self.tag = (self.tag or '') + f'\\kf{duration}'
+
+    def __repr__(self):
+        return f"KaraokeWord({self.text!r}, row={self.row}, tag={self.tag!r})"
+
+
+def parse_karaoke(text, row=0, ignore_space=True, words=None):
+    """
+    将一行卡拉OK歌词拆分为逐字的 KaraokeWord，追加到 words 中并返回。
+    空格：标签之后、字之前的空格作为该字的前导空格；字之后的空格附加到前一个字末尾。
+    :param ignore_space: 是否忽略歌词中的空格
+    :param words: 已有的字列表（跨行解析时，行首空格会附加到上一行最后一个字）
+    """
+    if words is None:
+        words = []
+    current_text = None
+    current_tag = None
+    for match in _TOKEN.finditer(text.strip()):
+        token = match.group()
+        if token[0] == '{':
+            current_tag = token[1:-1] if token[-1] == '}' else token[1:]
+            continue
+        if token == ' ':
+            if ignore_space:
+                continue
+            if current_tag is None:
+                if words:
+                    words[-1].text += ' '
+            elif current_text is None:
+                current_text = ' '
+            else:
+                current_text += ' '
+            continue
+        current_text = token if current_text is None else current_text + token
+        words.append(KaraokeWord(current_text, row, current_tag))
+        current_text = None
+        current_tag = None
+    return words
+
+
+def format_karaoke(words):
+    """将 KaraokeWord 列表还原为带标签的歌词文本"""
+    return ''.join('{' + w.tag + '}' + w.text if w.tag else w.text for w in words)
+
+
+class AssEntry:
+    """ [V4+ Styles] 等段中的 "Key: v1,v2,..." 条目 """
+    __slots__ = ('kind', 'values')
+
+    def __init__(self, kind, values):
+        self.kind = kind
+        self.values = values
+
+    def dumps(self):
+        return f"{self.kind}: {','.join(self.values)}"
+
+
+class AssEvent:
+    """
+    [Events] 段中的 Dialogue/Comment 条目。
+    start/end 在解析时转为百分秒整数，text 单独保存，其余字段保留在 values 中
+    """
+    __slots__ = ('kind', 'values', 'start', 'end', 'text')
+
+    def __init__(self, kind, values, start, end, text):
+        self.kind = kind
+        self.values = values
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def copy(self, **changes):
+        event = AssEvent(self.kind, self.values, self.start, self.end, self.text)
+        for key, value in changes.items():
+            setattr(event, key, value)
+        return event
+
+    def karaoke_words(self, row=0, ignore_space=True):
+        return parse_karaoke(self.text, row, ignore_space)
+
+
+class AssSection:
+    """
+    ass 的一个段。lines 按原顺序保存：原始字符串行（注释、空行、Key: Value），
+    以及按 Format 解析出的 AssEntry / AssEvent
+    """
+    __slots__ = ('name', 'format', 'lines')
+
+    def __init__(self, name, format=None, lines=None):
+        self.name = name
+        self.format = format
+        self.lines = lines if lines is not None else []
+
+    def entries(self, kind=None):
+        return [x for x in self.lines if not isinstance(x, str) and (kind is None or x.kind == kind)]
+
+
+class AssDocument:
+    """
+    ass 字幕文档：按段解析 [Script Info] / [V4+ Styles] / [Events]，
+    Styles 与 Events 按各自的 Format 行拆分字段，dumps() 还原为文本
+    """
+
+    def __init__(self, sections=None, preamble=None):
+        self.sections = sections if sections is not None else []
+        # 第一个段之前的内容（一般为空）
+        self.preamble = preamble if preamble is not None else []
+
+    # ---------------------------
+    # 解析 / 序列化
+    # ---------------------------
+
+    @classmethod
+    def parse(cls, text):
+        doc = cls()
+        section = None
+        for line in text.lstrip('\ufeff').splitlines():
+            stripped = line.strip()
+            if stripped.startswith('[') and stripped.endswith(']'):
+                section = AssSection(stripped[1:-1])
+                doc.sections.append(section)
+                continue
+            if section is None:
+                doc.preamble.append(line)
+                continue
+            kind, sep, rest = line.partition(':')
+            kind = kind.strip()
+            if not sep or stripped.startswith(';'):
+                section.lines.append(line)
+            elif kind == 'Format':
+                section.format = [name.strip() for name in rest.split(',')]
+                section.lines.append(line)
+            elif section.name == 'Events' and kind in ('Dialogue', 'Comment'):
+                section.lines.append(cls._parse_event(section, kind, rest))
+            elif section.format and section.name.endswith('Styles'):
+                section.lines.append(AssEntry(kind, cls._split_values(section.format, rest)))
+            else:
+                section.lines.append(line)
+        return doc
+
+    @staticmethod
+    def _split_values(fmt, rest):
+        return rest.lstrip().split(',', len(fmt) - 1)
+
+    @classmethod
+    def _parse_event(cls, section, kind, rest):
+        fmt = section.format or DEFAULT_EVENT_FORMAT
+        values = cls._split_values(fmt, rest)
+        fields = dict(zip(fmt, values))
+        return AssEvent(kind, values, parse_time(fields['Start']), parse_time(fields['End']),
+                        fields.get('Text', '').strip())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.parse(f.read())
+
+    def _dump_event(self, section, event):
+        fmt = section.format or DEFAULT_EVENT_FORMAT
+        values = list(event.values)
+        for name, value in (('Start', format_time(event.start)), ('End', format_time(event.end)),
+                            ('Text', event.text)):
+            if name in fmt:
+                values[fmt.index(name)] = value
+        return f"{event.kind}: {','.join(values)}"
+
+    def dumps(self):
+        out = list(self.preamble)
+        for section in self.sections:
+            out.append(f"[{section.name}]")
+            for line in section.lines:
+                if isinstance(line, str):
+                    out.append(line)
+                elif isinstance(line, AssEvent):
+                    out.append(self._dump_event(section, line))
+                else:
+                    out.append(line.dumps())
+        return '\n'.join(out) + '\n'
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+    # ---------------------------
+    # 访问
+    # ---------------------------
+
+    def section(self, name):
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    @property
+    def script_info(self):
+        section = self.section('Script Info')
+        info = {}
+        for line in section.lines if section else []:
+            key, sep, value = line.partition(':')
+            if sep and not line.startswith(';'):
+                info[key.strip()] = value.strip()
+        return info
+
+    @property
+    def styles(self):
+        """ {样式名: {字段名: 值}} """
+        styles = {}
+        for section in self.sections:
+            if not section.name.endswith('Styles') or not section.format:
+                continue
+            for entry in section.entries('Style'):
+                fields = dict(zip(section.format, entry.values))
+                styles[fields.get('Name', '')] = fields
+        return styles
+
+    @property
+    def events(self):
+        section = self.section('Events')
+        if section is None:
+            raise ValueError("ASS 文件中未找到 [Events] 段")
+        return section.entries()
+
+    @property
+    def dialogues(self):
+        return [e for e in self.events if e.kind == 'Dialogue']
+
+    def set_events(self, events):
+        """用 events 替换 [Events] 段中的全部条目，插入在原第一个条目的位置"""
+        section = self.section('Events')
+        if section is None:
+            raise ValueError("ASS 文件中未找到 [Events] 段")
+        position = next((i for i, x in enumerate(section.lines) if not isinstance(x, str)), None)
+        kept = [x for x in section.lines if isinstance(x, str)]
+        if position is None:
+            # 去掉末尾空行后追加
+            while kept and not kept[-1].strip():
+                kept.pop()
+            position = len(kept)
+        section.lines = kept[:position] + list(events) + kept[position:]
+
+    def karaoke_words(self, ignore_space=True):
+        """所有 Dialogue 行的逐字列表，KaraokeWord.row 为 Dialogue 序号"""
+        words = []
+        for row, event in enumerate(self.dialogues):
+            parse_karaoke(event.text, row, ignore_space, words)
+        return words
+
+
+class KaraokeTiming:
+    """
+    逐字时间索引：对字时长做一次前缀和，任意字的绝对开始时间 O(1) 求出。
+    字的开始时间 = 所在行开始时间 + 该行中此字之前所有字的时长之和
+    """
+
+    def __init__(self, dialogues, words):
+        self.words = words
+        self.row_start = [e.start for e in dialogues]
+        self.row_end = [e.end for e in dialogues]
+        # offsets[i] = 前 i 个字的时长之和
+        self.offsets = list(accumulate((w.duration for w in words), initial=0))
+        # 每行第一个字的序号
+        self.row_first = [0] * len(dialogues)
+        previous_row = None
+        for i, w in enumerate(words):
+            if w.row != previous_row:
+                self.row_first[w.row] = i
+                previous_row = w.row
+
+    def start(self, index):
+        row = self.words[index].row
+        return self.row_start[row] + self.offsets[index] - self.offsets[self.row_first[row]]
+
+    def end(self, index):
+        return self.start(index) + self.words[index].duration
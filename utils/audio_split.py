@@ -0,0 +1,68 @@
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_db(samples, sr=SAMPLE_RATE, frame_ms=30):
+    """计算每帧的 RMS 音量（dB，相对于最响的一帧）"""
+    frame_len = int(sr * frame_ms / 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame_len
+    frames = np.asarray(samples[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10
+    db = 20 * np.log10(rms / rms.max())
+    return db, frame_len
+
+
+def find_silences(samples, sr=SAMPLE_RATE, frame_ms=30, silence_db=-35.0, min_silence=0.5):
+    """
+    查找静音/间奏区间。
+    :return: [(start_sample, end_sample), ...]
+    """
+    db, frame_len = frame_db(samples, sr, frame_ms)
+    quiet = db < silence_db
+    min_frames = max(1, int(min_silence * 1000 / frame_ms))
+
+    silences = []
+    # 找出连续静音帧的起止位置
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], quiet.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start >= min_frames:
+            silences.append((int(start) * frame_len, int(end) * frame_len))
+    return silences
+
+
+def split_on_silence(samples, sr=SAMPLE_RATE, target_chunk=60.0, max_chunk=120.0,
+                     silence_db=-35.0, min_silence=0.5):
+    """
+    在静音处把音频切成互相独立的片段，每段尽量接近 target_chunk 秒，不超过 max_chunk 秒。
+    切点取静音区间的中点；max_chunk 内找不到静音时，在最安静的一帧处强制切开。
+    :return: [(start_sample, end_sample), ...]，首尾相接覆盖整段音频
+    """
+    total = len(samples)
+    target = int(target_chunk * sr)
+    limit = int(max_chunk * sr)
+    if total <= limit:
+        return [(0, total)]
+
+    cut_points = [(s + e) // 2 for s, e in find_silences(samples, sr, silence_db=silence_db,
+                                                         min_silence=min_silence)]
+    chunks = []
+    start = 0
+    i = 0
+    while total - start > limit:
+        # 跳过离当前起点太近的切点
+        while i < len(cut_points) and cut_points[i] - start < target:
+            i += 1
+        if i < len(cut_points) and cut_points[i] - start <= limit:
+            cut = cut_points[i]
+            i += 1
+        else:
+            # 在 [start + target, start + limit] 内找最安静的位置
+            db, frame_len = frame_db(samples[start + target:start + limit], sr)
+            cut = start + target + (int(np.argmin(db)) * frame_len if len(db) else 0)
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, total))
+    return chunks
@@ -0,0 +1,47 @@
+import subprocess
+
+
+def filter_path(path):
+    """
+    将文件路径转换为可用于 ffmpeg 滤镜参数（如 ass=）的形式。
+    滤镜参数中不能用"\\"作为路径分隔符，必须使用"/"，且":"需要转义（Windows 盘符）。
+    """
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+
+def run_ffmpeg(args, quiet=False):
+    """
+    运行 ffmpeg 命令。
+    :param args: ffmpeg 之后的参数列表（不含 "ffmpeg" 本身）
+    :param quiet: 是否只输出错误信息
+    """
+    cmd = ["ffmpeg", "-y"]
+    if quiet:
+        cmd += ["-hide_banner", "-loglevel", "error"]
+    subprocess.run(cmd + list(args), check=True)
+
+
+def split_filter_graph(video_in, variants, prefix="", audio_in=None, audio_filter=None):
+    """
+    生成把一路视频解码结果 split 成多路、各自缩放并写入字幕的滤镜图，
+    用于一次 ffmpeg 运行输出多个版本（只解码一次，分别编码）。
+    :param video_in: 输入视频流标签，如 "0:v"
+    :param variants: [{"ass": 字幕路径, "width": 宽, "height": 高}, ...]，宽高为 None 时不缩放
+    :param prefix: 每路缩放后、写入字幕前追加的滤镜（如 "format=yuv420p,"）
+    :param audio_in: 需要同样 split 的音频流标签，None 表示不处理音频
+    :param audio_filter: split 前对音频应用的滤镜（如 "volume=1.0"）
+    :return: (滤镜图, 各路视频输出标签, 各路音频输出标签)
+    """
+    n = len(variants)
+    video_labels = [f"[v{i}]" for i in range(n)]
+    parts = [f"[{video_in}]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+    for i, variant in enumerate(variants):
+        scale = f"scale={variant['width']}:{variant['height']}," if variant.get("width") else ""
+        parts.append(f"[s{i}]{scale}{prefix}ass={filter_path(variant['ass'])}{video_labels[i]}")
+
+    audio_labels = []
+    if audio_in is not None:
+        audio_labels = [f"[a{i}]" for i in range(n)]
+        chain = f"{audio_filter}," if audio_filter else ""
+        parts.append(f"[{audio_in}]{chain}asplit={n}" + "".join(audio_labels))
+    return ";".join(parts), video_labels, audio_labels
@@ -0,0 +1,254 @@
+"""
+音频指纹索引：识别同一录音的不同文件（重新编码、不同码率、重新上传、前后多了几秒），
+找出时间偏移后直接复用已修正好的歌词，不再运行 Whisper。
+
+指纹为频谱峰值配对（landmark）：在对数频谱上取局部最大值，每个峰值与其后的几个峰值组成
+(频率1, 频率2, 时间差) 哈希，连同峰值的时间写入 sqlite 索引。
+查询时统计 (歌曲, 参考时间 - 查询时间) 的票数，票数最多且足够多的即为匹配，时间差即偏移。
+重新编码只会改变少量峰值，时间差对整体平移不变，因此对两者都稳健。
+
+python -m utils.fingerprint add inputs/song.mp3 outputs/song      # 手动加入索引
+python -m utils.fingerprint query inputs/song_remaster.flac        # 查询匹配
+"""
+import os
+import sqlite3
+import argparse
+
+import numpy as np
+
+from utils import pcm_cache
+from utils.audio_split import SAMPLE_RATE
+from utils.transcribe_cache import DEFAULT_CACHE_DIR
+
+# 降采样到 8kHz 后计算频谱：帧长 1024（128ms），帧移 128（16ms，即偏移的精度）
+FP_SAMPLE_RATE = 8000
+N_FFT = 1024
+HOP = 128
+# 峰值邻域（帧数、频率格数），每秒最多保留的峰值数
+PEAK_TIME = 10
+PEAK_FREQ = 10
+PEAKS_PER_SECOND = 30
+# 每个峰值向后最多配对的峰值数、最大时间差（帧，6 位）
+FAN_OUT = 5
+MAX_DT = 63
+# 每次计算频谱的帧数，内存与音频长度无关
+BLOCK_FRAMES = 4096
+
+# 判定为同一录音：票数不少于 MIN_MATCHES，且占查询哈希数的比例不低于 MIN_RATIO
+MIN_MATCHES = 20
+MIN_RATIO = 0.05
+
+
+def index_path(cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, "fingerprints.sqlite")
+
+
+def frame_seconds(frames):
+    return frames * HOP / FP_SAMPLE_RATE
+
+
+def _downsample(samples):
+    """16kHz → 8kHz：相邻两个采样取平均（简单低通）后隔一取一"""
+    n = len(samples) // 2 * 2
+    return (np.asarray(samples[:n], dtype=np.float32).reshape(-1, 2).mean(axis=1))
+
+
+def _spectrogram(samples, first, count):
+    """第 first 帧起 count 帧的对数幅度谱，形状 (count, N_FFT // 2)"""
+    window = np.hanning(N_FFT).astype(np.float32)
+    segment = samples[first * HOP:(first + count - 1) * HOP + N_FFT]
+    if len(segment) < (count - 1) * HOP + N_FFT:
+        segment = np.pad(segment, (0, (count - 1) * HOP + N_FFT - len(segment)))
+    frames = np.lib.stride_tricks.sliding_window_view(segment, N_FFT)[::HOP][:count]
+    spec = np.abs(np.fft.rfft(frames * window, axis=1))[:, :N_FFT // 2]
+    return np.log(spec + 1e-6).astype(np.float32)
+
+
+def _max_filter(spec, size, axis):
+    """沿 axis 的滑动最大值（窗口 2 * size + 1，边缘补最小值）"""
+    pad = [(0, 0)] * spec.ndim
+    pad[axis] = (size, size)
+    padded = np.pad(spec, pad, constant_values=-np.inf)
+    return np.lib.stride_tricks.sliding_window_view(padded, 2 * size + 1, axis=axis).max(axis=-1)
+
+
+def find_peaks(samples):
+    """
+    频谱峰值：在 (2 * PEAK_TIME + 1) 帧 × (2 * PEAK_FREQ + 1) 频率格的邻域内最大，且高于该段频谱的中位数，
+    每段只保留最强的 PEAKS_PER_SECOND × 时长 个。按块计算，块边缘多取一个邻域保证结果与整体计算一致。
+    :return: (帧序号数组, 频率格数组)，按时间、频率排序
+    """
+    samples = _downsample(samples)
+    n_frames = max(0, (len(samples) - N_FFT) // HOP + 1)
+    per_block = int(PEAKS_PER_SECOND * frame_seconds(BLOCK_FRAMES))
+    times, freqs = [], []
+    for first in range(0, n_frames, BLOCK_FRAMES):
+        lo = max(0, first - PEAK_TIME)
+        hi = min(n_frames, first + BLOCK_FRAMES + PEAK_TIME)
+        spec = _spectrogram(samples, lo, hi - lo)
+        local_max = _max_filter(_max_filter(spec, PEAK_TIME, 0), PEAK_FREQ, 1)
+        is_peak = (spec == local_max) & (spec > np.median(spec))
+        # 只取本块范围内的峰值（边缘部分属于相邻的块）
+        is_peak[:first - lo] = False
+        is_peak[first - lo + BLOCK_FRAMES:] = False
+        t, f = np.nonzero(is_peak)
+        if len(t) > per_block:
+            keep = np.sort(np.argsort(spec[t, f])[-per_block:])
+            t, f = t[keep], f[keep]
+        times.append(t + lo)
+        freqs.append(f)
+    if not times:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(times).astype(np.int64), np.concatenate(freqs).astype(np.int64)
+
+
+def landmark_hashes(samples):
+    """
+    :param samples: 16kHz 单声道 float32 PCM
+    :return: (哈希数组, 锚点帧序号数组)；哈希 = 频率1 (9 位) | 频率2 (9 位) | 时间差 (6 位)
+    """
+    times, freqs = find_peaks(samples)
+    hashes, anchors = [], []
+    for k in range(1, FAN_OUT + 1):
+        dt = times[k:] - times[:-k]
+        valid = (dt > 0) & (dt <= MAX_DT)
+        f1, f2 = freqs[:-k][valid], freqs[k:][valid]
+        hashes.append((f1 << 15) | (f2 << 6) | dt[valid])
+        anchors.append(times[:-k][valid])
+    if not hashes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(anchors)
+
+
+class FingerprintIndex:
+    """sqlite 指纹索引：songs 记录每首已处理歌曲的输出目录，hashes 记录 (哈希, 歌曲, 锚点帧)"""
+
+    def __init__(self, path=None):
+        self.path = path or index_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS songs (
+                id INTEGER PRIMARY KEY,
+                output_dir TEXT UNIQUE,
+                audio TEXT,
+                audio_key TEXT
+            );
+            CREATE TABLE IF NOT EXISTS hashes (hash INTEGER, song_id INTEGER, t INTEGER);
+            CREATE INDEX IF NOT EXISTS hashes_hash ON hashes (hash);
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _audio_key(audio_path):
+        stat = os.stat(audio_path)
+        return f"{os.path.abspath(audio_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def add(self, audio_path, output_dir):
+        """
+        把 output_dir 的歌曲加入索引（同一输出目录重复加入时覆盖），音频未变时跳过
+        :return: 是否重新计算了指纹
+        """
+        output_dir = os.path.abspath(output_dir)
+        audio_key = self._audio_key(audio_path)
+        row = self.db.execute("SELECT id, audio_key FROM songs WHERE output_dir = ?", (output_dir,)).fetchone()
+        if row and row[1] == audio_key:
+            return False
+
+        hashes, anchors = landmark_hashes(pcm_cache.load(audio_path))
+        with self.db:
+            if row:
+                self.db.execute("DELETE FROM hashes WHERE song_id = ?", (row[0],))
+                self.db.execute("DELETE FROM songs WHERE id = ?", (row[0],))
+            song_id = self.db.execute(
+                "INSERT INTO songs (output_dir, audio, audio_key) VALUES (?, ?, ?)",
+                (output_dir, os.path.abspath(audio_path), audio_key)
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO hashes (hash, song_id, t) VALUES (?, ?, ?)",
+                zip(hashes.tolist(), [song_id] * len(hashes), anchors.tolist())
+            )
+        return True
+
+    def remove(self, output_dir):
+        output_dir = os.path.abspath(output_dir)
+        with self.db:
+            self.db.execute("DELETE FROM hashes WHERE song_id IN (SELECT id FROM songs WHERE output_dir = ?)",
+                            (output_dir,))
+            self.db.execute("DELETE FROM songs WHERE output_dir = ?", (output_dir,))
+
+    def query(self, audio_path, exclude=None):
+        """
+        查找同一录音
+        :param exclude: 不参与匹配的输出目录（如当前歌曲自己的）
+        :return: {"output_dir", "audio", "offset", "matches", "ratio"} 或 None；
+                 offset 为秒，参考歌曲中 t 秒处的内容在查询音频中位于 t - offset 秒
+        """
+        hashes, anchors = landmark_hashes(pcm_cache.load(audio_path))
+        if not len(hashes):
+            return None
+
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER, t INTEGER)")
+        self.db.execute("DELETE FROM query")
+        self.db.executemany("INSERT INTO query (hash, t) VALUES (?, ?)", zip(hashes.tolist(), anchors.tolist()))
+        rows = self.db.execute(
+            "SELECT h.song_id, h.t - q.t FROM hashes h JOIN query q ON h.hash = q.hash"
+        ).fetchall()
+        self.db.execute("DELETE FROM query")
+        if not rows:
+            return None
+
+        excluded = {os.path.abspath(exclude)} if exclude else set()
+        pairs = np.array(rows, dtype=np.int64)
+        # 按 (歌曲, 时间差) 投票
+        keys, counts = np.unique(pairs, axis=0, return_counts=True)
+        for index in np.argsort(counts)[::-1]:
+            song_id, delta = keys[index]
+            matches = int(counts[index])
+            ratio = matches / len(hashes)
+            if matches < MIN_MATCHES or ratio < MIN_RATIO:
+                return None
+            output_dir, audio = self.db.execute("SELECT output_dir, audio FROM songs WHERE id = ?",
+                                                (int(song_id),)).fetchone()
+            if output_dir in excluded:
+                continue
+            return {
+                "output_dir": output_dir,
+                "audio": audio,
+                "offset": round(frame_seconds(int(delta)), 3),
+                "matches": matches,
+                "ratio": round(ratio, 3),
+            }
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="音频指纹索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p = subparsers.add_parser("add", help="把已处理的歌曲加入索引")
+    p.add_argument("audio", help="音频路径")
+    p.add_argument("output_dir", help="该歌曲的输出目录")
+    p = subparsers.add_parser("query", help="查找同一录音")
+    p.add_argument("audio", help="音频路径")
+    parser.add_argument("--index", help="索引路径 (默认: 缓存目录/fingerprints.sqlite)")
+
+    args = parser.parse_args()
+    with FingerprintIndex(args.index) as fp_index:
+        if args.command == "add":
+            fp_index.add(args.audio, args.output_dir)
+            print(f"✅ 已加入索引: {args.output_dir}")
+        else:
+            match = fp_index.query(args.audio)
+            if match:
+                print(f"✅ 匹配 {match['output_dir']}，偏移 {match['offset']:+.3f} 秒"
+                      f"（{match['matches']} 个哈希，{match['ratio']:.0%}）")
+            else:
+                print("未找到匹配")
@@ -0,0 +1,173 @@
+import os
+import json
+import uuid
+import hashlib
+import subprocess
+from fractions import Fraction
+
+from utils.transcribe_cache import DEFAULT_CACHE_DIR, evict_lru
+
+# 磁盘缓存上限 64MB（每个文件一条，长视频的关键帧列表较大）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 进程内缓存：(绝对路径, 修改时间, 大小) -> 结果
+_MEMO = {}
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def _cache_dir():
+    return os.path.join(DEFAULT_CACHE_DIR, "probe")
+
+
+def _disk_cache_path(kind, file_key):
+    digest = hashlib.sha256(json.dumps(file_key).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(_cache_dir(), f"{kind}_{digest}.json")
+
+
+def _cached(kind, path, compute):
+    """
+    先查进程内缓存，再查磁盘缓存，都没有时调用 compute 并写入缓存。
+    磁盘缓存先写临时文件再原子替换，超过 DEFAULT_MAX_BYTES 时删除最久未使用的条目
+    """
+    file_key = _file_key(path)
+    memo_key = (kind,) + file_key
+    if memo_key in _MEMO:
+        return _MEMO[memo_key]
+
+    cache_path = _disk_cache_path(kind, file_key)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            value = json.load(f)
+        # 更新修改时间，作为最近使用时间用于淘汰
+        os.utime(cache_path)
+    except (OSError, ValueError):
+        value = compute(path)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, cache_path)
+            evict_lru(_cache_dir(), ".json", DEFAULT_MAX_BYTES, keep=cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _MEMO[memo_key] = value
+    return value
+
+
+def _ffprobe_json(args):
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-of", "json"] + args,
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out)
+
+
+def _parse_rate(rate):
+    try:
+        value = Fraction(rate)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return float(value) if value else None
+
+
+class MediaInfo:
+    """ffprobe 读取的容器信息：时长、各条流、第一条视频流的分辨率和帧率"""
+
+    def __init__(self, data):
+        self.data = data
+        fmt = data.get("format", {})
+        self.streams = data.get("streams", [])
+        self.format_name = fmt.get("format_name")
+        self.size = int(fmt["size"]) if "size" in fmt else None
+        self.bit_rate = int(fmt["bit_rate"]) if "bit_rate" in fmt else None
+
+        # 容器没有时长时取各条流中最长的
+        durations = [float(s["duration"]) for s in self.streams if "duration" in s]
+        if "duration" in fmt:
+            self.duration = float(fmt["duration"])
+        else:
+            self.duration = max(durations) if durations else None
+
+        self.video = next((s for s in self.streams if s.get("codec_type") == "video"
+                           and not s.get("disposition", {}).get("attached_pic")), None)
+        self.audio = next((s for s in self.streams if s.get("codec_type") == "audio"), None)
+
+    @property
+    def width(self):
+        return self.video.get("width") if self.video else None
+
+    @property
+    def height(self):
+        return self.video.get("height") if self.video else None
+
+    @property
+    def fps(self):
+        if not self.video:
+            return None
+        return _parse_rate(self.video.get("avg_frame_rate")) or _parse_rate(self.video.get("r_frame_rate"))
+
+    @property
+    def sample_rate(self):
+        return int(self.audio["sample_rate"]) if self.audio and "sample_rate" in self.audio else None
+
+    def __repr__(self):
+        return (f"MediaInfo(duration={self.duration}, video={self.width}x{self.height}@{self.fps}, "
+                f"audio={self.sample_rate}Hz)")
+
+
+def probe(path):
+    """读取媒体文件信息（ffprobe 每个文件只调用一次，按 路径 + 修改时间 + 大小 缓存）"""
+    data = _cached("format", path, lambda p: _ffprobe_json(["-show_format", "-show_streams", p]))
+    return MediaInfo(data)
+
+
+def duration(path):
+    return probe(path).duration
+
+
+def _read_keyframes(path):
+    # 只读取数据包的标记，不解码视频
+    data = _ffprobe_json([
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        path
+    ])
+    return sorted(float(p["pts_time"]) for p in data.get("packets", [])
+                  if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A"))
+
+
+def keyframes(path):
+    """第一条视频流所有关键帧的时间（秒），结果同样缓存"""
+    return _cached("keyframes", path, _read_keyframes)
+
+
+def _read_closed_keyframes(path):
+    # 数据包按解码顺序输出；开放 GOP 的关键帧（如 hevc 的 CRA）之后还有显示时间更早、
+    # 参考上一个 GOP 的帧，在这样的关键帧处切开会丢帧
+    data = _ffprobe_json([
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        path
+    ])
+    packets = [(float(p["pts_time"]), "K" in p.get("flags", "")) for p in data.get("packets", [])
+               if p.get("pts_time") not in (None, "N/A")]
+    closed = []
+    for i, (pts, key) in enumerate(packets):
+        if not key:
+            continue
+        j = i + 1
+        while j < len(packets) and not packets[j][1] and packets[j][0] > pts:
+            j += 1
+        if j == len(packets) or packets[j][1]:
+            closed.append(pts)
+    return sorted(closed)
+
+
+def closed_keyframes(path):
+    """第一条视频流中可以无损切开的关键帧时间（秒）：之后直到下一个关键帧的帧都不早于它显示"""
+    return _cached("closed_keyframes", path, _read_closed_keyframes)
@@ -0,0 +1,104 @@
+"""
+解码后的 PCM 缓存：每个音频只用 ffmpeg 解码一次，写成 float32 裸数据文件，
+之后识别、静音检测、切分、并行识别的各个子进程都通过 np.memmap 零拷贝读取，
+多个进程读同一文件时共享操作系统的页缓存，内存不随进程数增加。
+
+缓存文件在 DEFAULT_CACHE_DIR/pcm/ 下，按 路径 + 修改时间 + 大小 + 采样率 寻址，超过容量上限时删除最久未使用的文件。
+"""
+import os
+import json
+import uuid
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.audio_split import SAMPLE_RATE
+from utils.transcribe_cache import DEFAULT_CACHE_DIR, evict_lru
+
+# 默认缓存上限 2GB（16kHz float32 约 3.7MB/分钟）
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# 进程内最近打开的映射：缓存文件路径 -> np.memmap，最多保留 _MAX_MAPS 个（长时间运行的服务处理大量歌曲时
+# 不会一直占着已处理歌曲的映射；被挤出的映射在调用方不再引用后由垃圾回收释放）
+_MAX_MAPS = 4
+_MAPS = OrderedDict()
+_MAPS_LOCK = threading.Lock()
+
+
+def _cache_dir(cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, "pcm")
+
+
+def pcm_path(audio_path, sr=SAMPLE_RATE, cache_dir=None):
+    stat = os.stat(audio_path)
+    file_key = [os.path.abspath(audio_path), stat.st_mtime_ns, stat.st_size, sr]
+    digest = hashlib.sha256(json.dumps(file_key).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(_cache_dir(cache_dir), f"{digest}_{sr}.f32")
+
+
+def decode(audio_path, sr=SAMPLE_RATE, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    解码为单声道 float32 PCM 文件（已存在则直接返回），ffmpeg 直接写文件，不经过 Python 内存
+    :return: (缓存文件路径, 是否命中缓存)
+    """
+    path = pcm_path(audio_path, sr, cache_dir)
+    try:
+        # 更新修改时间，用于按最近使用淘汰
+        os.utime(path)
+        return path, True
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 多个进程同时解码同一文件时各写各的临时文件，最后原子替换
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        subprocess.run([
+            "ffmpeg", "-nostdin", "-y", "-threads", "0",
+            "-i", audio_path,
+            "-f", "f32le", "-ac", "1", "-ar", str(sr),
+            tmp_path
+        ], capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"音频解码失败: {e.stderr.decode(errors='ignore')}") from e
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes, keep=path)
+    return path, False
+
+
+def open_pcm(path):
+    """
+    以 copy-on-write 方式映射 PCM 文件：读取零拷贝，偶尔的写入（如 torch.from_numpy 要求可写）
+    只复制被改动的页，不会修改缓存文件
+    """
+    with _MAPS_LOCK:
+        if path in _MAPS:
+            _MAPS.move_to_end(path)
+            return _MAPS[path]
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.float32)
+        samples = _MAPS[path] = np.memmap(path, dtype=np.float32, mode="c")
+        while len(_MAPS) > _MAX_MAPS:
+            _MAPS.popitem(last=False)
+    return samples
+
+
+def load(audio_path, sr=SAMPLE_RATE, cache_dir=None):
+    """解码（或命中缓存）并映射，返回 float32 数组"""
+    path, _ = decode(audio_path, sr, cache_dir)
+    return open_pcm(path)
+
+
+def _forget_map(path):
+    with _MAPS_LOCK:
+        _MAPS.pop(path, None)
+
+
+def evict(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, keep=None):
+    """超过容量上限时，按最近使用时间从旧到新删除（不删除 keep）。其他进程同时删除的文件直接跳过"""
+    return evict_lru(_cache_dir(cache_dir), ".f32", max_bytes, keep=keep, on_remove=_forget_map)
@@ -0,0 +1,231 @@
+"""
+运行报告：记录 prepare / finalize 各阶段的耗时、CPU 时间、峰值内存和输入大小，
+每次运行输出一个 JSON，也可以追加到 JSONL 文件中汇总多次运行。
+
+python -m utils.run_report outputs/run_reports.jsonl   # 汇总各阶段耗时
+"""
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import statistics
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 每个线程当前正在记录的报告，未开启时 stage() 不做任何事
+_LOCAL = threading.local()
+
+# 进程中正在记录的报告数、累计开始过的报告数：用于判断阶段运行期间是否有其他运行（如服务的多个工作线程）
+_RUNS_LOCK = threading.Lock()
+_active_runs = 0
+_started_runs = 0
+
+
+def _run_counts():
+    with _RUNS_LOCK:
+        return _active_runs, _started_runs
+
+
+def _maxrss_mb(who):
+    """getrusage 的历史峰值内存（MB），Linux 单位为 KB，macOS 为字节"""
+    if resource is None:
+        return None
+    value = resource.getrusage(who).ru_maxrss
+    return value / (1024 * 1024) if sys.platform == "darwin" else value / 1024
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class _PeakSampler(threading.Thread):
+    """阶段运行期间定时采样当前进程的 RSS，得到该阶段的峰值内存"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = _current_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
+
+
+class RunReport:
+    def __init__(self, mode, **info):
+        self.data = {
+            "mode": mode,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(),
+            "cpu_count": os.cpu_count(),
+            **info,
+            "stages": [],
+        }
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time() + _children_cpu()
+        # 正在运行的阶段名，用于查询进度
+        self.current_stage = None
+
+    @contextmanager
+    def stage(self, name, inputs=None, **info):
+        """
+        记录一个阶段。yield 出的 dict 可以在阶段内追加指标（如编码帧数）。
+        CPU 时间和峰值内存是整个进程的：阶段运行期间进程中还有其他运行时，
+        记录中 process_wide 为 true，这些数值包含其他运行的开销。
+        :param inputs: 该阶段的输入文件路径列表，记录其大小
+        """
+        record = {"name": name, **info}
+        if inputs:
+            record["input_bytes"] = {os.path.basename(p): _file_size(p) for p in inputs if p}
+        sampler = _PeakSampler() if _current_rss_mb() is not None else None
+        if sampler:
+            sampler.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_start = _children_cpu()
+        active_start, started_start = _run_counts()
+        self.current_stage = name
+        try:
+            yield record
+        finally:
+            self.current_stage = None
+            record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+            # ffmpeg 等子进程的 CPU 时间（子进程结束后才计入）
+            record["children_cpu_s"] = round(_children_cpu() - children_start, 4)
+            if sampler:
+                record["peak_rss_mb"] = round(sampler.stop(), 1)
+            else:
+                # 无法采样时退化为进程历史峰值
+                record["peak_rss_mb"] = _maxrss_mb(resource.RUSAGE_SELF) if resource else None
+            # 子进程中历史峰值最大的一个（如 ffmpeg）
+            record["children_max_rss_mb"] = _maxrss_mb(resource.RUSAGE_CHILDREN) if resource else None
+            active_end, started_end = _run_counts()
+            if active_start > 1 or active_end > 1 or started_end != started_start:
+                record["process_wide"] = True
+                self.data["process_wide"] = True
+            frames = record.get("frames")
+            if frames:
+                record["encode_fps"] = round(frames / record["wall_s"], 2) if record["wall_s"] else None
+            self.data["stages"].append(record)
+
+    def finish(self):
+        self.data["total_wall_s"] = round(time.perf_counter() - self._start, 4)
+        self.data["total_cpu_s"] = round(time.process_time() + _children_cpu() - self._cpu_start, 4)
+        self.data["peak_rss_mb"] = _maxrss_mb(resource.RUSAGE_SELF) if resource else None
+        return self.data
+
+    def save(self, path, aggregate_path=None):
+        """写入本次运行的报告；提供 aggregate_path 时同时追加一行到 JSONL 汇总文件"""
+        data = self.finish()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        if aggregate_path:
+            os.makedirs(os.path.dirname(os.path.abspath(aggregate_path)), exist_ok=True)
+            with open(aggregate_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False) + "\n")
+        return path
+
+
+def start_run(mode, **info):
+    """在当前线程开始记录一次运行，之后该线程中各模块的 stage() 都会记入该报告"""
+    global _active_runs, _started_runs
+    end_run()
+    with _RUNS_LOCK:
+        _active_runs += 1
+        _started_runs += 1
+    _LOCAL.report = RunReport(mode, **info)
+    return _LOCAL.report
+
+
+def end_run():
+    global _active_runs
+    report = getattr(_LOCAL, "report", None)
+    _LOCAL.report = None
+    if report is not None:
+        with _RUNS_LOCK:
+            _active_runs -= 1
+    return report
+
+
+@contextmanager
+def stage(name, inputs=None, **info):
+    """在当前报告中记录一个阶段；没有正在记录的报告时不做任何事"""
+    report = getattr(_LOCAL, "report", None)
+    if report is None:
+        yield {}
+        return
+    with report.stage(name, inputs, **info) as record:
+        yield record
+
+
+def summarize(aggregate_path):
+    """
+    汇总 JSONL 中多次运行的各阶段耗时。
+    :return: {(mode, stage): {"runs", "mean_wall_s", "p50_wall_s", "p95_wall_s", "max_peak_rss_mb"}}
+    """
+    samples = {}
+    with open(aggregate_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            for record in run.get("stages", []):
+                samples.setdefault((run["mode"], record["name"]), []).append(record)
+
+    summary = {}
+    for key, records in samples.items():
+        walls = sorted(r["wall_s"] for r in records)
+        peaks = [r["peak_rss_mb"] for r in records if r.get("peak_rss_mb") is not None]
+        summary[key] = {
+            "runs": len(records),
+            "mean_wall_s": round(statistics.mean(walls), 3),
+            "p50_wall_s": round(walls[len(walls) // 2], 3),
+            "p95_wall_s": round(walls[min(len(walls) - 1, int(len(walls) * 0.95))], 3),
+            "max_peak_rss_mb": max(peaks) if peaks else None,
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("用法: python -m utils.run_report outputs/run_reports.jsonl")
+        sys.exit(1)
+    print(f"{'mode':<10}{'stage':<18}{'runs':>6}{'mean(s)':>10}{'p50(s)':>10}{'p95(s)':>10}{'peak(MB)':>10}")
+    for (mode, name), s in sorted(summarize(sys.argv[1]).items()):
+        print(f"{mode:<10}{name:<18}{s['runs']:>6}{s['mean_wall_s']:>10}{s['p50_wall_s']:>10}"
+              f"{s['p95_wall_s']:>10}{s['max_peak_rss_mb'] or '-':>10}")
@@ -1,4 +1,123 @@
-from difflib import SequenceMatcher
+def _myers_blocks(a, b, band=None):
+    """
+    Myers O((N+M)D) 差分，返回匹配块 [(i, j, size), ...]。
+    band 限制搜索的对角线范围（即允许的累计错位字数），
+    对角线只在 [min(0, N-M) - band, max(0, N-M) + band] 内展开，避免副歌重复时远距离误匹配，
+    同时把时间和内存限制在 O((N+M) * band) 以内。
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return []
+    delta = n - m
+    if band is None:
+        lo, hi = -m, n
+    else:
+        band = max(1, band)
+        lo = max(-m, min(0, delta) - band)
+        hi = min(n, max(0, delta) + band)
+
+    # trace[d][k] = (snake 起点 x, snake 终点 x, 上一步所在对角线)
+    trace = []
+    previous = {}
+    for d in range(n + m + 1):
+        current = {}
+        k_start = max(-d, lo)
+        if (k_start + d) % 2:
+            k_start += 1
+        for k in range(k_start, min(d, hi) + 1, 2):
+            if d == 0:
+                x, prev_k = 0, None
+            else:
+                # 下移：b 中插入一个字，x 不变
+                down = previous.get(k + 1)
+                x_down = down[1] if down is not None and down[1] - k <= m else -1
+                # 右移：删除 a 中的一个字，x + 1
+                right = previous.get(k - 1)
+                x_right = right[1] + 1 if right is not None and right[1] + 1 <= n else -1
+                if x_down < 0 and x_right < 0:
+                    continue
+                if x_down >= x_right:
+                    x, prev_k = x_down, k + 1
+                else:
+                    x, prev_k = x_right, k - 1
+            y = x - k
+            x_end = x
+            while x_end < n and y < m and a[x_end] == b[y]:
+                x_end += 1
+                y += 1
+            current[k] = (x, x_end, prev_k)
+            if x_end >= n and y >= m:
+                trace.append(current)
+                return _backtrack(trace, delta)
+        trace.append(current)
+        previous = current
+    return []
+
+
+def _backtrack(trace, k):
+    blocks = []
+    for d in range(len(trace) - 1, -1, -1):
+        x, x_end, prev_k = trace[d][k]
+        if x_end > x:
+            blocks.append((x, x - k, x_end - x))
+        if prev_k is None:
+            break
+        k = prev_k
+    blocks.reverse()
+    return blocks
+
+
+def get_matching_blocks(a, b, band=None):
+    """
+    返回 a、b 的匹配块 [(i, j, size), ...]（不含 difflib 末尾的哨兵块）。
+    先去掉公共前后缀，只对中间不同的部分做 Myers 差分，修改较少时接近线性时间。
+    """
+    n, m = len(a), len(b)
+    prefix = 0
+    while prefix < n and prefix < m and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and a[n - 1 - suffix] == b[m - 1 - suffix]:
+        suffix += 1
+
+    blocks = []
+    if prefix:
+        blocks.append((0, 0, prefix))
+    for i, j, size in _myers_blocks(a[prefix:n - suffix], b[prefix:m - suffix], band):
+        blocks.append((i + prefix, j + prefix, size))
+    if suffix:
+        blocks.append((n - suffix, m - suffix, suffix))
+
+    # 合并相邻的匹配块
+    merged = []
+    for block in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == block[0] and merged[-1][1] + merged[-1][2] == block[1]:
+            i, j, size = merged[-1]
+            merged[-1] = (i, j, size + block[2])
+        else:
+            merged.append(block)
+    return merged
+
+
+def get_opcodes(a, b, band=None):
+    """
+    与 difflib.SequenceMatcher.get_opcodes 格式相同：
+    [(tag, i1, i2, j1, j2), ...]，tag 为 'equal' / 'replace' / 'delete' / 'insert'
+    """
+    opcodes = []
+    i = j = 0
+    for block_i, block_j, size in get_matching_blocks(a, b, band) + [(len(a), len(b), 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(('delete', i, block_i, j, block_j))
+        elif j < block_j:
+            opcodes.append(('insert', i, block_i, j, block_j))
+        if size:
+            opcodes.append(('equal', block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return opcodes
+
 
 def find_misalignment_intervals(ref, pred, min_match_len=3, offset_tolerance=5):
     """
@@ -8,7 +127,7 @@ def find_misalignment_intervals(ref, pred, min_match_len=3, offset_tolerance=5):
         ref (str): 正确歌词
         pred (str): 识别歌词
         min_match_len (int): 最小匹配子串长度，过滤掉太短的偶然匹配
-        offset_tolerance (int): 最大允许的匹配位置差，避免歌词重复误判
+        offset_tolerance (int): 差分时允许的最大累计错位字数（对角线带宽），避免歌词重复误判
 
     返回：
         list[dict]: 错位区间列表，例如：
@@ -17,35 +136,41 @@ def find_misalignment_intervals(ref, pred, min_match_len=3, offset_tolerance=5):
             ...
         ]
     """
-    matcher = SequenceMatcher(None, ref, pred)
-    matches = matcher.get_matching_blocks()
-
     intervals = []
     prev_offset = 0
+    last_a = last_b = last_size = 0
 
-    for i, match in enumerate(matches):
-        if match.size < min_match_len:
+    for a, b, size in get_matching_blocks(ref, pred, band=offset_tolerance):
+        if size < min_match_len:
             continue
 
-        offset = match.b - match.a
-
-        # 跳过明显不对应的（比如副歌重复太远）
-        if abs(offset) > offset_tolerance:
-            continue
+        offset = b - a
 
         if offset != prev_offset:
-            last_match = matches[i - 1] if i > 0 else {"a": 0, "b": 0, "size": 0}
             inteval = {
-                "start_ref": last_match.a + last_match.size,
-                "start_pred": last_match.b + last_match.size,
-                "end_ref": match.a,
-                "end_pred": match.b,
+                "start_ref": last_a + last_size,
+                "start_pred": last_b + last_size,
+                "end_ref": a,
+                "end_pred": b,
                 "offset": offset - prev_offset,
-                "lyric_ref": ref[last_match.a + last_match.size: match.a],
-                "lyric_pred": pred[last_match.b + last_match.size: match.b],
+                "lyric_ref": ref[last_a + last_size: a],
+                "lyric_pred": pred[last_b + last_size: b],
             }
             intervals.append(inteval)
             prev_offset = offset
+        last_a, last_b, last_size = a, b, size
+
+    # 末尾的增删（之后没有匹配块）
+    if len(pred) - len(ref) != prev_offset:
+        intervals.append({
+            "start_ref": last_a + last_size,
+            "start_pred": last_b + last_size,
+            "end_ref": len(ref),
+            "end_pred": len(pred),
+            "offset": len(pred) - len(ref) - prev_offset,
+            "lyric_ref": ref[last_a + last_size:],
+            "lyric_pred": pred[last_b + last_size:],
+        })
 
     return intervals
 
@@ -56,4 +181,4 @@ if __name__ == "__main__":
 
     intervals = find_misalignment_intervals(ref_lyric, pred_lyric)
     for interval in intervals:
-        print(interval)
\ No newline at end of file
+        print(interval)
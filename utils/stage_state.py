@@ -0,0 +1,74 @@
+"""
+输出目录中的阶段状态：记录每个阶段输入文件的内容哈希、参数以及输出文件的哈希，
+再次运行时输入和参数都未变、输出文件完好的阶段直接跳过；中途中断的运行从未完成的阶段继续。
+状态保存在 <output_dir>/.stages.json。
+"""
+import os
+import json
+import hashlib
+
+from utils.transcribe_cache import file_sha256
+
+STATE_FILE = ".stages.json"
+
+
+class StageState:
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, STATE_FILE)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        # files: 路径 → {mtime_ns, size, sha256}，文件未变时不重复计算哈希
+        self.state.setdefault("files", {})
+        # stages: 阶段名 → {key, outputs: {路径: sha256}}
+        self.state.setdefault("stages", {})
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.state["files"].get(key)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["sha256"]
+        digest = file_sha256(path)
+        self.state["files"][key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        return digest
+
+    def _key(self, inputs, params):
+        key_src = json.dumps({"inputs": [self.file_hash(p) for p in inputs], "params": params},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+
+    def fresh(self, name, inputs, outputs, params=None, verify_outputs=True):
+        """
+        阶段是否可以跳过：输入内容和参数与上次完成时相同，且输出文件都存在。
+        :param verify_outputs: 是否同时要求输出内容未被改动；
+                               输出是供人工修改的文件（如 lyrics.txt）时传 False
+        """
+        record = self.state["stages"].get(name)
+        if record is None or not all(os.path.exists(p) for p in outputs):
+            return False
+        if record["key"] != self._key(inputs, params):
+            return False
+        if verify_outputs:
+            return all(record["outputs"].get(os.path.abspath(p)) == self.file_hash(p) for p in outputs)
+        return True
+
+    def done(self, name, inputs, outputs, params=None):
+        """阶段成功完成后记录其输入与输出的哈希"""
+        self.state["stages"][name] = {
+            "key": self._key(inputs, params),
+            "outputs": {os.path.abspath(p): self.file_hash(p) for p in outputs},
+        }
+        self.save()
+
+    def invalidate(self, name):
+        if self.state["stages"].pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,156 @@
+import os
+import json
+import uuid
+import hashlib
+
+# 默认缓存目录，可通过环境变量 KARAOKE_CACHE_DIR 修改
+DEFAULT_CACHE_DIR = os.environ.get("KARAOKE_CACHE_DIR", os.path.join("outputs", ".cache"))
+# 默认缓存上限 512MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """按内容计算文件的 sha256（分块读取，不会整个载入内存）"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _remove(path):
+    """删除缓存文件，已被其他进程删除时忽略；返回是否由本次删除"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def cache_entries(directory, suffix):
+    """目录中 suffix 结尾的缓存文件，返回 [(修改时间, 大小, 路径)]"""
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # 列目录之后被其他进程删除
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def evict_lru(directory, suffix, max_bytes, keep=None, on_remove=None):
+    """
+    缓存文件总大小超过 max_bytes 时，按最近使用时间（修改时间）从旧到新删除，识别结果、PCM、媒体信息缓存共用
+    :param keep: 不删除的文件（如刚写入的条目）
+    :param on_remove: 删除每个文件前以其路径调用（如释放进程内对该文件的映射）
+    :return: 删除的文件数
+    """
+    entries = sorted(cache_entries(directory, suffix))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        if on_remove:
+            on_remove(path)
+        total -= size
+        removed += _remove(path)
+    return removed
+
+
+class TranscribeCache:
+    """
+    Whisper 识别结果的磁盘缓存，按 音频内容哈希 + 模型名 + 识别参数 寻址。
+    缓存文件名为 {音频哈希前16位}_{键}.json，便于按音频失效。
+    超过 max_bytes 时按最近使用时间淘汰最旧的条目。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "transcribe")
+        self.max_bytes = max_bytes
+        # 同一进程内避免对同一文件重复计算哈希
+        self._hash_memo = {}
+
+    def audio_hash(self, audio_path):
+        stat = os.stat(audio_path)
+        memo_key = (os.path.abspath(audio_path), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._hash_memo:
+            self._hash_memo[memo_key] = file_sha256(audio_path)
+        return self._hash_memo[memo_key]
+
+    def _entry_path(self, audio_path, model_name, options):
+        audio_hash = self.audio_hash(audio_path)
+        key_src = json.dumps({"audio": audio_hash, "model": model_name, "options": options},
+                             sort_keys=True, ensure_ascii=False)
+        key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{audio_hash[:16]}_{key[:32]}.json")
+
+    def get(self, audio_path, model_name, options):
+        """命中则返回识别结果 dict，否则返回 None"""
+        path = self._entry_path(audio_path, model_name, options)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)["result"]
+            # 更新修改时间，作为最近使用时间用于淘汰
+            os.utime(path)
+        except FileNotFoundError:
+            # 未缓存，或刚被其他进程淘汰
+            return None
+        except (OSError, ValueError, KeyError):
+            # 缓存文件损坏则直接丢弃
+            _remove(path)
+            return None
+        return result
+
+    def put(self, audio_path, model_name, options, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(audio_path, model_name, options)
+        entry = {
+            "audio": os.path.basename(audio_path),
+            "model": model_name,
+            "options": options,
+            "result": result,
+        }
+        # 先写临时文件再原子替换：并发写同一条目、或写到一半中断时，读到的都是完整的文件
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # whisper 结果中可能含有 numpy 标量，统一转为 float
+            json.dump(entry, f, ensure_ascii=False, default=float)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def _entries(self):
+        return cache_entries(self.cache_dir, ".json")
+
+    def evict(self):
+        """超过容量上限时，按最近使用时间从旧到新删除"""
+        return evict_lru(self.cache_dir, ".json", self.max_bytes)
+
+    def invalidate(self, audio_path):
+        """删除某个音频的所有缓存（不论模型和参数）"""
+        prefix = self.audio_hash(audio_path)[:16] + "_"
+        removed = 0
+        for _, _, path in self._entries():
+            if os.path.basename(path).startswith(prefix):
+                removed += _remove(path)
+        return removed
+
+    def clear(self):
+        """清空全部缓存"""
+        removed = 0
+        for _, _, path in self._entries():
+            removed += _remove(path)
+        return removed
@@ -0,0 +1,272 @@
+"""
+逐字时间存储：开始/结束时间（百分秒）、行号、文字偏移都保存为 numpy 数组，
+整体修正（平移、按速度缩放、限制字时长、填补字间空隙、对齐节拍）都是数组运算，
+保存为 .npz 旁路文件，需要时再导出为 ass。
+
+python -m utils.word_timing outputs/song/old_lyrics.words.npz --offset 30 --scale 1.02 --output lyrics.ass
+python -m utils.word_timing outputs/song/lyrics.ass --snap beats.txt --snap_tolerance 8 --output lyrics.ass
+"""
+import os
+import argparse
+
+import numpy as np
+
+from utils.ass_document import AssDocument, AssEvent, KaraokeTiming
+
+# 与 generate_ass 相同的默认头部，导出时没有模板 ass 则使用它
+DEFAULT_HEADER = """[Script Info]
+Title: Karaoke Lyrics
+ScriptType: v4.00+
+PlayResX: 1280
+PlayResY: 720
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,48,&H0000FF00,&H00FFFFFF,&H00000000,&H64000000,-1,0,0,0,100,100,0,0,1,3,0,2,10,10,30,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def sidecar_path(ass_path):
+    """ xxx.ass → xxx.words.npz """
+    return os.path.splitext(ass_path)[0] + ".words.npz"
+
+
+class WordTiming:
+    """
+    start / end: 每个字的绝对开始、结束时间（百分秒，int32）
+    row: 每个字所在的行号（从 0 开始连续、非递减）
+    text_offsets: 所有字的 UTF-8 文本拼接后，第 i 个字为 text[text_offsets[i]:text_offsets[i + 1]]
+    行的开始/结束时间由该行字的最早开始、最晚结束得出，不单独保存。
+    """
+
+    def __init__(self, start, end, row, text, text_offsets):
+        self.start = np.asarray(start, dtype=np.int32)
+        self.end = np.asarray(end, dtype=np.int32)
+        self.row = np.asarray(row, dtype=np.int32)
+        self.text = text
+        self.text_offsets = np.asarray(text_offsets, dtype=np.int64)
+
+    # ---------------------------
+    # 构建 / 读写
+    # ---------------------------
+
+    @classmethod
+    def from_words(cls, starts, ends, rows, texts):
+        encoded = [t.encode("utf-8") for t in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(starts, ends, rows, b"".join(encoded), offsets)
+
+    @classmethod
+    def from_ass(cls, ass_path):
+        """从已有 ass 的 \\kf 时长恢复逐字时间（没有卡拉OK字的行被跳过）"""
+        doc = AssDocument.load(ass_path)
+        words = doc.karaoke_words(ignore_space=False)
+        timing = KaraokeTiming(doc.dialogues, words)
+        starts = np.array([timing.start(i) for i in range(len(words))], dtype=np.int32)
+        durations = np.array([w.duration for w in words], dtype=np.int32)
+        # 行号压缩为连续编号
+        _, rows = np.unique(np.array([w.row for w in words], dtype=np.int32), return_inverse=True)
+        return cls.from_words(starts, starts + durations, rows, [w.text for w in words])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["start"], data["end"], data["row"], data["text"].tobytes(), data["text_offsets"])
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            start=self.start,
+            end=self.end,
+            row=self.row,
+            text=np.frombuffer(self.text, dtype=np.uint8),
+            text_offsets=self.text_offsets,
+        )
+        return path
+
+    # ---------------------------
+    # 访问
+    # ---------------------------
+
+    def __len__(self):
+        return len(self.start)
+
+    def word(self, index):
+        return self.text[self.text_offsets[index]:self.text_offsets[index + 1]].decode("utf-8")
+
+    def words(self):
+        return [self.word(i) for i in range(len(self))]
+
+    def _row_first(self):
+        """每行第一个字的序号"""
+        return np.flatnonzero(np.r_[True, self.row[1:] != self.row[:-1]]) if len(self) else np.array([], dtype=np.int64)
+
+    def row_bounds(self):
+        """ (行开始时间数组, 行结束时间数组) """
+        if not len(self):
+            return np.array([], dtype=np.int32), np.array([], dtype=np.int32)
+        first = self._row_first()
+        return np.minimum.reduceat(self.start, first), np.maximum.reduceat(self.end, first)
+
+    def _next_start_in_row(self):
+        """每个字同一行中下一个字的开始时间，行末的字为 -1"""
+        next_start = np.full(len(self), -1, dtype=np.int32)
+        if len(self) > 1:
+            same_row = self.row[1:] == self.row[:-1]
+            next_start[:-1] = np.where(same_row, self.start[1:], -1)
+        return next_start
+
+    def word_at(self, t):
+        """
+        时间 t（百分秒，可以是数组）处正在唱的字的序号，不在任何字内时为 -1。
+        二分查找，要求开始时间非递减
+        """
+        t = np.asarray(t)
+        if not len(self):
+            return np.full(t.shape, -1, dtype=np.intp)
+        index = np.searchsorted(self.start, t, side="right") - 1
+        valid = (index >= 0) & (t < self.end[np.clip(index, 0, None)])
+        return np.where(valid, index, -1)
+
+    # ---------------------------
+    # 整体修正（原地修改，返回 self 便于链式调用）
+    # ---------------------------
+
+    def offset(self, delta_cs):
+        """整体平移 delta_cs 百分秒（不早于 0）"""
+        self.start = np.maximum(self.start + delta_cs, 0).astype(np.int32)
+        self.end = np.maximum(self.end + delta_cs, 0).astype(np.int32)
+        return self
+
+    def scale(self, factor, origin_cs=0):
+        """以 origin_cs 为原点按 factor 缩放时间轴（如变速版本）"""
+        self.start = np.rint((self.start - origin_cs) * factor + origin_cs).astype(np.int32)
+        self.end = np.rint((self.end - origin_cs) * factor + origin_cs).astype(np.int32)
+        return self
+
+    def clamp(self, min_cs=None, max_cs=None):
+        """
+        把每个字的时长限制在 [min_cs, max_cs]：开始时间不变，只调整结束时间，
+        延长时不超过同一行下一个字的开始时间
+        """
+        duration = self.end - self.start
+        if min_cs is not None:
+            duration = np.maximum(duration, min_cs)
+        if max_cs is not None:
+            duration = np.minimum(duration, max_cs)
+        end = self.start + duration
+        next_start = self._next_start_in_row()
+        # 延长的字不越过下一个字的开始（但不短于原结束时间）
+        capped = np.maximum(np.minimum(end, next_start), self.end)
+        self.end = np.where((next_start >= 0) & (end > self.end), capped, end).astype(np.int32)
+        return self
+
+    def fill_gaps(self, max_gap_cs):
+        """同一行中字间空隙不超过 max_gap_cs 时，把前一个字延长到下一个字开始"""
+        next_start = self._next_start_in_row()
+        gap = next_start - self.end
+        fill = (next_start >= 0) & (gap > 0) & (gap <= max_gap_cs)
+        self.end = np.where(fill, next_start, self.end).astype(np.int32)
+        return self
+
+    def snap(self, beats_cs, tolerance_cs):
+        """把开始时间对齐到 tolerance_cs 以内最近的节拍，字时长保持不变"""
+        beats = np.sort(np.asarray(beats_cs, dtype=np.int32))
+        if not len(beats) or not len(self):
+            return self
+        right = np.clip(np.searchsorted(beats, self.start), 0, len(beats) - 1)
+        left = np.clip(right - 1, 0, len(beats) - 1)
+        nearest = np.where(np.abs(beats[left] - self.start) <= np.abs(beats[right] - self.start),
+                           beats[left], beats[right])
+        move = np.where(np.abs(nearest - self.start) <= tolerance_cs, nearest - self.start, 0)
+        self.start = (self.start + move).astype(np.int32)
+        self.end = (self.end + move).astype(np.int32)
+        return self
+
+    # ---------------------------
+    # 导出
+    # ---------------------------
+
+    def karaoke_durations(self):
+        """
+        每个字的 \\kf 时长：到同一行下一个字开始为止（字间空隙并入前一个字，保证每个字的开始时间准确），
+        行末的字到自身结束为止
+        """
+        next_start = self._next_start_in_row()
+        return np.maximum(np.where(next_start >= 0, next_start, self.end) - self.start, 0)
+
+    def to_events(self, template=None):
+        """生成 Dialogue 事件；template 为一个 AssEvent，沿用其样式等字段"""
+        values = list(template.values) if template else ['0', '', '', 'Default', '', '0', '0', '0', '', '']
+        row_start, row_end = self.row_bounds()
+        durations = self.karaoke_durations().tolist()
+        first = self._row_first().tolist() + [len(self)]
+        events = []
+        for r in range(len(first) - 1):
+            text = "".join(f"{{\\kf{durations[i]}}}{self.word(i)}" for i in range(first[r], first[r + 1]))
+            events.append(AssEvent('Dialogue', values, int(row_start[r]), int(row_end[r]), text))
+        return events
+
+    def to_ass(self, output_path, template_path=None):
+        """导出 ass；提供 template_path 时沿用其头部与样式，只替换 [Events] 中的条目"""
+        doc = AssDocument.load(template_path) if template_path else AssDocument.parse(DEFAULT_HEADER)
+        dialogues = doc.dialogues
+        doc.set_events(self.to_events(dialogues[0] if dialogues else None))
+        doc.save(output_path)
+        return output_path
+
+
+def load(path):
+    """读取 .npz 旁路文件或 ass 文件"""
+    return WordTiming.load(path) if path.endswith(".npz") else WordTiming.from_ass(path)
+
+
+def load_beats(path):
+    """读取节拍时间文件：每行一个节拍，第一列为秒（节拍检测工具常见的导出格式），返回百分秒数组"""
+    beats = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.replace(",", " ").split()
+            try:
+                beats.append(round(float(fields[0]) * 100))
+            except (IndexError, ValueError):
+                # 空行、表头
+                continue
+    return np.array(beats, dtype=np.int32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量修正逐字时间")
+    parser.add_argument("input", help=".words.npz 旁路文件或 ass 文件")
+    parser.add_argument("--offset", type=int, help="整体平移（百分秒，可为负）")
+    parser.add_argument("--scale", type=float, help="时间轴缩放倍数（变速版本）")
+    parser.add_argument("--min", type=int, dest="min_cs", help="每个字的最短时长（百分秒）")
+    parser.add_argument("--max", type=int, dest="max_cs", help="每个字的最长时长（百分秒）")
+    parser.add_argument("--fill_gap", type=int, help="填补不超过该值的字间空隙（百分秒）")
+    parser.add_argument("--snap", help="节拍时间文件（每行一个，秒）：把字的开始时间对齐到最近的节拍")
+    parser.add_argument("--snap_tolerance", type=int, default=10,
+                        help="只对齐距离节拍不超过该值的字（百分秒，默认: 10）")
+    parser.add_argument("--template", help="导出 ass 时沿用其头部与样式")
+    parser.add_argument("--output", required=True, help="输出路径，.ass 或 .npz")
+
+    args = parser.parse_args()
+    timing = load(args.input)
+    if args.scale:
+        timing.scale(args.scale)
+    if args.offset:
+        timing.offset(args.offset)
+    if args.snap:
+        timing.snap(load_beats(args.snap), args.snap_tolerance)
+    if args.min_cs is not None or args.max_cs is not None:
+        timing.clamp(args.min_cs, args.max_cs)
+    if args.fill_gap:
+        timing.fill_gaps(args.fill_gap)
+    if args.output.endswith(".npz"):
+        timing.save(args.output)
+    else:
+        timing.to_ass(args.output, args.template)
+    print(f"✅ 已输出: {args.output}（{len(timing)} 个字）")